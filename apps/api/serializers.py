@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
 from ..pages.models import (
     PageCategory, PageNotification, PageRevisionRequest, PageTemplate, FieldGroup, FieldDefinition, 
     Page, PageVersion, PageFieldValue, PageGallery, PageImage, 
@@ -11,6 +12,7 @@ from ..widgets.models import (
     TemplateCategory, TemplateType, DjangoTemplate, 
     ComponentTemplate, LayoutTemplate
 )
+from utils.redirect_graph import check_redirect
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -311,8 +313,26 @@ class PageImportSerializer(serializers.ModelSerializer):
 class PageRedirectSerializer(serializers.ModelSerializer):
     class Meta:
         model = PageRedirect
-        fields = ['id', 'old_path', 'new_path', 'is_permanent', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = ['id', 'page', 'old_path', 'new_path', 'redirect_type', 'is_active',
+                  'access_count', 'last_accessed', 'created_at']
+        read_only_fields = ['id', 'access_count', 'last_accessed', 'created_at']
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if isinstance(self.parent, serializers.ListSerializer):
+            # Em lote, import_redirects valida as regras em conjunto e informa os erros por item
+            return attrs
+        instance = PageRedirect(
+            pk=getattr(self.instance, 'pk', None),
+            old_path=attrs.get('old_path', getattr(self.instance, 'old_path', None)),
+            new_path=attrs.get('new_path', getattr(self.instance, 'new_path', None)),
+            is_active=attrs.get('is_active', getattr(self.instance, 'is_active', True)),
+        )
+        try:
+            check_redirect(instance)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError({'new_path': error.messages})
+        return attrs
         
 class PageRevisionRequestSerializer(serializers.ModelSerializer):
     """Serializador para o modelo PageRevisionRequest"""
@@ -7,6 +7,8 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from utils.redirects import redirect_table
+from utils.redirect_graph import import_redirects
 
 from ..pages.models import (
     PageCategory, PageNotification, PageRedirect, PageTemplate, FieldGroup, FieldDefinition,
@@ -418,17 +420,28 @@ class PageRedirectViewSet(viewsets.ModelViewSet):
     serializer_class = PageRedirectSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['old_path', 'new_path', 'is_permanent']
+    filterset_fields = ['old_path', 'new_path', 'redirect_type', 'is_active']
     search_fields = ['old_path', 'new_path']
 
     @action(detail=False, methods=['post'])
     def bulk_create(self, request):
-        """Cria múltiplos redirecionamentos de uma vez"""
+        """
+        Cria múltiplos redirecionamentos de uma vez. As cadeias são achatadas e as
+        regras que criariam ciclos são recusadas, sem impedir a gravação das demais.
+        """
         serializer = self.get_serializer(data=request.data, many=True)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        
+        rules = [dict(item, created_by=request.user) for item in serializer.validated_data]
+        result = import_redirects(PageRedirect, rules)
+        
+        return Response({
+            'created': result.created,
+            'updated': result.updated,
+            'errors': {
+                index: error.messages for index, error in result.errors.items()
+            }
+        }, status=status.HTTP_201_CREATED if not result.errors else status.HTTP_207_MULTI_STATUS)
 
     @action(detail=False, methods=['get'])
     def check_redirect(self, request):
@@ -437,13 +450,13 @@ class PageRedirectViewSet(viewsets.ModelViewSet):
         if path is None:
             return Response({'error': 'Path parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        redirect = PageRedirect.objects.filter(old_path=path).first()
-        if redirect:
+        rule = redirect_table.match(path)
+        if rule:
             return Response({
                 'exists': True,
-                'old_path': redirect.old_path,
-                'new_path': redirect.new_path,
-                'is_permanent': redirect.is_permanent
+                'old_path': rule.old_path,
+                'new_path': rule.build_target(path),
+                'is_permanent': rule.status == 301
             })
         return Response({'exists': False})
     
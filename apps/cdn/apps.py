@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CdnConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.cdn'
+
+    def ready(self):
+        # Importa os signals
+        import apps.cdn.signals
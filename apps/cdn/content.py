@@ -0,0 +1,244 @@
+# apps/cdn/content.py
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from functools import partial
+from urllib.parse import unquote
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.images import get_image_dimensions
+from django.db import transaction
+from utils.cache import cdn_cache, pages_cache
+
+
+logger = logging.getLogger('cdn')
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Tags com referências a arquivos e os atributos que podem conter URLs de mídia
+TAG_PATTERN = re.compile(r'<(img|a|source|video|audio)\b[^>]*>', re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r'\b(src|href|srcset|poster)\s*=\s*(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_content_provider():
+    """
+    Provedor usado nas URLs gravadas no conteúdo. URLs assinadas expiram,
+    por isso provedores que as exigem não são usados.
+    """
+    from .models import CDNProvider
+    return CDNProvider.objects.filter(is_active=True, use_signed_urls=False).order_by('pk').first()
+
+
+def discard_rendered_content(url=None):
+    """
+    Descarta o conteúdo processado das páginas e versões (todas, ou só as que usam
+    a URL). Elas exibem o conteúdo original até serem processadas de novo, ao salvar
+    ou com o comando render_page_content.
+    """
+    if not apps.is_installed('apps.pages'):
+        return 0
+    discarded = 0
+    for model_name in ('Page', 'PageVersion'):
+        queryset = apps.get_model('pages', model_name).objects.exclude(rendered_content='')
+        if url is not None:
+            queryset = queryset.filter(rendered_content__contains=url)
+        discarded += queryset.update(rendered_content='')
+    if discarded:
+        pages_cache.invalidate()
+    return discarded
+
+
+def _has_attribute(tag, name):
+    return re.search(rf'\s{name}\s*=', tag, re.IGNORECASE) is not None
+
+
+def _add_attributes(tag, attributes):
+    if not attributes:
+        return tag
+    end = -2 if tag.endswith('/>') else -1
+    extra = ''.join(f' {name}="{value}"' for name, value in attributes)
+    return tag[:end].rstrip() + extra + (' />' if end == -2 else '>')
+
+
+class MediaRewriter:
+    """
+    Reescreve as referências a MEDIA_URL de um HTML (conteúdo do CKEditor):
+
+    - Cada arquivo é enviado ao provedor CDN ativo no caminho imutável do seu
+      hash (cdn/sha256/…) e a URL passa a apontar para o CDN. Se o CDN falhar,
+      a URL local é mantida;
+    - <img> recebe loading="lazy" e largura/altura (dos metadados de PageImage
+      ou, na falta deles, do cabeçalho do arquivo).
+
+    O resultado deve ser gravado: a renderização das páginas não reescreve nada.
+    Atributos já presentes são mantidos, então reprocessar o HTML é seguro.
+    """
+
+    def __init__(self, provider=None):
+        self.provider = provider if provider is not None else get_content_provider()
+        self.media_url = settings.MEDIA_URL
+        self.media_root = os.path.abspath(settings.MEDIA_ROOT)
+        self._urls = {}
+
+    def rewrite(self, html):
+        if not html or '<' not in html:
+            return html
+
+        image_names = [
+            self.get_media_name(value)
+            for tag in TAG_PATTERN.finditer(html) if tag.group(1).lower() == 'img'
+            for attribute, quote, value in ATTRIBUTE_PATTERN.findall(tag.group(0)) if attribute.lower() == 'src'
+        ]
+        self._dimensions = self.get_known_dimensions({name for name in image_names if name})
+        return TAG_PATTERN.sub(self.rewrite_tag, html)
+
+    def rewrite_tag(self, match):
+        tag = match.group(0)
+        is_image = match.group(1).lower() == 'img'
+        image_name = None
+
+        def rewrite_attribute(attribute_match):
+            nonlocal image_name
+            attribute, quote, value = attribute_match.groups()
+            if attribute.lower() == 'src' and is_image:
+                image_name = self.get_media_name(value)
+            value = re.sub(r'[^\s,]+', lambda url: self.get_url(url.group(0)), value)
+            return f'{attribute}={quote}{value}{quote}'
+
+        tag = ATTRIBUTE_PATTERN.sub(rewrite_attribute, tag)
+        if not is_image:
+            return tag
+
+        extra = []
+        if not _has_attribute(tag, 'loading'):
+            extra.append(('loading', 'lazy'))
+        dimensions = self.get_dimensions(image_name) if image_name else None
+        if dimensions and not _has_attribute(tag, 'width') and not _has_attribute(tag, 'height'):
+            extra.extend((('width', dimensions[0]), ('height', dimensions[1])))
+        return _add_attributes(tag, extra)
+
+    def get_media_name(self, url):
+        """
+        Caminho relativo ao MEDIA_ROOT de uma URL de mídia local, ou None.
+        """
+        if not url.startswith(self.media_url):
+            return None
+        name = unquote(url[len(self.media_url):].split('?', 1)[0].split('#', 1)[0])
+        path = os.path.abspath(os.path.join(self.media_root, name))
+        if not path.startswith(self.media_root + os.sep) or not os.path.isfile(path):
+            return None
+        return name
+
+    def get_url(self, url):
+        name = self.get_media_name(url)
+        if name is None or self.provider is None:
+            return url
+        if name not in self._urls:
+            try:
+                self._urls[name] = self.publish(name)
+            except Exception:
+                # Um CDN fora do ar não impede a gravação da página: o arquivo continua em MEDIA_URL
+                logger.exception(f'Falha ao publicar {name} em {self.provider}')
+                self._urls[name] = url
+        return self._urls[name]
+
+    def publish(self, name):
+        """
+        Retorna a URL do arquivo no CDN. O caminho depende só do hash, então o envio
+        (quando necessário) fica para depois do commit: se a transação for desfeita,
+        nada é enviado. Enquanto o arquivo local não muda, a URL vem do cache.
+        """
+        from .models import CDNBlob, content_addressed_name
+
+        path = os.path.join(self.media_root, name)
+        stat = os.stat(path)
+        cache_key = (
+            f'media_url_{self.provider.pk}_{self.provider.updated_at.timestamp()}_'
+            f'{hashlib.sha1(name.encode()).hexdigest()}_{stat.st_size}_{stat.st_mtime_ns}'
+        )
+        url = cdn_cache.get(cache_key)
+        if url is not None:
+            return url
+
+        file_hash = file_sha256(path)
+        if not transaction.get_connection().in_atomic_block:
+            # Sem transação não há o que desfazer: o envio é feito agora
+            return self.upload(name, file_hash, cache_key)
+
+        blob_name = CDNBlob.objects.filter(
+            provider=self.provider, file_hash=file_hash
+        ).values_list('name', flat=True).first()
+        url = self.provider.get_storage().url(blob_name or content_addressed_name(file_hash, os.path.basename(name)))
+        transaction.on_commit(partial(self.upload_after_commit, name, file_hash, url, cache_key))
+        return url
+
+    def upload(self, name, file_hash, cache_key):
+        """
+        Envia o arquivo (se o storage ainda não o tiver), fixa o blob e retorna a URL.
+        """
+        from .models import CDNBlob
+
+        path = os.path.join(self.media_root, name)
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        with open(path, 'rb') as f:
+            blob = CDNBlob.acquire(
+                self.provider, File(f, name=name), file_hash,
+                os.path.basename(name), content_type, pin=True
+            )
+        url = self.provider.get_storage().url(blob.name)
+        cdn_cache.set(cache_key, url, None)
+        return url
+
+    def upload_after_commit(self, name, file_hash, url, cache_key):
+        """
+        Envio adiado por publish(). Se falhar, o conteúdo já gravado com a URL é
+        descartado para não apontar para um arquivo inexistente.
+        """
+        try:
+            published = self.upload(name, file_hash, cache_key)
+        except Exception:
+            logger.exception(f'Falha ao enviar {name} para {self.provider}')
+            published = None
+        if published != url:
+            discard_rendered_content(url)
+
+    def get_known_dimensions(self, names):
+        if not names or not apps.is_installed('apps.pages'):
+            return {}
+        PageImage = apps.get_model('pages', 'PageImage')
+        return {
+            image: (width, height)
+            for image, width, height in PageImage.objects.filter(
+                image__in=names, width__isnull=False, height__isnull=False
+            ).values_list('image', 'width', 'height')
+        }
+
+    def get_dimensions(self, name):
+        if name not in self._dimensions:
+            try:
+                self._dimensions[name] = get_image_dimensions(os.path.join(self.media_root, name))
+            except (OSError, ValueError):
+                self._dimensions[name] = None
+            if self._dimensions[name] and None in self._dimensions[name]:
+                self._dimensions[name] = None
+        return self._dimensions[name]
+
+
+def rewrite_media_urls(html, provider=None):
+    """
+    Atalho para MediaRewriter(provider).rewrite(html).
+    """
+    return MediaRewriter(provider).rewrite(html)
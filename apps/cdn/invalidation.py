@@ -0,0 +1,233 @@
+# apps/cdn/invalidation.py
+
+import hashlib
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from utils.cache import cdn_cache
+
+
+logger = logging.getLogger('cdn')
+
+WILDCARD = '*'
+
+# Limites de caminhos por requisição e suporte a curingas de cada provedor
+PROVIDER_LIMITS = {
+    'cloudfront': {'max_paths': 3000, 'wildcards': True},
+    'cloudflare': {'max_paths': 30, 'wildcards': False},
+    'bunny': {'max_paths': 1, 'wildcards': True},
+    'custom': {'max_paths': 100, 'wildcards': True},
+}
+DEFAULT_LIMITS = {'max_paths': 100, 'wildcards': False}
+
+
+def get_provider_limits(provider):
+    return PROVIDER_LIMITS.get(provider.provider_type, DEFAULT_LIMITS)
+
+
+def _is_covered(path, wildcards):
+    """
+    Indica se o caminho já é invalidado por um curinga (/img/* cobre /img/a/b.png).
+    """
+    return any(path != prefix + WILDCARD and path.startswith(prefix) for prefix in wildcards)
+
+
+def coalesce_paths(paths, max_paths=None, wildcards=True, fold_threshold=None):
+    """
+    Remove caminhos repetidos e os já cobertos por curingas. Se o provedor aceita
+    curingas, diretórios com muitos caminhos (fold_threshold) são trocados por
+    "diretório/*" e, se ainda houver mais caminhos que max_paths, os diretórios
+    mais numerosos são agrupados até caber no limite.
+    """
+    paths = {path if path.startswith('/') else '/' + path for path in paths}
+    if not wildcards:
+        return sorted(paths)
+
+    if fold_threshold is None:
+        fold_threshold = getattr(settings, 'CDN_INVALIDATION_FOLD_THRESHOLD', 20)
+
+    def apply_wildcards(paths):
+        prefixes = {path[:-1] for path in paths if path.endswith(WILDCARD)}
+        return {path for path in paths if not _is_covered(path, prefixes)}
+
+    paths = apply_wildcards(paths)
+    while True:
+        # Caminhos cobertos por cada diretório ancestral (exceto a raiz)
+        directories = {}
+        for path in paths:
+            parts = path.rstrip(WILDCARD).rstrip('/').split('/')[1:-1]
+            for depth in range(1, len(parts) + 1):
+                directory = '/' + '/'.join(parts[:depth]) + '/'
+                directories.setdefault(directory, set()).add(path)
+
+        if max_paths is not None and len(paths) > max_paths:
+            # Acima do limite: agrupa o diretório que mais reduz a lista (o mais profundo em caso de empate)
+            candidates = directories
+        else:
+            # Dentro do limite: agrupa apenas os diretórios com muitos arquivos diretos
+            candidates = {
+                directory: members for directory, members in directories.items()
+                if sum(1 for path in members if path.rsplit('/', 1)[0] + '/' == directory) >= fold_threshold
+            }
+
+        if not candidates:
+            break
+
+        directory, members = max(candidates.items(), key=lambda item: (len(item[1]), item[0].count('/')))
+        if len(members) < 2:
+            break
+
+        paths = apply_wildcards(paths | {directory + WILDCARD})
+
+    return sorted(paths)
+
+
+def build_batches(provider, paths):
+    """
+    Divide os caminhos em lotes que respeitam o limite por requisição do provedor.
+    """
+    limits = get_provider_limits(provider)
+    max_paths = limits['max_paths']
+    paths = coalesce_paths(paths, max_paths=max_paths, wildcards=limits['wildcards'])
+    return [paths[i:i + max_paths] for i in range(0, len(paths), max_paths)]
+
+
+def make_caller_reference(paths):
+    """
+    Identificador único do lote, reutilizado em todas as tentativas de envio.
+    """
+    digest = hashlib.sha256('\n'.join(paths).encode()).hexdigest()[:16]
+    return f'{digest}-{uuid.uuid4().hex[:16]}'
+
+
+class InvalidationQueue:
+    """
+    Fila de invalidações de cache do CDN, gravada no banco (PendingInvalidation).
+
+    Os caminhos registrados durante CDN_INVALIDATION_WINDOW segundos são enviados
+    juntos pela tarefa Celery flush_invalidations: repetidos são descartados, grupos
+    grandes viram curingas e cada lote respeita o limite do provedor. Envios com
+    falha são repetidos com espera exponencial e, se ainda falharem, os caminhos
+    voltam para a fila. Sem worker disponível, ou com CDN_INVALIDATION_ASYNC = False,
+    os envios são feitos na própria chamada com uma única tentativa: o que falhar
+    fica na fila para o próximo envio ou para o comando flush_cdn_invalidations.
+    """
+
+    SCHEDULED_KEY = 'invalidation_flush_scheduled'
+
+    def get_window(self):
+        return getattr(settings, 'CDN_INVALIDATION_WINDOW', 2)
+
+    def is_async(self):
+        return getattr(settings, 'CDN_INVALIDATION_ASYNC', True)
+
+    def enqueue(self, provider, paths):
+        from .models import PendingInvalidation
+
+        # Um caminho já reservado por um envio em andamento volta para a fila:
+        # o envio pode ter começado antes da alteração que pediu esta invalidação
+        PendingInvalidation.objects.bulk_create(
+            [
+                PendingInvalidation(provider=provider, path=path if path.startswith('/') else '/' + path)
+                for path in set(paths)
+            ],
+            update_conflicts=True,
+            unique_fields=['provider', 'path'],
+            update_fields=['claim', 'claimed_at'],
+        )
+
+        if not self.is_async():
+            self.flush(retry=False)
+            return
+        transaction.on_commit(self.dispatch)
+
+    def dispatch(self):
+        """
+        Agenda um envio ao final da janela; chamadas dentro da mesma janela
+        são atendidas pelo mesmo envio.
+        """
+        from .tasks import flush_invalidations
+
+        window = self.get_window()
+        if not cdn_cache.add(self.SCHEDULED_KEY, True, window):
+            return
+        try:
+            flush_invalidations.apply_async(countdown=window)
+        except Exception as e:
+            cdn_cache.delete(self.SCHEDULED_KEY)
+            logger.warning(f'Não foi possível agendar a invalidação do CDN, enviando agora: {e}')
+            self.flush(retry=False)
+
+    def claim(self):
+        """
+        Reserva todos os caminhos pendentes (e os de envios interrompidos há mais de
+        CDN_INVALIDATION_STALE segundos). Retorna o identificador da reserva.
+        """
+        from .models import PendingInvalidation
+
+        now = timezone.now()
+        stale = now - timezone.timedelta(seconds=getattr(settings, 'CDN_INVALIDATION_STALE', 600))
+        claim = uuid.uuid4().hex
+        PendingInvalidation.objects.filter(
+            Q(claim='') | Q(claimed_at__lt=stale)
+        ).update(claim=claim, claimed_at=now)
+        return claim
+
+    def flush(self, retry=True):
+        """
+        Envia todas as invalidações pendentes. Retorna o número de lotes enviados.
+        Com retry=False (envio dentro de uma requisição), cada lote tem uma única
+        tentativa, sem esperas.
+        """
+        from .models import CDNProvider, PendingInvalidation
+
+        claim = self.claim()
+        pending = {}
+        for provider_id, path in PendingInvalidation.objects.filter(claim=claim).values_list('provider_id', 'path'):
+            pending.setdefault(provider_id, set()).add(path)
+        if not pending:
+            return 0
+
+        sent = 0
+        providers = CDNProvider.objects.in_bulk(list(pending))
+        for pk, paths in pending.items():
+            provider = providers.get(pk)
+            if provider is None:
+                continue
+            failed = False
+            for batch in build_batches(provider, paths):
+                if self._submit(provider, batch, retry=retry):
+                    sent += 1
+                else:
+                    failed = True
+
+            claimed = PendingInvalidation.objects.filter(provider_id=pk, claim=claim)
+            if failed:
+                # Os lotes são reagrupados no próximo envio: todos os caminhos voltam para a fila
+                claimed.update(claim='', claimed_at=None)
+            else:
+                claimed.delete()
+        return sent
+
+    def _submit(self, provider, batch, retry=True):
+        max_retries = getattr(settings, 'CDN_INVALIDATION_MAX_RETRIES', 3) if retry else 0
+        retry_delay = getattr(settings, 'CDN_INVALIDATION_RETRY_DELAY', 1)
+        caller_reference = make_caller_reference(batch)
+
+        for attempt in range(max_retries + 1):
+            try:
+                provider.send_invalidation(batch, caller_reference)
+                return True
+            except Exception as e:
+                if attempt == max_retries:
+                    logger.error(f'Falha ao invalidar {len(batch)} caminho(s) em {provider}: {e}')
+                    return False
+                logger.warning(f'Erro ao invalidar o cache de {provider} (tentativa {attempt + 1}): {e}')
+                time.sleep(retry_delay * 2 ** attempt)
+
+
+invalidation_queue = InvalidationQueue()
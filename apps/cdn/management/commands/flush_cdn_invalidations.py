@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.cdn.invalidation import invalidation_queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Envia as invalidações de cache do CDN pendentes, inclusive as que falharam '
+        '(alternativa à tarefa flush_invalidations quando não há Celery beat).'
+    )
+
+    def handle(self, *args, **options):
+        sent = invalidation_queue.flush()
+        self.stdout.write(self.style.SUCCESS(f'{sent} lote(s) de invalidação enviado(s).'))
@@ -0,0 +1,29 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Processa o conteúdo das páginas ainda sem conteúdo processado (por exemplo depois '
+        'de trocar, desativar ou excluir o provedor CDN), enviando as mídias ao provedor atual.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Páginas por transação')
+
+    def handle(self, *args, **options):
+        if not apps.is_installed('apps.pages'):
+            raise CommandError('O app de páginas não está instalado.')
+        Page = apps.get_model('pages', 'Page')
+
+        rendered = 0
+        pages = Page.objects.filter(rendered_content='').exclude(content='').only('pk', 'content')
+        pending = list(pages.values_list('pk', flat=True))
+        for start in range(0, len(pending), options['batch_size']):
+            with transaction.atomic():
+                for page in pages.filter(pk__in=pending[start:start + options['batch_size']]):
+                    # update(): sem alterar updated_at nem criar versões
+                    Page.objects.filter(pk=page.pk).update(rendered_content=page.render_content())
+                    rendered += 1
+        self.stdout.write(self.style.SUCCESS(f'{rendered} página(s) processada(s).'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.cdn.models import ReplicatedFile
+
+
+class Command(BaseCommand):
+    help = (
+        'Reprocessa as réplicas no CDN pendentes ou interrompidas cuja próxima tentativa já venceu '
+        '(alternativa à tarefa retry_replications quando não há Celery beat).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Máximo de arquivos por execução')
+
+    def handle(self, *args, **options):
+        done, failed = ReplicatedFile.retry_due(limit=options['limit'])
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(f'{done} arquivo(s) replicado(s), {failed} com erro.'))
@@ -0,0 +1,192 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from apps.cdn.content import file_sha256
+from apps.cdn.models import CDNProvider
+
+
+MANIFEST_NAME = '.cdn-manifest.json'
+CHECKPOINT_INTERVAL = 5  # segundos entre as gravações do checkpoint
+
+
+class Command(BaseCommand):
+    help = (
+        'Envia os arquivos do MEDIA_ROOT para um provedor CDN. Apenas arquivos novos '
+        'ou alterados (segundo o manifesto de hashes do provedor) são enviados, em paralelo. '
+        'Uma sincronização interrompida continua de onde parou.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('provider', help='ID ou nome do provedor CDN')
+        parser.add_argument('--workers', type=int, default=8, help='Número de envios simultâneos')
+        parser.add_argument('--prefix', default='', help='Diretório de destino no provedor')
+        parser.add_argument('--checkpoint', help='Arquivo de checkpoint (padrão: MEDIA_ROOT/.cdn-sync-<id>.json)')
+        parser.add_argument('--restart', action='store_true', help='Ignora o checkpoint de uma execução anterior')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas lista os arquivos que seriam enviados')
+
+    def handle(self, *args, **options):
+        provider = self.get_provider(options['provider'])
+        self.storage = provider.get_storage()
+        self.media_root = os.path.abspath(settings.MEDIA_ROOT)
+        self.prefix = options['prefix'].strip('/')
+
+        if isinstance(self.storage, FileSystemStorage) and os.path.abspath(self.storage.location) == self.media_root:
+            raise CommandError(f'O provedor "{provider}" grava no próprio MEDIA_ROOT: não há o que sincronizar.')
+
+        self.checkpoint_path = options['checkpoint'] or os.path.join(
+            self.media_root, f'.cdn-sync-{provider.pk}.json'
+        )
+        if options['restart'] and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        self.manifest = self.load_manifest()
+        self.dry_run = options['dry_run']
+
+        uploaded, skipped, failed = self.sync(max(1, options['workers']))
+
+        if not self.dry_run:
+            self.save_manifest()
+            if not failed and os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(
+            f'{uploaded} arquivo(s) enviado(s), {skipped} sem alteração, {failed} com erro.'
+        ))
+
+    def get_provider(self, value):
+        lookup = {'pk': value} if value.isdigit() else {'name': value}
+        try:
+            return CDNProvider.objects.get(**lookup)
+        except CDNProvider.DoesNotExist:
+            raise CommandError(f'Provedor CDN "{value}" não encontrado.')
+
+    def remote_name(self, relative_path):
+        return f'{self.prefix}/{relative_path}' if self.prefix else relative_path
+
+    def load_manifest(self):
+        """
+        Manifesto do que o provedor já possui ({caminho: {sha256, size, mtime}}),
+        completado pelo checkpoint de uma execução interrompida.
+        """
+        manifest = {}
+        manifest_name = self.remote_name(MANIFEST_NAME)
+        if self.storage.exists(manifest_name):
+            with self.storage.open(manifest_name) as f:
+                manifest.update(json.loads(f.read()))
+
+        checkpoint = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+            manifest.update(checkpoint)
+            self.stdout.write(f'Continuando a partir do checkpoint ({len(checkpoint)} arquivo(s) já enviados).')
+        # O checkpoint é regravado por inteiro: as entradas da execução anterior precisam continuar nele
+        self.checkpoint = dict(checkpoint)
+        return manifest
+
+    def save_manifest(self):
+        manifest_name = self.remote_name(MANIFEST_NAME)
+        if self.storage.exists(manifest_name):
+            self.storage.delete(manifest_name)
+        self.storage.save(manifest_name, ContentFile(json.dumps(self.manifest, sort_keys=True).encode()))
+
+    def save_checkpoint(self):
+        # Gravação atômica: um checkpoint corrompido faria a próxima execução recomeçar
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def walk_media(self):
+        for directory, subdirectories, filenames in os.walk(self.media_root):
+            # Diretórios e arquivos ocultos (checkpoint, manifesto…) não são enviados
+            subdirectories[:] = sorted(d for d in subdirectories if not d.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, self.media_root).replace(os.sep, '/'), path
+
+    def process(self, relative_path, path):
+        """
+        Executado pelas threads: compara o arquivo com o manifesto e o envia se necessário.
+        Retorna a entrada do manifesto, ou None se o arquivo não mudou.
+        """
+        stat = os.stat(path)
+        known = self.manifest.get(relative_path)
+        if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime:
+            return None
+
+        entry = {'sha256': file_sha256(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        if known and known['sha256'] == entry['sha256']:
+            # Apenas a data mudou: atualiza o manifesto sem reenviar
+            return dict(entry, uploaded=False)
+
+        if not self.dry_run:
+            name = self.remote_name(relative_path)
+            if self.storage.exists(name):
+                self.storage.delete(name)
+            with open(path, 'rb') as f:
+                self.storage.save(name, File(f, name=name))
+        return dict(entry, uploaded=True)
+
+    def sync(self, workers):
+        uploaded = skipped = failed = 0
+        last_checkpoint = time.monotonic()
+
+        def collect(done):
+            nonlocal uploaded, skipped, failed
+            for future in done:
+                relative_path = pending.pop(future)
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'Erro ao enviar {relative_path}: {e}')
+                    continue
+
+                if entry is None:
+                    skipped += 1
+                    continue
+
+                if entry.pop('uploaded'):
+                    uploaded += 1
+                    self.stdout.write(f'{"[simulação] " if self.dry_run else ""}{relative_path}')
+                else:
+                    skipped += 1
+                self.manifest[relative_path] = self.checkpoint[relative_path] = entry
+
+        pending = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for relative_path, path in self.walk_media():
+                    # Limita os arquivos em andamento para não carregar a lista inteira em memória
+                    if len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+
+                    pending[executor.submit(self.process, relative_path, path)] = relative_path
+
+                    if not self.dry_run and time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                        self.save_checkpoint()
+                        last_checkpoint = time.monotonic()
+
+                collect(wait(pending).done)
+            except BaseException:
+                # Interrompido: os arquivos ainda não iniciados são descartados
+                for future in pending:
+                    future.cancel()
+                raise
+            finally:
+                # Interrompido ou não, o que já foi enviado fica registrado no checkpoint
+                if not self.dry_run and self.checkpoint:
+                    self.save_checkpoint()
+
+        return uploaded, skipped, failed
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CDNBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_hash', models.CharField(max_length=64, verbose_name='Hash do arquivo')),
+                ('name', models.CharField(max_length=255, verbose_name='Caminho no storage')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Tamanho')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Tipo de conteúdo')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Referências')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Conteúdo CDN',
+                'verbose_name_plural': 'Conteúdos CDN',
+            },
+        ),
+        migrations.CreateModel(
+            name='CDNProvider',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nome')),
+                ('provider_type', models.CharField(choices=[('s3', 'Amazon S3'), ('cloudfront', 'Amazon CloudFront'), ('cloudflare', 'Cloudflare'), ('bunny', 'Bunny.net'), ('custom', 'Custom CDN')], max_length=20, verbose_name='Tipo de Provedor')),
+                ('base_url', models.URLField(help_text='URL base do CDN (ex: https://cdn.example.com/)', max_length=255, verbose_name='URL Base')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('s3_bucket_name', models.CharField(blank=True, max_length=255, verbose_name='Nome do Bucket S3')),
+                ('s3_region', models.CharField(blank=True, max_length=50, verbose_name='Região S3')),
+                ('s3_access_key', models.CharField(blank=True, max_length=255, verbose_name='Access Key ID')),
+                ('s3_secret_key', models.CharField(blank=True, max_length=255, verbose_name='Secret Access Key')),
+                ('cloudflare_account_id', models.CharField(blank=True, max_length=255, verbose_name='ID da Conta Cloudflare')),
+                ('cloudflare_api_token', models.CharField(blank=True, max_length=255, verbose_name='Token API Cloudflare')),
+                ('bunny_storage_zone', models.CharField(blank=True, max_length=255, verbose_name='Zona de Armazenamento Bunny.net')),
+                ('bunny_api_key', models.CharField(blank=True, max_length=255, verbose_name='Chave API Bunny.net')),
+                ('custom_headers', models.TextField(blank=True, help_text='Cabeçalhos HTTP para enviar com as requisições, um por linha (nome: valor)', verbose_name='Cabeçalhos HTTP Personalizados')),
+                ('invalidation_url', models.URLField(blank=True, help_text='URL para API de invalidação de cache', max_length=255, verbose_name='URL de Invalidação')),
+                ('use_signed_urls', models.BooleanField(default=False, help_text='Gerar URLs assinadas para acesso seguro aos arquivos', verbose_name='Usar URLs Assinadas')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Provedor CDN',
+                'verbose_name_plural': 'Provedores CDN',
+            },
+        ),
+        migrations.CreateModel(
+            name='CDNFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='cdn_files/', verbose_name='Arquivo')),
+                ('original_filename', models.CharField(max_length=255, verbose_name='Nome original do arquivo')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Tipo de conteúdo')),
+                ('file_size', models.PositiveIntegerField(verbose_name='Tamanho do arquivo')),
+                ('file_hash', models.CharField(db_index=True, max_length=64, verbose_name='Hash do arquivo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('blob', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='cdn.cdnblob', verbose_name='Conteúdo')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cdn.cdnprovider', verbose_name='Provedor CDN')),
+            ],
+            options={
+                'verbose_name': 'Arquivo CDN',
+                'verbose_name_plural': 'Arquivos CDN',
+            },
+        ),
+        migrations.AddField(
+            model_name='cdnblob',
+            name='provider',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blobs', to='cdn.cdnprovider', verbose_name='Provedor CDN'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cdnblob',
+            unique_together={('provider', 'file_hash')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdn', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cdnblob',
+            name='pinned',
+            field=models.BooleanField(default=False, help_text='Usado no conteúdo das páginas: não é removido junto com os arquivos', verbose_name='Fixado'),
+        ),
+    ]
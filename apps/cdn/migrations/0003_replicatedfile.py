@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdn', '0002_cdnblob_pinned'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicatedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Caminho do arquivo')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('replicating', 'Em replicação'), ('done', 'Replicado'), ('failed', 'Falhou')], db_index=True, default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último erro')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa')),
+                ('replicated_at', models.DateTimeField(blank=True, null=True, verbose_name='Replicado em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='replicas', to='cdn.cdnprovider', verbose_name='Provedor CDN')),
+            ],
+            options={
+                'verbose_name': 'Réplica CDN',
+                'verbose_name_plural': 'Réplicas CDN',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='cdn_replica_status_f3ccd6_idx')],
+                'unique_together': {('provider', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-19 21:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdn', '0003_replicatedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024, verbose_name='Caminho')),
+                ('claim', models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Envio')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Reservado em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_invalidations', to='cdn.cdnprovider', verbose_name='Provedor CDN')),
+            ],
+            options={
+                'verbose_name': 'Invalidação pendente',
+                'verbose_name_plural': 'Invalidações pendentes',
+                'unique_together': {('provider', 'path')},
+            },
+        ),
+    ]
@@ -1,17 +1,184 @@
 # your_cms_app/cdn/models.py
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.core.files import File
 from django.core.files.storage import Storage, FileSystemStorage
 from django.utils.deconstruct import deconstructible
+import io
+import logging
 import os
+import threading
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
 import hashlib
-import time
 import mimetypes
-import requests
 from urllib.parse import urljoin, urlparse
+from utils.cache import cdn_cache
+from utils.http import get_http_client
+
+
+logger = logging.getLogger('cdn')
+
+S3_READ_BUFFER_SIZE = 1024 * 1024
+S3_DELETE_BATCH_SIZE = 1000
+
+# Objetos gravados com o hash no caminho nunca mudam e podem ser servidos como imutáveis
+CONTENT_ADDRESSED_PREFIX = 'cdn/sha256/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def content_addressed_name(file_hash, filename):
+    """
+    Caminho derivado do hash do conteúdo: cdn/sha256/ab/cd/abcd….ext
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{CONTENT_ADDRESSED_PREFIX}{file_hash[:2]}/{file_hash[2:4]}/{file_hash}{extension}'
+
+
+def get_boto3_client(service, access_key, secret_key, region):
+    """
+    Retorna o cliente boto3 compartilhado para as credenciais informadas.
+    Os clientes são thread-safe e mantêm um pool de conexões: criar um por
+    instância de storage descartaria as conexões a cada uso.
+    """
+    endpoint_url = getattr(settings, 'CDN_S3_ENDPOINT_URL', None) if service == 's3' else None
+    key = (service, access_key, secret_key, region, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                # Sessions não são thread-safe: cada cliente é criado na sua própria sessão
+                session = boto3.session.Session(
+                    aws_access_key_id=access_key or None,
+                    aws_secret_access_key=secret_key or None,
+                    region_name=region or None
+                )
+                client = session.client(
+                    service,
+                    endpoint_url=endpoint_url,
+                    config=BotoConfig(
+                        max_pool_connections=getattr(settings, 'CDN_S3_MAX_POOL_CONNECTIONS', 50),
+                        retries={'max_attempts': 5, 'mode': 'adaptive'},
+                        tcp_keepalive=True
+                    )
+                )
+                _clients[key] = client
+    return client
+
+
+def get_transfer_config():
+    return TransferConfig(
+        multipart_threshold=getattr(settings, 'CDN_S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+        multipart_chunksize=getattr(settings, 'CDN_S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+        max_concurrency=getattr(settings, 'CDN_S3_MAX_CONCURRENCY', 4),
+        use_threads=True
+    )
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Leitor de um objeto do S3 que busca cada trecho com uma requisição Range.
+    Leituras do restante do objeto (read() e read(-1)) usam uma única requisição.
+    """
+    def __init__(self, client, bucket_name, key, size):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        self.position = max(0, self.position)
+        return self.position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return self.readall()
+        return super().read(size)
+
+    def readall(self):
+        """
+        O resto do objeto em uma única requisição (RawIOBase.readall faria uma
+        requisição a cada DEFAULT_BUFFER_SIZE bytes).
+        """
+        if self.position >= self.size:
+            return b''
+        params = {'Bucket': self.bucket_name, 'Key': self.key}
+        if self.position:
+            params['Range'] = f'bytes={self.position}-'
+        data = self.client.get_object(**params)['Body'].read()
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        if self.position >= self.size or not len(buffer):
+            return 0
+
+        end = min(self.position + len(buffer), self.size) - 1
+        response = self.client.get_object(
+            Bucket=self.bucket_name, Key=self.key, Range=f'bytes={self.position}-{end}'
+        )
+        data = response['Body'].read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class StorageRegistry:
+    """
+    Objetos Storage dos provedores, mantidos por processo e indexados por
+    (pk, updated_at): alterar o provedor gera uma nova chave e um novo storage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._storages = {}
+
+    def get(self, provider):
+        if provider.pk is None:
+            return provider.build_storage()
+
+        version = provider.updated_at
+        entry = self._storages.get(provider.pk)
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._storages.get(provider.pk)
+                if entry is None or entry[0] != version:
+                    entry = (version, provider.build_storage())
+                    self._storages[provider.pk] = entry
+        return entry[1]
+
+    def discard(self, provider_pk):
+        with self._lock:
+            self._storages.pop(provider_pk, None)
+
+
+storage_registry = StorageRegistry()
 
 
 class CDNProvider(models.Model):
@@ -72,12 +239,7 @@ class CDNProvider(models.Model):
         """
         if self.provider_type == 's3' or self.provider_type == 'cloudfront':
             # Retorna cliente S3
-            return boto3.client(
-                's3',
-                aws_access_key_id=self.s3_access_key,
-                aws_secret_access_key=self.s3_secret_key,
-                region_name=self.s3_region
-            )
+            return get_boto3_client('s3', self.s3_access_key, self.s3_secret_key, self.s3_region)
         elif self.provider_type == 'cloudflare':
             # Inicializa o cliente Cloudflare (seria necessário uma biblioteca adicional)
             return None
@@ -90,7 +252,14 @@ class CDNProvider(models.Model):
     
     def get_storage(self):
         """
-        Retorna um objeto Storage para este provedor CDN
+        Retorna o objeto Storage deste provedor CDN, compartilhado pelo processo
+        e recriado apenas quando o provedor é alterado (updated_at).
+        """
+        return storage_registry.get(self)
+
+    def build_storage(self):
+        """
+        Cria um novo objeto Storage para este provedor CDN
         """
         if self.provider_type == 's3' or self.provider_type == 'cloudfront':
             return S3Storage(
@@ -98,158 +267,276 @@ class CDNProvider(models.Model):
                 access_key=self.s3_access_key,
                 secret_key=self.s3_secret_key,
                 region=self.s3_region,
-                base_url=self.base_url if self.provider_type == 'cloudfront' else None
+                # CloudFront serve sempre pelo base_url: URLs pré-assinadas do S3 contornariam a distribuição
+                base_url=self.base_url if self.provider_type == 'cloudfront' else None,
             )
         elif self.provider_type == 'custom':
             return CDNProxyStorage(
                 base_url=self.base_url,
-                local_storage=FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+                local_storage=FileSystemStorage()
             )
         else:
-            # Se não tiver implementação específica, usa o armazenamento padrão
-            return FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+            # Se não tiver implementação específica, usa o armazenamento padrão (MEDIA_ROOT/MEDIA_URL)
+            return FileSystemStorage()
     
     def invalidate_cache(self, paths):
         """
-        Invalida o cache para os caminhos fornecidos
+        Agenda a invalidação do cache para os caminhos fornecidos.
+        Os caminhos são agrupados com os de outras chamadas e enviados em lote
+        pela fila de invalidação (apps.cdn.invalidation).
         """
         if not paths:
             return False
-            
+
+        from .invalidation import invalidation_queue
+        invalidation_queue.enqueue(self, paths)
+        return True
+
+    def send_invalidation(self, paths, caller_reference):
+        """
+        Envia uma requisição de invalidação ao provedor. Levanta uma exceção em
+        caso de falha, para que a fila possa tentar novamente.
+        `caller_reference` identifica o lote: é o mesmo em todas as tentativas,
+        o que evita invalidações duplicadas no CloudFront.
+        """
         if self.provider_type == 'cloudfront':
-            # Invalidação CloudFront
-            try:
-                cloudfront = boto3.client(
-                    'cloudfront',
-                    aws_access_key_id=self.s3_access_key,
-                    aws_secret_access_key=self.s3_secret_key,
-                    region_name=self.s3_region
-                )
-                
-                # Obtém o ID da distribuição CloudFront
-                distribution_id = self.base_url.split('.')[-3]  # Método simples para extrair o ID
-                
-                # Cria a solicitação de invalidação
-                response = cloudfront.create_invalidation(
-                    DistributionId=distribution_id,
-                    InvalidationBatch={
-                        'Paths': {
-                            'Quantity': len(paths),
-                            'Items': paths
-                        },
-                        'CallerReference': str(int(time.time()))
-                    }
-                )
-                
-                return True
-            except Exception as e:
-                print(f"Erro ao invalidar cache CloudFront: {str(e)}")
-                return False
-        
-        elif self.provider_type == 'cloudflare' and self.invalidation_url:
-            # Invalidação Cloudflare
-            try:
-                headers = {
-                    'Authorization': f'Bearer {self.cloudflare_api_token}',
-                    'Content-Type': 'application/json'
-                }
-                data = {
-                    'files': paths
-                }
-                response = requests.post(self.invalidation_url, headers=headers, json=data)
-                return response.status_code == 200
-            except Exception as e:
-                print(f"Erro ao invalidar cache Cloudflare: {str(e)}")
-                return False
-        
-        elif self.provider_type == 'bunny' and self.invalidation_url:
-            # Invalidação Bunny.net
-            try:
-                headers = {
-                    'AccessKey': self.bunny_api_key,
-                    'Content-Type': 'application/json'
-                }
-                data = {
-                    'paths': paths
+            cloudfront = get_boto3_client('cloudfront', self.s3_access_key, self.s3_secret_key, self.s3_region)
+
+            # Obtém o ID da distribuição CloudFront
+            distribution_id = self.base_url.split('.')[-3]  # Método simples para extrair o ID
+
+            cloudfront.create_invalidation(
+                DistributionId=distribution_id,
+                InvalidationBatch={
+                    'Paths': {
+                        'Quantity': len(paths),
+                        'Items': list(paths)
+                    },
+                    'CallerReference': caller_reference
                 }
-                response = requests.post(self.invalidation_url, headers=headers, json=data)
-                return response.status_code == 200
-            except Exception as e:
-                print(f"Erro ao invalidar cache Bunny.net: {str(e)}")
-                return False
-        
-        elif self.provider_type == 'custom' and self.invalidation_url:
-            # Invalidação personalizada
-            try:
-                headers = {}
-                if self.custom_headers:
-                    for line in self.custom_headers.split('\n'):
+            )
+            return
+
+        if not self.invalidation_url:
+            return
+
+        if self.provider_type == 'cloudflare':
+            headers = {
+                'Authorization': f'Bearer {self.cloudflare_api_token}',
+                'Content-Type': 'application/json'
+            }
+            data = {'files': list(paths)}
+        elif self.provider_type == 'bunny':
+            headers = {
+                'AccessKey': self.bunny_api_key,
+                'Content-Type': 'application/json'
+            }
+            data = {'paths': list(paths)}
+        elif self.provider_type == 'custom':
+            headers = {}
+            if self.custom_headers:
+                for line in self.custom_headers.splitlines():
+                    if ':' in line:
                         key, value = line.split(':', 1)
                         headers[key.strip()] = value.strip()
-                
-                data = {
-                    'paths': paths
-                }
-                response = requests.post(self.invalidation_url, headers=headers, json=data)
-                return response.status_code == 200
-            except Exception as e:
-                print(f"Erro ao invalidar cache personalizado: {str(e)}")
-                return False
-        
-        return False
+            data = {'paths': list(paths)}
+        else:
+            return
+
+        # A fila de invalidação já repete os envios com falha: sem novas tentativas aqui
+        response = get_http_client().post(self.invalidation_url, headers=headers, json=data, retries=0)
+        response.raise_for_status()
 
 
 @deconstructible
 class S3Storage(Storage):
     """
-    Storage personalizado para Amazon S3
+    Storage para Amazon S3 (ou serviço compatível).
+
+    - Uploads em streaming: arquivos grandes são enviados em partes (multipart),
+      com memória limitada a CDN_S3_MULTIPART_CHUNKSIZE × CDN_S3_MAX_CONCURRENCY;
+    - Leituras por intervalo: open() não baixa o arquivo inteiro, cada leitura
+      busca apenas o trecho pedido;
+    - O cliente boto3 é compartilhado entre as instâncias com as mesmas credenciais.
     """
-    def __init__(self, bucket_name, access_key, secret_key, region, base_url=None):
+    def __init__(self, bucket_name, access_key, secret_key, region, base_url=None,
+                 signed_urls=False, expires_in=None):
         self.bucket_name = bucket_name
         self.access_key = access_key
         self.secret_key = secret_key
         self.region = region
         self.base_url = base_url
-        self.client = boto3.client(
-            's3',
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
+        # Sem base_url (S3 direto) as URLs são sempre assinadas
+        self.signed_urls = signed_urls
+        self.expires_in = expires_in
+
+    @property
+    def client(self):
+        return get_boto3_client('s3', self.access_key, self.secret_key, self.region)
+
+    def _normalize_name(self, name):
+        return name.replace('\\', '/').lstrip('/')
+
+    def _head(self, name):
+        """
+        Metadados do objeto, ou None se ele não existir.
+        """
+        try:
+            return self.client.head_object(Bucket=self.bucket_name, Key=self._normalize_name(name))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
 
     def _open(self, name, mode='rb'):
-        # Implementação para abrir um arquivo
-        pass
+        if 'w' in mode or 'a' in mode or '+' in mode:
+            raise ValueError(_('Os arquivos do S3 são abertos somente para leitura.'))
+
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+
+        reader = S3RangeReader(self.client, self.bucket_name, self._normalize_name(name), head['ContentLength'])
+        return File(io.BufferedReader(reader, buffer_size=S3_READ_BUFFER_SIZE), name)
 
     def _save(self, name, content):
-        # Implementação para salvar um arquivo
-        pass
+        name = self._normalize_name(name)
+        content_type = (
+            getattr(content, 'content_type', None)
+            or mimetypes.guess_type(name)[0]
+            or 'application/octet-stream'
+        )
+
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        extra_args = {'ContentType': content_type}
+        if name.startswith(CONTENT_ADDRESSED_PREFIX):
+            extra_args['CacheControl'] = IMMUTABLE_CACHE_CONTROL
+
+        # upload_fileobj lê o arquivo em partes e as envia em paralelo
+        self.client.upload_fileobj(
+            getattr(content, 'file', None) or content,
+            self.bucket_name,
+            name,
+            ExtraArgs=extra_args,
+            Config=get_transfer_config()
+        )
+        return name
+
+    def open_range(self, name, start, end=None):
+        """
+        Retorna os bytes de start até end (inclusive) sem abrir o arquivo inteiro.
+        """
+        byte_range = f'bytes={start}-{"" if end is None else end}'
+        response = self.client.get_object(
+            Bucket=self.bucket_name, Key=self._normalize_name(name), Range=byte_range
+        )
+        return response['Body'].read()
 
     def delete(self, name):
-        # Implementação para deletar um arquivo
-        pass
+        self.client.delete_object(Bucket=self.bucket_name, Key=self._normalize_name(name))
+
+    def delete_many(self, names):
+        """
+        Remove vários arquivos com uma requisição a cada 1000 nomes.
+        """
+        keys = [{'Key': self._normalize_name(name)} for name in names]
+        for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            self.client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': keys[i:i + S3_DELETE_BATCH_SIZE], 'Quiet': True}
+            )
 
     def exists(self, name):
-        # Implementação para verificar se um arquivo existe
-        pass
+        return self._head(name) is not None
+
+    def exists_many(self, names):
+        """
+        Retorna o conjunto dos nomes existentes. Os nomes são agrupados por diretório
+        e cada diretório é listado uma vez, em vez de uma requisição por arquivo.
+        """
+        by_prefix = {}
+        for name in names:
+            key = self._normalize_name(name)
+            prefix = key.rsplit('/', 1)[0] + '/' if '/' in key else ''
+            by_prefix.setdefault(prefix, {})[key] = name
+
+        existing = set()
+        paginator = self.client.get_paginator('list_objects_v2')
+        for prefix, keys in by_prefix.items():
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, Delimiter='/'):
+                for obj in page.get('Contents', []):
+                    if obj['Key'] in keys:
+                        existing.add(keys[obj['Key']])
+        return existing
 
     def listdir(self, path):
-        # Implementação para listar diretórios
-        pass
+        prefix = self._normalize_name(path)
+        if prefix and not prefix.endswith('/'):
+            prefix += '/'
+
+        directories, files = [], []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, Delimiter='/'):
+            directories.extend(
+                common['Prefix'][len(prefix):].rstrip('/') for common in page.get('CommonPrefixes', [])
+            )
+            files.extend(obj['Key'][len(prefix):] for obj in page.get('Contents', []))
+        return directories, files
 
     def size(self, name):
-        # Implementação para obter o tamanho do arquivo
-        pass
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+        return head['ContentLength']
+
+    def get_modified_time(self, name):
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+        return head['LastModified']
 
     def url(self, name):
-        # Implementação para gerar a URL do arquivo
-        if self.base_url:
-            return urljoin(self.base_url, name)
-        return self.client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': self.bucket_name, 'Key': name},
-            ExpiresIn=3600
-        )
+        return self.urls([name])[name]
+
+    def urls(self, names):
+        """
+        Retorna {nome: url} para vários arquivos. As URLs assinadas ficam em cache
+        até CDN_SIGNED_URL_MARGIN segundos antes de expirarem: apenas as que não
+        estão no cache são assinadas, e o cache é lido e gravado de uma só vez.
+        """
+        keys = {name: self._normalize_name(name) for name in names}
+        if self.base_url and not self.signed_urls:
+            return {name: urljoin(self.base_url, key) for name, key in keys.items()}
+
+        expires_in = self.expires_in or getattr(settings, 'CDN_SIGNED_URL_EXPIRY', 3600)
+        cache_keys = {name: self._signed_url_cache_key(key, expires_in) for name, key in keys.items()}
+        cached = cdn_cache.get_many(list(cache_keys.values()))
+
+        urls, signed = {}, {}
+        for name, key in keys.items():
+            url = cached.get(cache_keys[name])
+            if url is None:
+                url = signed[cache_keys[name]] = self.client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.bucket_name, 'Key': key},
+                    ExpiresIn=expires_in
+                )
+            urls[name] = url
+
+        timeout = expires_in - getattr(settings, 'CDN_SIGNED_URL_MARGIN', 300)
+        if signed and timeout > 0:
+            cdn_cache.set_many(signed, timeout)
+        return urls
+
+    def _signed_url_cache_key(self, key, expires_in):
+        # A assinatura depende de toda a identidade do cliente, inclusive a chave secreta e o endpoint
+        endpoint_url = getattr(settings, 'CDN_S3_ENDPOINT_URL', None)
+        identity = '\0'.join(str(part) for part in (
+            self.access_key, self.secret_key, self.region, endpoint_url, self.bucket_name, expires_in, key
+        ))
+        return 'signed_url_' + hashlib.sha1(identity.encode()).hexdigest()
 
 
 @deconstructible
@@ -283,6 +570,121 @@ class CDNProxyStorage(Storage):
         return urljoin(self.base_url, name)
 
 
+class CDNBlob(models.Model):
+    """
+    Conteúdo armazenado no CDN, identificado pelo hash SHA-256.
+    Arquivos com o mesmo conteúdo compartilham o mesmo objeto no storage;
+    ref_count conta os CDNFile que o usam e o objeto só é removido quando chega a zero.
+    Blobs fixados (pinned) são referenciados pelo conteúdo das páginas e nunca são removidos.
+    """
+    provider = models.ForeignKey(CDNProvider, on_delete=models.CASCADE, related_name='blobs', verbose_name=_('Provedor CDN'))
+    file_hash = models.CharField(_('Hash do arquivo'), max_length=64)
+    name = models.CharField(_('Caminho no storage'), max_length=255)
+    size = models.PositiveBigIntegerField(_('Tamanho'))
+    content_type = models.CharField(_('Tipo de conteúdo'), max_length=100)
+    ref_count = models.PositiveIntegerField(_('Referências'), default=0)
+    pinned = models.BooleanField(_('Fixado'), default=False,
+                                 help_text=_('Usado no conteúdo das páginas: não é removido junto com os arquivos'))
+    created_at = models.DateTimeField(_('Criado em'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Conteúdo CDN')
+        verbose_name_plural = _('Conteúdos CDN')
+        unique_together = ('provider', 'file_hash')
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def acquire(cls, provider, content, file_hash, filename, content_type, pin=False):
+        """
+        Retorna o blob do conteúdo, enviando-o ao storage apenas se ainda não existir,
+        e incrementa o contador de referências (ou, com pin=True, fixa o blob).
+
+        O envio é feito antes do bloqueio, no caminho derivado do hash: o bloqueio
+        só cobre a criação do registro e o incremento do contador. Um envio que
+        acabe sem uso (outro processo criou o blob antes, ou houve erro) é removido.
+        """
+        storage = provider.get_storage()
+        existing = cls.objects.filter(provider=provider, file_hash=file_hash).first()
+
+        name = existing.name if existing is not None else content_addressed_name(file_hash, filename)
+        uploaded = None
+        if not storage.exists(name):
+            name = content_addressed_name(file_hash, filename)
+            if not storage.exists(name):
+                content.seek(0)
+                uploaded = name = storage.save(name, content)
+
+        try:
+            with transaction.atomic():
+                # O bloqueio impede que outro processo remova o objeto enquanto ele é reutilizado
+                blob, created = cls.objects.select_for_update().get_or_create(
+                    provider=provider,
+                    file_hash=file_hash,
+                    defaults={
+                        'name': name,
+                        'size': content.size,
+                        'content_type': content_type,
+                        'pinned': pin,
+                    }
+                )
+
+                if not created and blob.name != name:
+                    if existing is not None:
+                        # O objeto do blob não existia mais no storage: passa a usar o novo envio
+                        blob.name = name
+                        blob.save(update_fields=['name'])
+                    elif uploaded is not None:
+                        # Outro processo criou o blob enquanto o arquivo era enviado
+                        transaction.on_commit(lambda: storage.delete(uploaded))
+
+                if pin:
+                    if not blob.pinned:
+                        blob.pinned = True
+                        blob.save(update_fields=['pinned'])
+                else:
+                    cls.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        except BaseException:
+            if uploaded is not None and not cls.objects.filter(provider=provider, name=uploaded).exists():
+                storage.delete(uploaded)
+            raise
+        return blob
+
+    def release(self):
+        """
+        Remove uma referência. O objeto é apagado do storage (após o commit)
+        quando nenhum arquivo o usa mais.
+        """
+        with transaction.atomic():
+            blob = CDNBlob.objects.select_for_update().select_related('provider').filter(pk=self.pk).first()
+            if blob is None:
+                return
+
+            if blob.ref_count > 1:
+                CDNBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+
+            if blob.pinned:
+                CDNBlob.objects.filter(pk=blob.pk).update(ref_count=0)
+                return
+
+            blob.delete()
+            storage = blob.provider.get_storage()
+            transaction.on_commit(lambda: storage.delete(blob.name))
+
+
+class CDNFileQuerySet(models.QuerySet):
+    def with_provider(self):
+        return self.select_related('provider')
+
+    def urls(self):
+        """
+        Retorna {pk: url} para todos os arquivos do queryset em uma consulta.
+        """
+        return resolve_file_urls(self.with_provider())
+
+
 class CDNFile(models.Model):
     """
     Modelo para representar arquivos armazenados no CDN
@@ -292,10 +694,14 @@ class CDNFile(models.Model):
     original_filename = models.CharField(_('Nome original do arquivo'), max_length=255)
     content_type = models.CharField(_('Tipo de conteúdo'), max_length=100)
     file_size = models.PositiveIntegerField(_('Tamanho do arquivo'))
-    file_hash = models.CharField(_('Hash do arquivo'), max_length=64)
+    file_hash = models.CharField(_('Hash do arquivo'), max_length=64, db_index=True)
+    blob = models.ForeignKey(CDNBlob, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                             related_name='files', verbose_name=_('Conteúdo'))
     created_at = models.DateTimeField(_('Criado em'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Atualizado em'), auto_now=True)
 
+    objects = CDNFileQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Arquivo CDN')
         verbose_name_plural = _('Arquivos CDN')
@@ -305,9 +711,27 @@ class CDNFile(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.pk:  # Se é um novo arquivo
+            upload = getattr(self.file, '_file', None)
+            self.original_filename = self.original_filename or os.path.basename(self.file.name)
             self.file_size = self.file.size
-            self.content_type = mimetypes.guess_type(self.file.name)[0] or 'application/octet-stream'
-            self.file_hash = self.calculate_hash()
+            # Uploads recebidos pelos handlers de utils.uploadhandlers já trazem o hash e o tipo real
+            self.content_type = (
+                getattr(upload, 'sniffed_content_type', None)
+                or mimetypes.guess_type(self.file.name)[0]
+                or 'application/octet-stream'
+            )
+            self.file_hash = getattr(upload, 'sha256', None) or self.calculate_hash()
+
+            with transaction.atomic():
+                # Conteúdo já enviado é reutilizado; o arquivo passa a apontar para o caminho imutável
+                self.blob = CDNBlob.acquire(
+                    self.provider, self.file, self.file_hash, self.original_filename, self.content_type
+                )
+                self.file.name = self.blob.name
+                self.file._committed = True
+                super().save(*args, **kwargs)
+            return
+
         super().save(*args, **kwargs)
 
     def calculate_hash(self):
@@ -319,4 +743,190 @@ class CDNFile(models.Model):
 
     def get_absolute_url(self):
         """Retorna a URL absoluta do arquivo no CDN"""
-        return self.provider.get_storage().url(self.file.name)
\ No newline at end of file
+        if getattr(self, '_absolute_url', None) is None:
+            self._absolute_url = self.provider.get_storage().url(self.file.name)
+        return self._absolute_url
+
+
+def resolve_file_urls(files):
+    """
+    Calcula as URLs (inclusive assinadas) de uma lista de CDNFile de uma só vez:
+    um storage por provedor e nenhuma consulta além da leitura dos arquivos.
+    Retorna {pk: url} e guarda a URL em cada arquivo para get_absolute_url().
+    """
+    by_provider = {}
+    for cdn_file in files:
+        by_provider.setdefault(cdn_file.provider_id, []).append(cdn_file)
+
+    urls = {}
+    for provider_files in by_provider.values():
+        storage = provider_files[0].provider.get_storage()
+        names = [cdn_file.file.name for cdn_file in provider_files]
+        if hasattr(storage, 'urls'):
+            # Storages com URLs assinadas resolvem a lista inteira de uma vez
+            storage_urls = storage.urls(names)
+        else:
+            storage_urls = {name: storage.url(name) for name in names}
+
+        for cdn_file in provider_files:
+            cdn_file._absolute_url = storage_urls[cdn_file.file.name]
+            urls[cdn_file.pk] = cdn_file._absolute_url
+    return urls
+
+class ReplicatedFile(models.Model):
+    """
+    Estado da réplica no CDN de um arquivo gravado localmente pelo ReplicatedStorage.
+    Enquanto a réplica não termina, o arquivo é servido pela URL local.
+    """
+    STATUS_CHOICES = (
+        ('pending', _('Pendente')),
+        ('replicating', _('Em replicação')),
+        ('done', _('Replicado')),
+        ('failed', _('Falhou')),
+    )
+
+    provider = models.ForeignKey(CDNProvider, on_delete=models.CASCADE, related_name='replicas', verbose_name=_('Provedor CDN'))
+    name = models.CharField(_('Caminho do arquivo'), max_length=255)
+    status = models.CharField(_('Status'), max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    attempts = models.PositiveIntegerField(_('Tentativas'), default=0)
+    last_error = models.TextField(_('Último erro'), blank=True)
+    next_attempt_at = models.DateTimeField(_('Próxima tentativa'), default=timezone.now)
+    replicated_at = models.DateTimeField(_('Replicado em'), null=True, blank=True)
+    created_at = models.DateTimeField(_('Criado em'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('Atualizado em'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Réplica CDN')
+        verbose_name_plural = _('Réplicas CDN')
+        unique_together = ('provider', 'name')
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
+
+    @staticmethod
+    def cache_key(provider_pk, name):
+        return f'replica_{provider_pk}_{hashlib.sha1(name.encode()).hexdigest()}'
+
+    @classmethod
+    def schedule(cls, provider, name):
+        """
+        Registra (ou reinicia) a réplica do arquivo e a dispara após o commit.
+        """
+        replica, _created = cls.objects.update_or_create(
+            provider=provider,
+            name=name,
+            defaults={
+                'status': 'pending',
+                'attempts': 0,
+                'last_error': '',
+                'next_attempt_at': timezone.now(),
+                'replicated_at': None,
+            }
+        )
+        cdn_cache.set(cls.cache_key(provider.pk, name), False, None)
+        transaction.on_commit(replica.dispatch)
+        return replica
+
+    def dispatch(self):
+        from .tasks import replicate_file
+
+        if not getattr(settings, 'CDN_REPLICATION_ASYNC', True):
+            self.replicate()
+            return
+        try:
+            replicate_file.delay(self.pk)
+        except Exception as e:
+            # Sem worker disponível: a réplica continua pendente e é retomada por retry_due()
+            logger.warning(f'Não foi possível agendar a réplica de {self.name}: {e}')
+
+    def replicate(self, local_storage=None):
+        """
+        Copia o arquivo local para o storage do provedor. Em caso de erro, agenda
+        uma nova tentativa com espera exponencial, até CDN_REPLICATION_MAX_ATTEMPTS.
+        Retorna True se a réplica foi concluída.
+        """
+        # Reserva a réplica: outro worker com o mesmo registro desiste
+        claimed = ReplicatedFile.objects.filter(
+            pk=self.pk, status__in=('pending', 'failed')
+        ).update(status='replicating', updated_at=timezone.now())
+        if not claimed:
+            return False
+
+        local_storage = local_storage or FileSystemStorage()
+        try:
+            remote_storage = self.provider.get_storage()
+            # Provedores que servem o próprio MEDIA_ROOT (CDN de origem) não precisam de cópia
+            target = getattr(remote_storage, 'local_storage', remote_storage)
+            if not (isinstance(target, FileSystemStorage) and target.location == local_storage.location):
+                if remote_storage.exists(self.name):
+                    remote_storage.delete(self.name)
+                with local_storage.open(self.name) as f:
+                    remote_storage.save(self.name, File(f, name=self.name))
+        except Exception as e:
+            self.attempts += 1
+            max_attempts = getattr(settings, 'CDN_REPLICATION_MAX_ATTEMPTS', 5)
+            retry_delay = getattr(settings, 'CDN_REPLICATION_RETRY_DELAY', 30)
+            self.status = 'failed' if self.attempts >= max_attempts else 'pending'
+            self.last_error = str(e)
+            self.next_attempt_at = timezone.now() + timezone.timedelta(seconds=retry_delay * 2 ** (self.attempts - 1))
+            # Atualização filtrada: o arquivo pode ter sido excluído ou reenviado durante a réplica
+            ReplicatedFile.objects.filter(pk=self.pk, status='replicating').update(
+                status=self.status, attempts=self.attempts, last_error=self.last_error,
+                next_attempt_at=self.next_attempt_at, updated_at=timezone.now()
+            )
+            logger.warning(f'Falha ao replicar {self.name} em {self.provider} (tentativa {self.attempts}): {e}')
+            return False
+
+        self.status = 'done'
+        self.last_error = ''
+        self.replicated_at = timezone.now()
+        updated = ReplicatedFile.objects.filter(pk=self.pk, status='replicating').update(
+            status=self.status, last_error='', replicated_at=self.replicated_at, updated_at=timezone.now()
+        )
+        if not updated:
+            return False
+        cdn_cache.set(self.cache_key(self.provider_id, self.name), True, None)
+        return True
+
+    @classmethod
+    def retry_due(cls, limit=100):
+        """
+        Reprocessa as réplicas pendentes cuja próxima tentativa já venceu, inclusive
+        as interrompidas há mais de CDN_REPLICATION_STALE segundos.
+        Retorna (concluídas, com erro).
+        """
+        now = timezone.now()
+        stale = now - timezone.timedelta(seconds=getattr(settings, 'CDN_REPLICATION_STALE', 600))
+        cls.objects.filter(status='replicating', updated_at__lt=stale).update(status='pending', next_attempt_at=now)
+
+        done = failed = 0
+        replicas = cls.objects.filter(status='pending', next_attempt_at__lte=now).select_related('provider')
+        for replica in replicas.order_by('next_attempt_at')[:limit]:
+            if replica.replicate():
+                done += 1
+            else:
+                failed += 1
+        return done, failed
+
+
+class PendingInvalidation(models.Model):
+    """
+    Caminho aguardando a invalidação no CDN. A fila fica no banco para que
+    nenhuma invalidação se perca quando o processo que a registrou termina.
+    `claim` identifica o envio em andamento que reservou o caminho.
+    """
+    provider = models.ForeignKey(CDNProvider, on_delete=models.CASCADE, related_name='pending_invalidations',
+                                 verbose_name=_('Provedor CDN'))
+    path = models.CharField(_('Caminho'), max_length=1024)
+    claim = models.CharField(_('Envio'), max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(_('Reservado em'), null=True, blank=True)
+    created_at = models.DateTimeField(_('Criado em'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Invalidação pendente')
+        verbose_name_plural = _('Invalidações pendentes')
+        unique_together = ('provider', 'path')
+
+    def __str__(self):
+        return self.path
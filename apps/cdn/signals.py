@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from utils.cache import cdn_cache
+from .content import discard_rendered_content, get_content_provider
+from .models import CDNFile, CDNBlob, CDNProvider, ReplicatedFile, storage_registry
+from .storage import REPLICATION_PROVIDERS_KEY
+
+
+CACHE_DELETE_BATCH_SIZE = 1000
+
+
+@receiver(post_delete, sender=CDNFile)
+def release_cdn_blob(sender, instance, **kwargs):
+    """
+    Libera a referência ao conteúdo; o objeto é removido do storage quando
+    nenhum outro arquivo o usa.
+    """
+    if instance.blob_id:
+        # Sem carregar o blob: ele pode já ter sido removido junto com o provedor
+        CDNBlob(pk=instance.blob_id).release()
+
+
+@receiver(pre_delete, sender=CDNProvider)
+def clear_provider_replicas(sender, instance, **kwargs):
+    """
+    Remove do cache o estado das réplicas do provedor, que são excluídas com ele.
+    """
+    names = ReplicatedFile.objects.filter(provider=instance).values_list('name', flat=True)
+    batch = []
+    for name in names.iterator(chunk_size=CACHE_DELETE_BATCH_SIZE):
+        batch.append(ReplicatedFile.cache_key(instance.pk, name))
+        if len(batch) >= CACHE_DELETE_BATCH_SIZE:
+            cdn_cache.delete_many(batch)
+            batch = []
+    if batch:
+        cdn_cache.delete_many(batch)
+
+
+@receiver(post_save, sender=CDNProvider)
+def reset_replication_providers(sender, instance, **kwargs):
+    """
+    Um provedor alterado (ativado, renomeado…) pode mudar o provedor dos ReplicatedStorage.
+    """
+    cdn_cache.delete(REPLICATION_PROVIDERS_KEY)
+
+
+@receiver(post_delete, sender=CDNProvider)
+def discard_provider_storage(sender, instance, **kwargs):
+    """
+    Remove o storage do provedor excluído do registro do processo.
+    """
+    storage_registry.discard(instance.pk)
+    cdn_cache.delete(REPLICATION_PROVIDERS_KEY)
+
+
+# Campos que mudam as URLs gravadas no conteúdo das páginas
+CONTENT_URL_FIELDS = (
+    'is_active', 'use_signed_urls', 'provider_type', 'base_url',
+    's3_bucket_name', 's3_region', 'cloudflare_account_id', 'bunny_storage_zone',
+)
+
+
+def _content_provider_state():
+    provider = get_content_provider()
+    if provider is None:
+        return None
+    return provider.pk, tuple(getattr(provider, field) for field in CONTENT_URL_FIELDS)
+
+
+@receiver(pre_save, sender=CDNProvider)
+def remember_content_provider(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._content_provider_state = _content_provider_state()
+
+
+@receiver(post_save, sender=CDNProvider)
+def discard_content_of_changed_provider(sender, instance, raw=False, **kwargs):
+    """
+    O conteúdo processado aponta para o provedor de conteúdo: se ele mudou (outro
+    provedor, desativado, outra URL base…), o conteúdo é descartado e refeito.
+    """
+    if raw:
+        return
+    if _content_provider_state() != getattr(instance, '_content_provider_state', None):
+        transaction.on_commit(discard_rendered_content)
+
+
+@receiver(pre_delete, sender=CDNProvider)
+def discard_content_of_deleted_provider(sender, instance, **kwargs):
+    """
+    Os blobs fixados pelo conteúdo das páginas são excluídos com o provedor.
+    """
+    if instance.blobs.filter(pinned=True).exists():
+        transaction.on_commit(discard_rendered_content)
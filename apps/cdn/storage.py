@@ -0,0 +1,115 @@
+# apps/cdn/storage.py
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+from utils.cache import cdn_cache
+
+
+# {lookup: provider} dos ReplicatedStorage; removido quando um provedor é alterado (signals.py)
+REPLICATION_PROVIDERS_KEY = 'replication_providers'
+
+
+@deconstructible
+class ReplicatedStorage(FileSystemStorage):
+    """
+    Grava no disco local (MEDIA_ROOT) e retorna imediatamente; a cópia para o
+    provedor CDN é feita em segundo plano (tarefa Celery), com o estado registrado
+    em ReplicatedFile e novas tentativas em caso de erro.
+
+    url() retorna a URL local até a réplica terminar e a do CDN depois disso.
+
+    Uso: STORAGES = {'default': {'BACKEND': 'apps.cdn.storage.ReplicatedStorage'}, ...}
+    O provedor é o CDN_REPLICATION_PROVIDER (ID ou nome) ou o primeiro provedor ativo,
+    resolvido a cada operação (pelo cache, limpo quando um provedor muda).
+    """
+
+    def __init__(self, provider=None, **kwargs):
+        super().__init__(**kwargs)
+        self.provider_lookup = provider
+
+    def get_provider(self):
+        from .models import CDNProvider
+
+        lookup = self.provider_lookup or getattr(settings, 'CDN_REPLICATION_PROVIDER', None)
+        resolved = cdn_cache.get(REPLICATION_PROVIDERS_KEY) or {}
+        key = str(lookup) if lookup is not None else ''
+        if key in resolved:
+            return resolved[key]
+
+        providers = CDNProvider.objects.filter(is_active=True)
+        if lookup is None:
+            provider = providers.order_by('pk').first()
+        elif str(lookup).isdigit():
+            provider = providers.filter(pk=lookup).first()
+        else:
+            provider = providers.filter(name=lookup).first()
+
+        resolved[key] = provider
+        cdn_cache.set(REPLICATION_PROVIDERS_KEY, resolved, None)
+        return provider
+
+    def _save(self, name, content):
+        from .models import ReplicatedFile
+
+        name = super()._save(name, content)
+        provider = self.get_provider()
+        if provider is not None:
+            ReplicatedFile.schedule(provider, name)
+        return name
+
+    def delete(self, name):
+        from .models import ReplicatedFile
+
+        super().delete(name)
+        provider = self.get_provider()
+        if provider is None:
+            return
+        replica = ReplicatedFile.objects.filter(provider=provider, name=name).first()
+        if replica is None:
+            return
+        if replica.status == 'done':
+            remote_storage = provider.get_storage()
+            transaction.on_commit(lambda: remote_storage.delete(name))
+        replica.delete()
+        cdn_cache.delete(ReplicatedFile.cache_key(provider.pk, name))
+
+    def url(self, name):
+        return self.urls([name])[name]
+
+    def urls(self, names):
+        """
+        Retorna {nome: url} para vários arquivos, com uma única leitura do cache
+        e, para os arquivos fora dele, uma única consulta ao banco.
+        """
+        from .models import ReplicatedFile
+
+        provider = self.get_provider()
+        if provider is None:
+            return {name: super(ReplicatedStorage, self).url(name) for name in names}
+
+        cache_keys = {name: ReplicatedFile.cache_key(provider.pk, name) for name in names}
+        cached = cdn_cache.get_many(list(cache_keys.values()))
+        replicated = {name: cached[key] for name, key in cache_keys.items() if key in cached}
+
+        missing = [name for name in names if name not in replicated]
+        if missing:
+            done = set(ReplicatedFile.objects.filter(
+                provider=provider, name__in=missing, status='done'
+            ).values_list('name', flat=True))
+            found = {name: name in done for name in missing}
+            cdn_cache.set_many({cache_keys[name]: value for name, value in found.items()}, None)
+            replicated.update(found)
+
+        remote_names = [name for name in names if replicated[name]]
+        remote_storage = provider.get_storage()
+        if hasattr(remote_storage, 'urls'):
+            remote_urls = remote_storage.urls(remote_names)
+        else:
+            remote_urls = {name: remote_storage.url(name) for name in remote_names}
+
+        return {
+            name: remote_urls[name] if name in remote_urls else super(ReplicatedStorage, self).url(name)
+            for name in names
+        }
@@ -0,0 +1,22 @@
+# apps/cdn/tasks.py
+from celery import shared_task
+from .models import ReplicatedFile
+
+
+@shared_task
+def replicate_file(replica_id):
+    replica = ReplicatedFile.objects.select_related('provider').filter(pk=replica_id).first()
+    if replica is None:
+        return False
+    return replica.replicate()
+
+
+@shared_task
+def retry_replications():
+    return ReplicatedFile.retry_due()
+
+
+@shared_task
+def flush_invalidations():
+    from .invalidation import invalidation_queue
+    return invalidation_queue.flush()
@@ -1,3 +1,826 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from .models import (
+    CDNProvider, CDNFile, CDNBlob, PendingInvalidation, ReplicatedFile, S3Storage, get_boto3_client, IMMUTABLE_CACHE_CONTROL
+)
+from .management.commands.sync_media_to_cdn import Command as SyncMediaCommand
+from .storage import ReplicatedStorage
+from .content import rewrite_media_urls
+from .invalidation import InvalidationQueue
+from utils.cache import cdn_cache
+from utils.http import HttpClient, CircuitOpenError, override_http_client
+from utils.uploadhandlers import sniff_content_type
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+@skipIf(mock_aws is None, 'moto não está instalado')
+@override_settings(CDN_S3_MULTIPART_THRESHOLD=5 * 1024 * 1024, CDN_S3_MULTIPART_CHUNKSIZE=5 * 1024 * 1024)
+class S3StorageTests(TestCase):
+    """Testes do S3Storage contra o S3 simulado pelo moto"""
+
+    def setUp(self):
+        self.mock = mock_aws()
+        self.mock.start()
+        self.storage = S3Storage('cdn-test', 'testing', 'testing', 'us-east-1')
+        self.storage.client.create_bucket(Bucket='cdn-test')
+
+    def tearDown(self):
+        self.mock.stop()
+
+    def test_save_open_and_delete(self):
+        """Testa o ciclo completo de um arquivo"""
+        name = self.storage.save('docs/readme.txt', ContentFile(b'conteudo do arquivo'))
+
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 19)
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'conteudo do arquivo')
+        self.assertEqual(self.storage.listdir('docs'), ([], ['readme.txt']))
+
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_multipart_upload_and_ranged_read(self):
+        """Testa se arquivos grandes são enviados em partes e lidos por intervalo"""
+        data = bytes(range(256)) * (6 * 1024 * 1024 // 256)
+        name = self.storage.save('videos/grande.bin', ContentFile(data))
+
+        head = self.storage.client.head_object(Bucket='cdn-test', Key=name)
+        self.assertIn('-', head['ETag'])  # ETag de upload multipart: "<hash>-<partes>"
+        self.assertNotIn('CacheControl', head)
+
+        self.assertEqual(self.storage.open_range(name, 1000, 1009), data[1000:1010])
+        with self.storage.open(name) as f:
+            f.seek(len(data) - 4)
+            self.assertEqual(f.read(), data[-4:])
+
+    def test_full_read_uses_one_request(self):
+        """Testa se read() busca o objeto em uma requisição e leituras em blocos usam o buffer"""
+        data = bytes(range(256)) * (3 * 1024 * 1024 // 256)
+        name = self.storage.save('videos/medio.bin', ContentFile(data))
+        requests_sent = []
+        self.storage.client.meta.events.register(
+            'before-send.s3.GetObject', lambda request, **kwargs: requests_sent.append(request.headers.get('Range'))
+        )
+
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(requests_sent, [None])
+
+        requests_sent.clear()
+        with self.storage.open(name) as f:
+            self.assertEqual(b''.join(f.chunks(64 * 1024)), data)
+        self.assertEqual(len(requests_sent), 3)
+
+        requests_sent.clear()
+        with self.storage.open(name) as f:
+            f.seek(1024)
+            self.assertEqual(f.read(), data[1024:])
+        self.assertEqual(requests_sent, [b'bytes=1024-'])
+
+    def test_content_addressed_objects_are_immutable(self):
+        """Testa se os objetos com o hash no caminho recebem Cache-Control imutável"""
+        name = self.storage.save('cdn/sha256/ab/cd/abcd.css', ContentFile(b'body{}'))
+        head = self.storage.client.head_object(Bucket='cdn-test', Key=name)
+        self.assertEqual(head['CacheControl'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_exists_many_lists_each_directory_once(self):
+        """Testa a verificação em lote de existência"""
+        self.storage.save('a/1.txt', ContentFile(b'1'))
+        self.storage.save('b/2.txt', ContentFile(b'2'))
+
+        existing = self.storage.exists_many(['a/1.txt', 'a/3.txt', 'b/2.txt'])
+        self.assertEqual(existing, {'a/1.txt', 'b/2.txt'})
+
+    def test_client_is_shared(self):
+        """Testa se os storages de um mesmo provedor compartilham o cliente"""
+        provider = CDNProvider(
+            name='S3', provider_type='s3', base_url='https://cdn.example.com/',
+            s3_bucket_name='cdn-test', s3_access_key='testing', s3_secret_key='testing', s3_region='us-east-1'
+        )
+        self.assertIs(provider.get_storage().client, self.storage.client)
+        self.assertIs(provider.get_client(), get_boto3_client('s3', 'testing', 'testing', 'us-east-1'))
+
+
+class CDNFileDeduplicationTests(TestCase):
+    """Testes do armazenamento endereçado pelo conteúdo"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.provider = CDNProvider.objects.create(
+            name='Local', provider_type='bunny', base_url='https://cdn.example.com/'
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, filename, data=b'<svg>logo</svg>'):
+        return CDNFile.objects.create(provider=self.provider, file=SimpleUploadedFile(filename, data))
+
+    def test_same_content_is_stored_once(self):
+        """Testa se o mesmo conteúdo enviado duas vezes usa um único objeto"""
+        first = self.upload('logo.svg')
+        second = self.upload('logo-copie.svg')
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertRegex(first.file.name, r'^cdn/sha256/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.svg$')
+        self.assertEqual(second.original_filename, 'logo-copie.svg')
+        self.assertEqual(CDNBlob.objects.get().ref_count, 2)
+
+    def test_object_is_deleted_with_last_reference(self):
+        """Testa se o objeto só é removido quando o último arquivo é apagado"""
+        first = self.upload('logo.svg')
+        second = self.upload('logo.svg')
+        path = os.path.join(self.media_root, first.file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(CDNBlob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(CDNBlob.objects.exists())
+
+    def acquire(self, data=b'<svg>logo</svg>'):
+        return CDNBlob.acquire(
+            self.provider, ContentFile(data), hashlib.sha256(data).hexdigest(), 'logo.svg', 'image/svg+xml'
+        )
+
+    def test_upload_happens_before_lock(self):
+        """Testa se o arquivo é enviado antes do bloqueio do registro"""
+        events = []
+        save = FileSystemStorage.save
+        select_for_update = QuerySet.select_for_update
+
+        def tracked_save(storage, *args, **kwargs):
+            events.append('save')
+            return save(storage, *args, **kwargs)
+
+        def tracked_select_for_update(queryset, *args, **kwargs):
+            events.append('lock')
+            return select_for_update(queryset, *args, **kwargs)
+
+        with mock.patch.object(FileSystemStorage, 'save', autospec=True, side_effect=tracked_save), \
+                mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=tracked_select_for_update):
+            self.acquire()
+
+        self.assertEqual(events, ['save', 'lock'])
+
+    def test_concurrent_upload_is_removed(self):
+        """Testa se o envio duplicado é removido quando outro processo cria o blob antes"""
+        data = b'<svg>logo</svg>'
+        file_hash = hashlib.sha256(data).hexdigest()
+        save = FileSystemStorage.save
+
+        def concurrent_save(storage, name, content, *args, **kwargs):
+            # Outro processo envia o mesmo conteúdo e cria o blob durante o envio
+            save(storage, name, ContentFile(data))
+            CDNBlob.objects.create(
+                provider=self.provider, file_hash=file_hash, name=name, size=len(data), content_type='image/svg+xml'
+            )
+            return save(storage, name, content, *args, **kwargs)
+
+        with mock.patch.object(FileSystemStorage, 'save', autospec=True, side_effect=concurrent_save), \
+                self.captureOnCommitCallbacks(execute=True):
+            blob = self.acquire(data)
+
+        self.assertEqual(blob.ref_count, 0)
+        self.assertEqual(CDNBlob.objects.get().ref_count, 1)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, os.path.dirname(blob.name))),
+                         [os.path.basename(blob.name)])
+
+    def test_failed_acquire_removes_upload(self):
+        """Testa se o arquivo enviado é removido quando o registro não pode ser gravado"""
+        with mock.patch.object(QuerySet, 'update', side_effect=DatabaseError('falha')):
+            with self.assertRaises(DatabaseError):
+                self.acquire()
+
+        self.assertFalse(CDNBlob.objects.exists())
+        self.assertFalse(any(files for _, _, files in os.walk(self.media_root)))
+
+
+class StorageRegistryTests(TestCase):
+    """Testes do registro de storages e da geração de URLs em lote"""
+
+    def setUp(self):
+        self.provider = CDNProvider.objects.create(
+            name='Proxy', provider_type='custom', base_url='https://cdn.example.com/'
+        )
+
+    def test_storage_is_reused_until_provider_changes(self):
+        """Testa se o storage é compartilhado e recriado após alterar o provedor"""
+        storage = self.provider.get_storage()
+        self.assertIs(CDNProvider.objects.get(pk=self.provider.pk).get_storage(), storage)
+
+        self.provider.base_url = 'https://static.example.com/'
+        self.provider.save()
+        self.assertIsNot(self.provider.get_storage(), storage)
+        self.assertEqual(self.provider.get_storage().url('a.css'), 'https://static.example.com/a.css')
+
+    def test_urls_are_resolved_in_one_query(self):
+        """Testa se as URLs de vários arquivos são obtidas com uma consulta"""
+        for i in range(3):
+            CDNFile.objects.bulk_create([CDNFile(
+                provider=self.provider, file=f'cdn_files/{i}.css', original_filename=f'{i}.css',
+                content_type='text/css', file_size=1, file_hash=str(i)
+            )])
+
+        with self.assertNumQueries(1):
+            urls = CDNFile.objects.order_by('pk').urls()
+        self.assertEqual(
+            sorted(urls.values()),
+            [f'https://cdn.example.com/cdn_files/{i}.css' for i in range(3)]
+        )
+
+
+class _RecordingHandler(BaseHTTPRequestHandler):
+    """Servidor local que registra as requisições recebidas"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body['paths'])
+        status = self.server.responses.pop(0) if self.server.responses else 200
+        self.send_response(status)
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        status = self.server.responses.pop(0) if self.server.responses else 200
+        self.send_response(status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(CDN_INVALIDATION_ASYNC=False, CDN_INVALIDATION_RETRY_DELAY=0, CDN_INVALIDATION_FOLD_THRESHOLD=5)
+class InvalidationQueueTests(TestCase):
+    """Testes da fila de invalidação contra um servidor HTTP local"""
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _RecordingHandler)
+        self.server.requests = []
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.provider = CDNProvider.objects.create(
+            name='Local', provider_type='custom', base_url='https://cdn.example.com/',
+            invalidation_url=f'http://127.0.0.1:{self.server.server_port}/purge'
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_paths_are_deduplicated_and_folded(self):
+        """Testa se caminhos repetidos são descartados e diretórios numerosos viram curingas"""
+        queue = InvalidationQueue()
+        with override_settings(CDN_INVALIDATION_ASYNC=True, CDN_INVALIDATION_WINDOW=60):
+            # Dentro da janela: os caminhos apenas se acumulam na fila
+            queue.enqueue(self.provider, ['/css/site.css', 'css/site.css'])
+            queue.enqueue(self.provider, [f'/img/{i}.png' for i in range(8)])
+            self.assertEqual(self.server.requests, [])
+
+        self.assertEqual(queue.flush(), 1)
+        self.assertEqual(self.server.requests, [['/css/site.css', '/img/*']])
+
+    def test_failed_batches_are_retried(self):
+        """Testa se um envio com erro é repetido pela tarefa (ou pelo comando)"""
+        with override_settings(CDN_INVALIDATION_ASYNC=True):
+            InvalidationQueue().enqueue(self.provider, ['/index.html'])
+        self.server.responses = [503]
+
+        self.assertEqual(InvalidationQueue().flush(), 1)
+        self.assertEqual(self.server.requests, [['/index.html'], ['/index.html']])
+
+    def test_synchronous_flush_does_not_wait(self):
+        """Testa se o envio feito na própria chamada tenta uma única vez, sem esperar"""
+        self.server.responses = [503]
+        with override_settings(CDN_INVALIDATION_RETRY_DELAY=5), mock.patch('apps.cdn.invalidation.time.sleep') as sleep:
+            self.assertTrue(self.provider.invalidate_cache(['/index.html']))
+
+        sleep.assert_not_called()
+        self.assertEqual(self.server.requests, [['/index.html']])
+        self.assertTrue(PendingInvalidation.objects.filter(claim='').exists())
+
+    def test_pending_paths_survive_the_process(self):
+        """Testa se os caminhos ficam gravados no banco até serem enviados por qualquer processo"""
+        with override_settings(CDN_INVALIDATION_ASYNC=True):
+            InvalidationQueue().enqueue(self.provider, ['/index.html'])
+        self.assertEqual(list(PendingInvalidation.objects.values_list('path', flat=True)), ['/index.html'])
+
+        self.assertEqual(InvalidationQueue().flush(), 1)
+        self.assertEqual(self.server.requests, [['/index.html']])
+        self.assertFalse(PendingInvalidation.objects.exists())
+
+    def test_failed_paths_return_to_queue(self):
+        """Testa se os caminhos de um envio que falhou continuam pendentes"""
+        self.server.responses = [503]
+        self.provider.invalidate_cache(['/index.html'])
+
+        pending = PendingInvalidation.objects.get()
+        self.assertEqual((pending.path, pending.claim), ('/index.html', ''))
+
+        self.assertEqual(InvalidationQueue().flush(), 1)
+        self.assertFalse(PendingInvalidation.objects.exists())
+
+    def test_flushes_synchronously_without_worker(self):
+        """Testa se as invalidações são enviadas na chamada quando a tarefa não pode ser agendada"""
+        cache.clear()
+        with override_settings(CDN_INVALIDATION_ASYNC=True), \
+                mock.patch('apps.cdn.tasks.flush_invalidations.apply_async', side_effect=OSError('sem broker')), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.provider.invalidate_cache(['/index.html'])
+
+        self.assertEqual(self.server.requests, [['/index.html']])
+        self.assertFalse(PendingInvalidation.objects.exists())
+
+    def test_http_client_can_be_replaced(self):
+        """Testa se as invalidações usam o cliente HTTP configurado"""
+        stub = mock.Mock()
+        with override_http_client(stub):
+            self.provider.invalidate_cache(['/index.html'])
+        stub.post.assert_called_once()
+        self.assertEqual(stub.post.call_args.kwargs['json'], {'paths': ['/index.html']})
+        self.assertEqual(self.server.requests, [])
+
+
+class HttpClientTests(TestCase):
+    """Testes do cliente HTTP compartilhado contra um servidor local"""
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _RecordingHandler)
+        self.server.requests = []
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/api/reviews'
+        self.client = HttpClient(retries=2, backoff=0, breaker_threshold=3, breaker_reset_timeout=60)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retries_and_latency_histogram(self):
+        """Testa as novas tentativas e o registro de latência por endpoint"""
+        self.server.responses = [503, 502]
+        response = self.client.get(self.url + '?place=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+        stats = self.client.get_latency_stats()[f'127.0.0.1:{self.server.server_port}/api/reviews']
+        self.assertEqual((stats['count'], stats['errors']), (3, 2))
+        self.assertEqual(sum(stats['buckets'].values()), 3)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        """Testa se o circuito aberto recusa requisições sem acessar o servidor"""
+        self.server.responses = [500, 500, 500]
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).status_code, 500)
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.get(self.url)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_unexpected_error_releases_trial_request(self):
+        """Testa se um erro inesperado na requisição de teste não deixa o circuito preso"""
+        self.server.responses = [500, 500, 500]
+        for _ in range(3):
+            self.client.get(self.url)
+        breaker = self.client.get_breaker(f'127.0.0.1:{self.server.server_port}')
+
+        breaker._opened_at -= 60
+        with mock.patch.object(self.client.session, 'request', side_effect=ValueError('erro')):
+            with self.assertRaises(ValueError):
+                self.client.get(self.url)
+
+        breaker._opened_at -= 60
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_retry_after_is_capped(self):
+        """Testa se o Retry-After do servidor é limitado por HTTP_CLIENT_MAX_RETRY_AFTER"""
+        with override_settings(HTTP_CLIENT_MAX_RETRY_AFTER=5):
+            client = HttpClient(backoff=0)
+        response = mock.Mock(headers={'Retry-After': '3600'})
+        self.assertEqual(client.get_backoff(0, response), 5)
+
+    def test_post_is_not_retried_on_server_errors(self):
+        """Testa se POSTs só são repetidos quando o servidor certamente não os processou"""
+        self.server.responses = [503]
+        self.assertEqual(self.client.post(self.url, json={'paths': ['/a']}).status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+        self.server.responses = [429]
+        self.assertEqual(self.client.post(self.url, json={'paths': ['/a']}).status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+        self.server.responses = [503]
+        self.assertEqual(self.client.post(self.url, json={'paths': ['/a']}, idempotent=True).status_code, 200)
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_post_is_not_retried_on_read_timeout(self):
+        """Testa se um POST com timeout de leitura não é reenviado"""
+        with mock.patch.object(
+            self.client.session, 'request', side_effect=requests.exceptions.ReadTimeout('lento')
+        ) as request:
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                self.client.post(self.url, json={'paths': ['/a']})
+        self.assertEqual(request.call_count, 1)
+
+
+class SignedURLCacheTests(TestCase):
+    """Testes do cache de URLs assinadas"""
+
+    def setUp(self):
+        cache.clear()
+        self.provider = CDNProvider.objects.create(
+            name='S3', provider_type='s3', base_url='https://cdn.example.com/',
+            s3_bucket_name='cdn-test', s3_access_key='testing', s3_secret_key='testing', s3_region='us-east-1'
+        )
+        self.storage = self.provider.get_storage()
+
+    def test_signed_urls_are_cached(self):
+        """Testa se cada objeto é assinado uma única vez enquanto a URL é válida"""
+        names = [f'galerie/{i}.jpg' for i in range(5)]
+        with mock.patch.object(
+            self.storage.client, 'generate_presigned_url', wraps=self.storage.client.generate_presigned_url
+        ) as sign:
+            first = self.storage.urls(names)
+            second = self.storage.urls(names + ['galerie/5.jpg'])
+
+        self.assertEqual(sign.call_count, 6)
+        self.assertEqual(second['galerie/0.jpg'], first['galerie/0.jpg'])
+        self.assertIn('Signature=', first['galerie/0.jpg'])
+
+    @override_settings(CDN_SIGNED_URL_EXPIRY=60, CDN_SIGNED_URL_MARGIN=60)
+    def test_urls_close_to_expiry_are_not_cached(self):
+        """Testa se URLs que expirariam dentro da margem não são reutilizadas"""
+        with mock.patch.object(
+            self.storage.client, 'generate_presigned_url', wraps=self.storage.client.generate_presigned_url
+        ) as sign:
+            self.storage.url('logo.png')
+            self.storage.url('logo.png')
+        self.assertEqual(sign.call_count, 2)
+
+    def test_cache_key_covers_client_identity(self):
+        """Testa se a chave do cache muda com a chave secreta e o endpoint"""
+        key = self.storage._signed_url_cache_key('logo.png', 3600)
+        other_secret = S3Storage('cdn-test', 'testing', 'outra', 'us-east-1')
+        self.assertNotEqual(other_secret._signed_url_cache_key('logo.png', 3600), key)
+
+        with override_settings(CDN_S3_ENDPOINT_URL='http://127.0.0.1:9000'):
+            self.assertNotEqual(self.storage._signed_url_cache_key('logo.png', 3600), key)
+
+    def test_cloudfront_keeps_base_url(self):
+        """Testa se provedores CloudFront continuam servindo pelo base_url"""
+        provider = CDNProvider.objects.create(
+            name='CloudFront', provider_type='cloudfront', base_url='https://d111.cloudfront.net/',
+            s3_bucket_name='cdn-test', s3_access_key='testing', s3_secret_key='testing', s3_region='us-east-1',
+            use_signed_urls=True
+        )
+        self.assertEqual(provider.get_storage().url('logo.png'), 'https://d111.cloudfront.net/logo.png')
+
+
+class SyncMediaCommandTests(TestCase):
+    """Testes do comando sync_media_to_cdn contra um storage local"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.target = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.provider = CDNProvider.objects.create(name='Local', provider_type='bunny', base_url='https://cdn.example.com/')
+        self.storage_patch = mock.patch.object(
+            CDNProvider, 'get_storage', return_value=FileSystemStorage(location=self.target)
+        )
+        self.storage_patch.start()
+
+        for name, content in (('a.txt', 'a'), ('img/b.png', 'b'), ('img/c.png', 'c')):
+            os.makedirs(os.path.dirname(os.path.join(self.media_root, name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.storage_patch.stop()
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        shutil.rmtree(self.target, ignore_errors=True)
+
+    def sync(self):
+        out = StringIO()
+        call_command('sync_media_to_cdn', str(self.provider.pk), '--workers=2', stdout=out)
+        return out.getvalue()
+
+    def test_only_new_or_changed_files_are_uploaded(self):
+        """Testa se uma segunda execução envia apenas os arquivos alterados"""
+        self.assertIn('3 arquivo(s) enviado(s)', self.sync())
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'img', 'c.png')))
+        self.assertTrue(os.path.exists(os.path.join(self.target, '.cdn-manifest.json')))
+
+        with open(os.path.join(self.media_root, 'img', 'b.png'), 'w') as f:
+            f.write('b modifié')
+        self.assertIn('1 arquivo(s) enviado(s), 2 sem alteração', self.sync())
+        with open(os.path.join(self.target, 'img', 'b.png')) as f:
+            self.assertEqual(f.read(), 'b modifié')
+
+    def test_interrupted_sync_resumes_from_checkpoint(self):
+        """Testa se os arquivos registrados no checkpoint não são reenviados"""
+        path = os.path.join(self.media_root, 'a.txt')
+        stat = os.stat(path)
+        with open(os.path.join(self.media_root, f'.cdn-sync-{self.provider.pk}.json'), 'w') as f:
+            json.dump({'a.txt': {'sha256': '…', 'size': stat.st_size, 'mtime': stat.st_mtime}}, f)
+
+        output = self.sync()
+        self.assertIn('Continuando a partir do checkpoint', output)
+        self.assertIn('2 arquivo(s) enviado(s), 1 sem alteração', output)
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'a.txt')))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, f'.cdn-sync-{self.provider.pk}.json')))
+
+    def test_checkpoint_survives_two_interruptions(self):
+        """Testa se uma segunda interrupção mantém no checkpoint os arquivos da primeira"""
+        with mock.patch.object(SyncMediaCommand, 'save_manifest', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.sync()
+
+            with open(os.path.join(self.media_root, 'img', 'b.png'), 'w') as f:
+                f.write('b modifié')
+            with self.assertRaises(KeyboardInterrupt):
+                self.sync()
+
+        with open(os.path.join(self.media_root, f'.cdn-sync-{self.provider.pk}.json')) as f:
+            self.assertEqual(set(json.load(f)), {'a.txt', 'img/b.png', 'img/c.png'})
+        self.assertIn('0 arquivo(s) enviado(s), 3 sem alteração', self.sync())
+
+
+class UploadHandlerTests(TestCase):
+    """Testes dos handlers de upload que calculam hash e tipo durante o recebimento"""
+
+    PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 2048
+
+    def receive(self, data, filename='imagem.bin'):
+        request = RequestFactory().post('/', {'file': SimpleUploadedFile(filename, data)})
+        return request.FILES['file']
+
+    def test_digest_is_computed_while_streaming(self):
+        """Testa o hash e o tipo em arquivos mantidos em memória e gravados em disco"""
+        for max_memory_size in (1024 * 1024, 1024):
+            with self.subTest(max_memory_size=max_memory_size), \
+                    override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=max_memory_size):
+                uploaded = self.receive(self.PNG)
+                self.assertEqual(uploaded.sha256, hashlib.sha256(self.PNG).hexdigest())
+                self.assertEqual(uploaded.sniffed_content_type, 'image/png')
+                self.assertEqual(uploaded.size, len(self.PNG))
+
+    def test_sniffing(self):
+        """Testa a identificação de formatos pelos primeiros bytes"""
+        self.assertEqual(sniff_content_type(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'image/webp')
+        self.assertEqual(sniff_content_type(b'<?xml version="1.0"?>\n<svg xmlns="..."/>'), 'image/svg+xml')
+        self.assertIsNone(sniff_content_type(b'texto simples'))
+
+    def test_sniffing_iso_media_brands(self):
+        """Testa se arquivos ISO-BMFF são identificados pela marca principal, não apenas pelo ftyp"""
+        header = b'\x00\x00\x00\x18ftyp'
+        self.assertEqual(sniff_content_type(header + b'isom\x00\x00\x02\x00'), 'video/mp4')
+        self.assertEqual(sniff_content_type(header + b'heic\x00\x00\x00\x00'), 'image/heic')
+        self.assertEqual(sniff_content_type(header + b'avif\x00\x00\x00\x00'), 'image/avif')
+        self.assertEqual(sniff_content_type(header + b'M4A \x00\x00\x00\x00'), 'audio/mp4')
+        self.assertEqual(sniff_content_type(header + b'qt  \x00\x00\x00\x00'), 'video/quicktime')
+        self.assertIsNone(sniff_content_type(header + b'xyz1\x00\x00\x00\x00'))
+
+    def test_cdn_file_uses_upload_digest(self):
+        """Testa se o CDNFile reaproveita o hash do upload em vez de reler o arquivo"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        provider = CDNProvider.objects.create(name='Local', provider_type='bunny', base_url='https://cdn.example.com/')
+        uploaded = self.receive(self.PNG, 'logo.jpg')
+
+        with override_settings(MEDIA_ROOT=media_root), mock.patch.object(CDNFile, 'calculate_hash') as calculate_hash:
+            cdn_file = CDNFile.objects.create(provider=provider, file=uploaded)
+
+        calculate_hash.assert_not_called()
+        self.assertEqual(cdn_file.file_hash, uploaded.sha256)
+        self.assertEqual(cdn_file.content_type, 'image/png')
+
+
+class MediaRewriterTests(TestCase):
+    """Testes da reescrita das URLs de mídia no conteúdo das páginas"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_URL='/media/')
+        self.override.enable()
+        self.provider = CDNProvider.objects.create(name='Local', provider_type='custom', base_url='https://cdn.example.com/')
+
+        from PIL import Image
+        os.makedirs(os.path.join(self.media_root, 'uploads'))
+        Image.new('RGB', (40, 30)).save(os.path.join(self.media_root, 'uploads', 'photo 1.png'))
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_media_urls_point_to_content_addressed_cdn_paths(self):
+        """Testa a reescrita das URLs, o lazy loading e as dimensões das imagens"""
+        html = (
+            '<p><img src="/media/uploads/photo%201.png" alt="Foto"></p>'
+            '<a href="/media/uploads/photo%201.png">Baixar</a>'
+            '<img src="/media/inexistente.png"><img src="https://example.org/media/x.png" loading="eager">'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            result = rewrite_media_urls(html)
+
+        blob = CDNBlob.objects.get()
+        url = f'https://cdn.example.com/{blob.name}'
+        self.assertTrue(blob.pinned)
+        self.assertEqual(blob.ref_count, 0)
+        self.assertIn(f'<img src="{url}" alt="Foto" loading="lazy" width="40" height="30">', result)
+        self.assertIn(f'<a href="{url}">', result)
+        self.assertIn('<img src="/media/inexistente.png" loading="lazy">', result)
+        self.assertIn('<img src="https://example.org/media/x.png" loading="eager">', result)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, blob.name)))
+
+        # O HTML já processado não muda e o arquivo não é reenviado
+        with mock.patch.object(CDNBlob, 'acquire') as acquire:
+            self.assertEqual(rewrite_media_urls(result), result)
+            self.assertEqual(rewrite_media_urls(html), result)
+        acquire.assert_not_called()
+
+    def test_pinned_blob_survives_file_deletion(self):
+        """Testa se o conteúdo usado nas páginas não é removido com o último CDNFile"""
+        with self.captureOnCommitCallbacks(execute=True):
+            rewrite_media_urls('<img src="/media/uploads/photo%201.png">')
+        with open(os.path.join(self.media_root, 'uploads', 'photo 1.png'), 'rb') as f:
+            cdn_file = CDNFile.objects.create(provider=self.provider, file=SimpleUploadedFile('photo.png', f.read()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cdn_file.delete()
+        blob = CDNBlob.objects.get()
+        self.assertEqual(blob.ref_count, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, blob.name)))
+
+
+    def test_upload_waits_for_commit(self):
+        """Testa se nada é enviado ao storage quando a transação é desfeita"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = rewrite_media_urls('<img src="/media/uploads/photo%201.png">')
+
+        self.assertIn('https://cdn.example.com/cdn/sha256/', result)
+        self.assertFalse(CDNBlob.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'cdn')))
+
+        for callback in callbacks:
+            callback()
+        blob = CDNBlob.objects.get()
+        self.assertIn(f'https://cdn.example.com/{blob.name}', result)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, blob.name)))
+
+    def test_cdn_error_keeps_media_url(self):
+        """Testa se uma falha do CDN mantém a URL local em vez de impedir a gravação"""
+        with mock.patch.object(CDNProvider, 'get_storage', side_effect=OSError('indisponível')), \
+                self.assertLogs('cdn', 'ERROR'):
+            result = rewrite_media_urls('<img src="/media/uploads/photo%201.png">')
+
+        self.assertIn('src="/media/uploads/photo%201.png"', result)
+
+    def test_failed_upload_discards_rendered_content(self):
+        """Testa se o conteúdo gravado com a URL de um envio que falhou é descartado"""
+        with mock.patch.object(CDNBlob, 'acquire', side_effect=OSError('indisponível')), \
+                mock.patch('apps.cdn.content.discard_rendered_content') as discard, \
+                self.assertLogs('cdn', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            result = rewrite_media_urls('<img src="/media/uploads/photo%201.png">')
+
+        url = result.split('src="', 1)[1].split('"', 1)[0]
+        self.assertTrue(url.startswith('https://cdn.example.com/'))
+        discard.assert_called_once_with(url)
+
+    def test_provider_changes_discard_rendered_content(self):
+        """Testa se o conteúdo processado é descartado quando o provedor de conteúdo muda"""
+        with self.captureOnCommitCallbacks(execute=True):
+            rewrite_media_urls('<img src="/media/uploads/photo%201.png">')
+
+        with mock.patch('apps.cdn.signals.discard_rendered_content') as discard:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.provider.name = 'Renomeado'
+                self.provider.save()
+            discard.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.provider.base_url = 'https://static.example.com/'
+                self.provider.save()
+            self.assertEqual(discard.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.provider.delete()
+            self.assertEqual(discard.call_count, 2)
+
+@override_settings(CDN_REPLICATION_ASYNC=False, CDN_REPLICATION_RETRY_DELAY=0)
+class ReplicatedStorageTests(TestCase):
+    """Testes do storage que grava localmente e replica no CDN em segundo plano"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.target = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_URL='/media/')
+        self.override.enable()
+        self.provider = CDNProvider.objects.create(name='Local', provider_type='bunny', base_url='https://cdn.example.com/')
+        self.remote = FileSystemStorage(location=self.target, base_url='https://cdn.example.com/')
+        self.storage_patch = mock.patch.object(CDNProvider, 'get_storage', return_value=self.remote)
+        self.storage_patch.start()
+        self.storage = ReplicatedStorage(provider=self.provider.pk)
+
+    def tearDown(self):
+        self.storage_patch.stop()
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        shutil.rmtree(self.target, ignore_errors=True)
+
+    def test_url_switches_to_cdn_after_replication(self):
+        """Testa se o arquivo é servido localmente até a réplica terminar"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            name = self.storage.save('docs/a.txt', ContentFile(b'conteudo'))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, 'docs', 'a.txt')))
+        self.assertEqual(self.storage.url(name), '/media/docs/a.txt')
+        self.assertEqual(ReplicatedFile.objects.get().status, 'pending')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(ReplicatedFile.objects.get().status, 'done')
+        self.assertTrue(self.remote.exists(name))
+        self.assertEqual(self.storage.url(name), 'https://cdn.example.com/docs/a.txt')
+
+    def test_failed_replication_is_retried(self):
+        """Testa o registro da falha e a nova tentativa"""
+        with mock.patch.object(self.remote, 'save', side_effect=OSError('indisponível')), \
+                self.captureOnCommitCallbacks(execute=True):
+            name = self.storage.save('a.txt', ContentFile(b'a'))
+
+        replica = ReplicatedFile.objects.get()
+        self.assertEqual((replica.status, replica.attempts, replica.last_error), ('pending', 1, 'indisponível'))
+        self.assertEqual(self.storage.url(name), '/media/a.txt')
+
+        self.assertEqual(ReplicatedFile.retry_due(), (1, 0))
+        self.assertEqual(ReplicatedFile.objects.get().status, 'done')
+        self.assertEqual(self.storage.url(name), 'https://cdn.example.com/a.txt')
+
+    def test_provider_is_resolved_per_operation(self):
+        """Testa se desativar o provedor é percebido por um storage já criado"""
+        with self.captureOnCommitCallbacks(execute=True):
+            name = self.storage.save('a.txt', ContentFile(b'a'))
+        self.assertEqual(self.storage.url(name), 'https://cdn.example.com/a.txt')
+
+        self.provider.is_active = False
+        self.provider.save()
+        self.assertEqual(self.storage.url(name), '/media/a.txt')
+
+    def test_provider_delete_clears_replica_cache(self):
+        """Testa se excluir o provedor remove do cache o estado das suas réplicas"""
+        with self.captureOnCommitCallbacks(execute=True):
+            name = self.storage.save('a.txt', ContentFile(b'a'))
+        self.storage.url(name)
+        cache_key = ReplicatedFile.cache_key(self.provider.pk, name)
+        self.assertTrue(cdn_cache.get(cache_key))
+
+        self.provider.delete()
+        self.assertIsNone(cdn_cache.get(cache_key))
+        self.assertEqual(self.storage.url(name), '/media/a.txt')
+
+    def test_replica_deleted_during_replication(self):
+        """Testa se a réplica de um arquivo excluído durante o envio termina sem erro"""
+        with self.captureOnCommitCallbacks():
+            self.storage.save('a.txt', ContentFile(b'a'))
+        replica = ReplicatedFile.objects.get()
+
+        def delete_and_fail(*args, **kwargs):
+            ReplicatedFile.objects.filter(pk=replica.pk).delete()
+            raise OSError('indisponível')
+
+        with mock.patch.object(self.remote, 'save', side_effect=delete_and_fail):
+            self.assertFalse(replica.replicate())
+        self.assertFalse(ReplicatedFile.objects.exists())
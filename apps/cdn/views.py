@@ -3,7 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.http import JsonResponse
-from .models import CDNProvider, CDNFile
+from .models import CDNProvider, CDNFile, resolve_file_urls
 from .forms import CDNProviderForm, CDNFileForm
 
 @login_required
@@ -52,10 +52,11 @@ def cdn_provider_delete(request, pk):
 
 @login_required
 def cdn_file_list(request):
-    files = CDNFile.objects.all().order_by('-created_at')
+    files = CDNFile.objects.with_provider().order_by('-created_at')
     paginator = Paginator(files, 20)  # Show 20 files per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    resolve_file_urls(page_obj.object_list)
     return render(request, 'cdn/file_list.html', {'page_obj': page_obj})
 
 @login_required
@@ -91,7 +92,7 @@ def invalidate_cache(request, pk):
         paths = request.POST.getlist('paths')
         success = provider.invalidate_cache(paths)
         if success:
-            messages.success(request, 'Cache invalidation request sent successfully.')
+            messages.success(request, 'Cache invalidation request queued successfully.')
         else:
             messages.error(request, 'Failed to send cache invalidation request.')
         return redirect('cdn_provider_detail', pk=provider.pk)
@@ -0,0 +1,35 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from apps.config.models import SiteStyle
+from utils.cache import config_cache
+from utils.stylesheet import write_site_stylesheet
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as folhas de estilos compiladas ausentes (estilos gravados antes da compilação '
+        'ou arquivos perdidos no storage) e remove as que nenhum estilo usa mais. '
+        'Execute após o deploy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompila todas as folhas de estilos')
+
+    def handle(self, *args, **options):
+        generated = renamed = 0
+        for style in SiteStyle.objects.all():
+            if options['force'] or not style.stylesheet or not default_storage.exists(style.stylesheet):
+                stylesheet = write_site_stylesheet(style)
+                generated += 1
+                if stylesheet != style.stylesheet:
+                    # update(): sem recompilar de novo no save()
+                    SiteStyle.objects.filter(pk=style.pk).update(stylesheet=stylesheet)
+                    renamed += 1
+        if renamed:
+            # O SiteChrome em cache guarda o estilo com o nome antigo
+            config_cache.invalidate()
+
+        removed = SiteStyle.prune_stylesheets()
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} folha(s) de estilos gerada(s), {len(removed)} removida(s).'
+        ))
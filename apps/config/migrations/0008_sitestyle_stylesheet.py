@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0007_alter_customfield_options_alter_fieldgroup_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitestyle',
+            name='stylesheet',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='feuille de style compilée'),
+        ),
+    ]
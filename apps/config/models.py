@@ -1,6 +1,6 @@
 # apps/config/models.py
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
@@ -8,13 +8,17 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 import json
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
-from django.urls import reverse
+from django.urls import reverse, NoReverseMatch
 from django_ckeditor_5.fields import CKEditor5Field
 from colorfield.fields import ColorField
 from django.contrib.auth.models import User
 from mptt.models import MPTTModel, TreeForeignKey
 from django.utils import timezone
 from datetime import datetime
+from utils.models import DirtyFieldsMixin
+from utils.redirect_graph import RedirectGraphMixin, add_redirect, release_path
+from utils.stylesheet import prune_site_stylesheets, write_site_stylesheet
+from django.core.files.storage import default_storage
 
 
 
@@ -32,7 +36,7 @@ class FieldGroup(models.Model):
         return self.name
 
 
-class Redirect(models.Model):
+class Redirect(RedirectGraphMixin, models.Model):
     old_path = models.CharField(_('Ancien chemin'), max_length=200, unique=True)
     new_path = models.CharField(_('Nouveau chemin'), max_length=200)
     created_at = models.DateTimeField(_('Créé le'), auto_now_add=True)
@@ -72,6 +76,48 @@ class CustomField(models.Model):
     def __str__(self):
         return self.name
 
+    def to_python(self, value):
+        """
+        Converte o valor gravado (texto) para o tipo do campo.
+        Valores que não podem ser convertidos são retornados como texto.
+        """
+        if value is None or value == '':
+            return None
+        try:
+            if self.field_type == 'number':
+                number = float(value)
+                return int(number) if number.is_integer() else number
+            if self.field_type == 'date':
+                return datetime.strptime(value, '%Y-%m-%d').date()
+            if self.field_type == 'boolean':
+                return value.lower() in ('true', '1')
+        except ValueError:
+            pass
+        return value
+
+    @staticmethod
+    def to_storage(value):
+        """
+        Converte um valor Python para o texto gravado em CustomFieldValue.value.
+        """
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return '' if value is None else str(value)
+
+
+def custom_fields_prefetch():
+    """
+    Prefetch dos valores dos campos personalizados (com o campo) para uma lista de páginas:
+    Page.objects.prefetch_related(custom_fields_prefetch())
+    """
+    return models.Prefetch(
+        'custom_field_values',
+        queryset=CustomFieldValue.objects.select_related('field')
+    )
+
+
 class CustomFieldValue(models.Model):
     field = models.ForeignKey(CustomField, on_delete=models.CASCADE)
     page = models.ForeignKey('Page', on_delete=models.CASCADE, related_name='custom_field_values')
@@ -127,9 +173,13 @@ class CustomFieldValue(models.Model):
     def save(self, *args, **kwargs):
         self.full_clean()
         super().save(*args, **kwargs)
+
+    @property
+    def typed_value(self):
+        return self.field.to_python(self.value)
     
 
-class Page(MPTTModel):
+class Page(DirtyFieldsMixin, MPTTModel):
     STATUS_CHOICES = [
         ('draft', _('Draft')),
         ('review', _('Review')),
@@ -199,20 +249,106 @@ class Page(MPTTModel):
     def __str__(self):
         return self.title
     
-    def get_custom_field_value(self, field_name):
-        try:
-            custom_field = self.custom_fields.get(name=field_name)
-            return CustomFieldValue.objects.get(field=custom_field, page=self).value
-        except (CustomField.DoesNotExist, CustomFieldValue.DoesNotExist):
-            return None
+    @property
+    def custom_field_map(self):
+        """
+        Valores dos campos personalizados indexados pelo nome do campo.
+        Carregados em uma única consulta (ou a partir do prefetch_related, se houver)
+        e mantidos na instância.
+        """
+        if getattr(self, '_custom_field_map', None) is None:
+            prefetched = getattr(self, '_prefetched_objects_cache', {})
+            if 'custom_field_values' in prefetched:
+                values = prefetched['custom_field_values']
+            elif self.pk is None:
+                values = []
+            else:
+                values = self.custom_field_values.select_related('field')
+            self._custom_field_map = {value.field.name: value for value in values}
+        return self._custom_field_map
+
+    @property
+    def custom_values(self):
+        """
+        Valores tipados dos campos personalizados, para uso nos templates:
+        {{ page.custom_values.subtitle }}
+        """
+        return {name: value.typed_value for name, value in self.custom_field_map.items()}
+
+    @classmethod
+    def prefetch_custom_fields(cls, pages):
+        """
+        Carrega os campos personalizados de uma lista de páginas em uma única consulta.
+        """
+        pages = [page for page in pages if getattr(page, '_custom_field_map', None) is None]
+        models.prefetch_related_objects(pages, custom_fields_prefetch())
+        return pages
+
+    def get_custom_field_value(self, field_name, default=None):
+        field_value = self.custom_field_map.get(field_name)
+        return field_value.value if field_value is not None else default
+
+    def get_typed_custom_field_value(self, field_name, default=None):
+        """
+        Retorna o valor convertido para o tipo do campo (número, data, booleano…).
+        """
+        field_value = self.custom_field_map.get(field_name)
+        if field_value is None:
+            return default
+        typed_value = field_value.typed_value
+        return default if typed_value is None else typed_value
 
     def set_custom_field_value(self, field_name, value):
-        custom_field, created = CustomField.objects.get_or_create(name=field_name)
-        CustomFieldValue.objects.update_or_create(
-            field=custom_field,
-            page=self,
-            defaults={'value': value}
-        )
+        self.set_custom_field_values({field_name: value})
+
+    def set_custom_field_values(self, values):
+        """
+        Grava vários campos personalizados em uma única transação:
+        os campos inexistentes são criados e os valores são gravados em lote.
+        """
+        if not values:
+            return
+
+        with transaction.atomic():
+            fields = {}
+            for field in CustomField.objects.filter(name__in=list(values)).order_by('-pk'):
+                # Em nomes repetidos prevalece o campo mais antigo, como em get_or_create
+                fields[field.name] = field
+            for name in values:
+                if name not in fields:
+                    fields[name] = CustomField.objects.create(name=name)
+
+            existing = {
+                field_value.field_id: field_value
+                for field_value in self.custom_field_values.filter(
+                    field__in=list(fields.values())
+                )
+            }
+
+            to_create, to_update = [], []
+            for name, value in values.items():
+                field = fields[name]
+                stored = CustomField.to_storage(value)
+                field_value = existing.get(field.pk)
+                if field_value is None:
+                    field_value = CustomFieldValue(field=field, page=self, value=stored)
+                    to_create.append(field_value)
+                elif field_value.value != stored:
+                    field_value.value = stored
+                    to_update.append(field_value)
+                else:
+                    continue
+                field_value.field = field
+                # As gravações em lote não chamam save(): valida como CustomFieldValue.save
+                field_value.clean_fields(exclude=['field', 'page'])
+                field_value.clean()
+
+            CustomFieldValue.objects.bulk_create(to_create)
+            CustomFieldValue.objects.bulk_update(to_update, ['value'])
+
+        self._custom_field_map = None
+        getattr(self, '_prefetched_objects_cache', {}).pop('custom_field_values', None)
+
     def get_custom_fields_by_group(self):
         grouped_fields = {}
         for field_value in self.custom_field_values.select_related('field__group'):
@@ -233,14 +369,17 @@ class Page(MPTTModel):
         if not self.slug:
             self.slug = slugify(self.title)
         
-        # Verifica se o slug foi alterado
-        if self.pk:
-            old_page = Page.objects.get(pk=self.pk)
-            if old_page.slug != self.slug:
-                # Cria um redirecionamento
+        # Verifica se o slug foi alterado (sem consulta quando a página veio do banco)
+        if self.pk and self.has_changed('slug'):
+            old_slug = self.get_original_value('slug')
+            if old_slug and old_slug != self.slug:
+                # A página volta a responder no novo caminho: remove redirecionamentos antigos dele
+                release_path(f'/{self.slug}/')
                 
-                Redirect.objects.create(
-                    old_path=f'/{old_page.slug}/',
+                # Cria um redirecionamento, já apontando as cadeias antigas para o novo caminho
+                add_redirect(
+                    Redirect,
+                    old_path=f'/{old_slug}/',
                     new_path=f'/{self.slug}/'
                 )
         
@@ -335,6 +474,14 @@ class SiteStyle(models.Model):
         default='992px'
     )
     
+    # Folha de estilos compilada (gerada ao salvar)
+    stylesheet = models.CharField(
+        _('feuille de style compilée'),
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    
     class Meta:
         verbose_name = _('style du site')
         verbose_name_plural = _('styles du site')
@@ -342,7 +489,34 @@ class SiteStyle(models.Model):
     def __str__(self):
         return _("Configuration du style")
 
-class Menu(MPTTModel):
+    def save(self, *args, **kwargs):
+        # Recompila a folha de estilos; o nome só muda quando o conteúdo muda
+        previous = self.stylesheet
+        self.stylesheet = write_site_stylesheet(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'stylesheet'}
+        super().save(*args, **kwargs)
+        if self.stylesheet != previous:
+            transaction.on_commit(type(self).prune_stylesheets)
+
+    @classmethod
+    def prune_stylesheets(cls):
+        """
+        Remove as folhas de estilos compiladas que nenhum estilo usa mais
+        (mantendo a versão anterior, ver prune_site_stylesheets).
+        """
+        return prune_site_stylesheets(
+            keep=set(cls.objects.exclude(stylesheet='').values_list('stylesheet', flat=True))
+        )
+
+    @property
+    def stylesheet_url(self):
+        if not self.stylesheet:
+            return ''
+        return default_storage.url(self.stylesheet)
+
+class Menu(DirtyFieldsMixin, MPTTModel):
     name = models.CharField(_('nom'), max_length=100)
     url = models.CharField(_('URL'), max_length=255, blank=True)
     page = models.ForeignKey(
@@ -398,5 +572,16 @@ class Menu(MPTTModel):
     def __str__(self):
         return self.name
 
+    def get_url(self):
+        """
+        URL do item: a URL informada ou, na falta dela, a da página ligada.
+        """
+        if self.url or not self.page_id:
+            return self.url
+        try:
+            return self.page.get_absolute_url()
+        except NoReverseMatch:
+            return ''
+
 # novo modelo apartir deste ponto 
 
@@ -0,0 +1,17 @@
+# apps/config/templatetags/menu_tags.py
+from django import template
+from django.utils.safestring import mark_safe
+from utils.menus import render_menu as render_cached_menu, MENU_TEMPLATE
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def render_menu(context, root=None, template_name=MENU_TEMPLATE):
+    """
+    Renderiza o menu (ou apenas a árvore de `root`) marcando o item da página atual.
+    Uso: {% load menu_tags %}{% render_menu %}
+    """
+    request = context.get('request')
+    path = request.path if request is not None else None
+    return mark_safe(render_cached_menu(path, root=root, template_name=template_name))
@@ -1,3 +1,378 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from django.core.files.storage import default_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from .models import Redirect, SiteStyle, Page, CustomField, Menu
+from utils.context_processors import config_context
+from utils.menus import render_menu
+from utils.site_chrome import get_site_chrome
+from utils.cache import redirects_cache
+from utils.redirects import redirect_table
+from utils import redirect_graph
+from utils.redirect_graph import add_redirect, import_redirects, RedirectCycleError
+
+
+class RedirectMiddlewareTests(TestCase):
+    """Testes para a tabela de redirecionamentos em memória"""
+
+    def setUp(self):
+        cache.clear()
+        Redirect.objects.create(old_path='/ancienne-page/', new_path='/nouvelle-page/')
+        Redirect.objects.create(old_path='/blog/*', new_path='/actualites/*')
+        Redirect.objects.create(old_path='/blog/archives/*', new_path='/archives/')
+
+    def test_exact_redirect(self):
+        """Testa o redirecionamento permanente de um caminho exato"""
+        response = self.client.get('/ancienne-page/')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], '/nouvelle-page/')
+
+    def test_wildcard_redirect_uses_longest_prefix(self):
+        """Testa se as regras com '*' usam o prefixo mais longo e mantêm o restante da URL"""
+        response = self.client.get('/blog/2024/mon-article/')
+        self.assertEqual(response['Location'], '/actualites/2024/mon-article/')
+
+        response = self.client.get('/blog/archives/2019/')
+        self.assertEqual(response['Location'], '/archives/')
+
+    def test_table_is_loaded_once_until_changed(self):
+        """Testa se a tabela não consulta o banco até que um redirecionamento seja alterado"""
+        redirect_table.match('/ancienne-page/')
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(redirect_table.match('/ancienne-page/'))
+            self.assertIsNone(redirect_table.match('/sans-redirection/'))
+
+        Redirect.objects.create(old_path='/sans-redirection/', new_path='/')
+        self.assertIsNotNone(redirect_table.match('/sans-redirection/'))
+
+    def test_database_error_does_not_break_requests(self):
+        """Testa se um erro ao ler os redirecionamentos é registrado sem derrubar a requisição"""
+        redirects_cache.invalidate()
+        with mock.patch('django.db.models.query.QuerySet.values_list', side_effect=DatabaseError('no such column')), \
+                self.assertLogs('redirects', 'ERROR'):
+            self.assertIsNone(redirect_table.match('/ancienne-page/'))
+
+
+class RedirectGraphTests(TestCase):
+    """Testes para o achatamento de cadeias e a detecção de ciclos"""
+
+    def test_chain_is_flattened(self):
+        """Testa se A → B → C vira A → C e B → C"""
+        with self.captureOnCommitCallbacks(execute=True):
+            add_redirect(Redirect, old_path='/a/', new_path='/b/')
+            add_redirect(Redirect, old_path='/b/', new_path='/c/')
+
+        self.assertEqual(Redirect.objects.get(old_path='/a/').new_path, '/c/')
+        self.assertEqual(Redirect.objects.get(old_path='/b/').new_path, '/c/')
+
+    def test_new_rule_points_to_final_target(self):
+        """Testa se uma regra para um caminho já redirecionado aponta para o destino final"""
+        add_redirect(Redirect, old_path='/b/', new_path='/c/')
+        add_redirect(Redirect, old_path='/a/', new_path='/b/')
+        self.assertEqual(Redirect.objects.get(old_path='/a/').new_path, '/c/')
+
+    def test_cycle_is_rejected(self):
+        """Testa se um redirecionamento que fecharia um ciclo é recusado"""
+        add_redirect(Redirect, old_path='/a/', new_path='/b/')
+        with self.assertRaises(RedirectCycleError):
+            add_redirect(Redirect, old_path='/b/', new_path='/a/')
+        self.assertFalse(Redirect.objects.filter(old_path='/b/').exists())
+
+    def test_orm_save_flattens_chain(self):
+        """Testa se um save() direto (admin, API) também achata a cadeia"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Redirect.objects.create(old_path='/a/', new_path='/b/')
+            Redirect.objects.create(old_path='/b/', new_path='/c/')
+            Redirect.objects.create(old_path='/z/', new_path='/a/')
+
+        self.assertEqual(
+            dict(Redirect.objects.values_list('old_path', 'new_path')),
+            {'/a/': '/c/', '/b/': '/c/', '/z/': '/c/'}
+        )
+
+    def test_orm_save_rejects_cycle(self):
+        """Testa se um save() direto que fecharia um ciclo é recusado"""
+        Redirect.objects.create(old_path='/a/', new_path='/b/')
+        with self.assertRaises(RedirectCycleError):
+            Redirect.objects.create(old_path='/b/', new_path='/a/')
+        self.assertFalse(Redirect.objects.filter(old_path='/b/').exists())
+
+    def test_full_clean_reports_cycle_on_new_path(self):
+        """Testa se a validação do formulário do admin aponta o ciclo no campo new_path"""
+        Redirect.objects.create(old_path='/a/', new_path='/b/')
+        redirect = Redirect(old_path='/b/', new_path='/a/')
+
+        with self.assertRaises(ValidationError) as context:
+            redirect.full_clean()
+        self.assertIn('new_path', context.exception.message_dict)
+
+    def test_editing_rule_ignores_its_previous_target(self):
+        """Testa se editar uma regra não a compara com a versão antiga dela mesma"""
+        redirect = Redirect.objects.create(old_path='/a/', new_path='/b/')
+        redirect.old_path, redirect.new_path = '/b/', '/a/'
+        redirect.full_clean()
+        redirect.save()
+
+        self.assertEqual(
+            dict(Redirect.objects.values_list('old_path', 'new_path')),
+            {'/b/': '/a/'}
+        )
+
+    def test_bulk_import_reports_only_invalid_rules(self):
+        """Testa se a importação em lote grava as regras válidas e informa as inválidas"""
+        result = import_redirects(Redirect, [
+            {'old_path': '/x/', 'new_path': '/y/'},
+            {'old_path': '/y/', 'new_path': '/z/'},
+            {'old_path': '/z/', 'new_path': '/x/'},
+            {'old_path': '/w/', 'new_path': '/x/'},
+        ])
+
+        self.assertEqual(set(result.errors), {2})
+        self.assertEqual(result.created, 3)
+        self.assertEqual(
+            dict(Redirect.objects.values_list('old_path', 'new_path')),
+            {'/x/': '/z/', '/y/': '/z/', '/w/': '/z/'}
+        )
+
+    def test_bulk_import_loads_only_affected_redirects(self):
+        """Testa se a importação lê apenas os redirecionamentos ligados às regras importadas"""
+        add_redirect(Redirect, old_path='/a/', new_path='/b/')
+        add_redirect(Redirect, old_path='/outro/', new_path='/destino/')
+
+        loaded = set()
+        load_rows = redirect_graph._load_rows
+
+        def tracked_load_rows(lookup, paths):
+            rows = load_rows(lookup, paths)
+            loaded.update(rows)
+            return rows
+
+        with mock.patch('utils.redirect_graph._load_rows', side_effect=tracked_load_rows):
+            result = import_redirects(Redirect, [{'old_path': '/b/', 'new_path': '/c/'}])
+
+        self.assertEqual(loaded, {'/a/'})
+        self.assertFalse(result.errors)
+        self.assertEqual(Redirect.objects.get(old_path='/a/').new_path, '/c/')
+        self.assertEqual(Redirect.objects.get(old_path='/outro/').new_path, '/destino/')
+
+
+class SiteStylesheetTests(TestCase):
+    """Testes para a folha de estilos compilada do SiteStyle"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_stylesheet_is_compiled_on_save(self):
+        """Testa se salvar o estilo grava o CSS minificado com o hash no nome"""
+        style = SiteStyle.objects.create(primary_color='#112233', custom_css='<style>.hero { margin: 0; }</style>')
+        self.assertRegex(style.stylesheet, r'^site_style/site\.[0-9a-f]{12}\.css$')
+
+        with default_storage.open(style.stylesheet) as f:
+            css = f.read().decode()
+        self.assertIn('--primary-color:#112233', css)
+        self.assertIn('.hero{margin:0}', css)
+        self.assertNotIn('<style>', css)
+
+    def test_stylesheet_name_follows_content(self):
+        """Testa se o nome só muda quando o conteúdo compilado muda"""
+        style = SiteStyle.objects.create()
+        first = style.stylesheet
+
+        style.save()
+        self.assertEqual(style.stylesheet, first)
+
+        style.accent_color = '#000000'
+        style.save()
+        self.assertNotEqual(style.stylesheet, first)
+
+    def test_custom_css_tags_are_stripped(self):
+        """Testa se nenhuma tag HTML do CSS personalizado chega à folha de estilos"""
+        style = SiteStyle.objects.create(
+            custom_css='</style><scr<script>ipt>alert(1)</script><!-- x -->ul > li { color: red; }'
+        )
+
+        with default_storage.open(style.stylesheet) as f:
+            css = f.read().decode()
+        self.assertNotIn('<', css)
+        self.assertIn('ul>li{color:red}', css)
+
+    def test_missing_stylesheet_is_generated_by_command(self):
+        """Testa se estilos gravados antes da folha compilada a recebem pelo comando, e não na renderização"""
+        style = SiteStyle.objects.create()
+        SiteStyle.objects.filter(pk=style.pk).update(stylesheet='')
+        default_storage.delete(style.stylesheet)
+        cache.clear()
+
+        self.assertEqual(get_site_chrome().site_style.stylesheet, '')
+        self.assertFalse(default_storage.exists(style.stylesheet))
+
+        call_command('build_site_stylesheets', stdout=StringIO())
+
+        self.assertEqual(SiteStyle.objects.get(pk=style.pk).stylesheet, style.stylesheet)
+        self.assertTrue(default_storage.exists(style.stylesheet))
+        self.assertEqual(get_site_chrome().site_style.stylesheet, style.stylesheet)
+
+    def test_superseded_stylesheets_are_pruned(self):
+        """Testa se só a folha de estilos atual e a anterior são mantidas"""
+        style = SiteStyle.objects.create()
+        names = [style.stylesheet]
+        for color in ('#000000', '#111111'):
+            style.accent_color = color
+            with self.captureOnCommitCallbacks(execute=True):
+                style.save()
+            names.append(style.stylesheet)
+
+        _, filenames = default_storage.listdir('site_style')
+        self.assertEqual({f'site_style/{filename}' for filename in filenames}, set(names[1:]))
+
+
+class PageCustomFieldTests(TestCase):
+    """Testes para o acesso aos campos personalizados das páginas"""
+
+    def setUp(self):
+        CustomField.objects.create(name='prix', field_type='number')
+        CustomField.objects.create(name='evenement', field_type='date')
+        CustomField.objects.create(name='gratuit', field_type='boolean')
+        self.page = Page.objects.create(title='Tarifs', slug='tarifs', content='...')
+        self.page.set_custom_field_values({
+            'prix': 42,
+            'evenement': date(2024, 5, 1),
+            'gratuit': False,
+            'sous_titre': 'Nos offres',
+        })
+
+    def test_values_are_read_with_a_single_query(self):
+        """Testa se todos os campos são lidos em uma consulta e convertidos para o tipo do campo"""
+        page = Page.objects.get(pk=self.page.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(page.get_typed_custom_field_value('prix'), 42)
+            self.assertEqual(page.get_typed_custom_field_value('evenement'), date(2024, 5, 1))
+            self.assertIs(page.get_typed_custom_field_value('gratuit'), False)
+            self.assertEqual(page.get_custom_field_value('sous_titre'), 'Nos offres')
+            self.assertIsNone(page.get_custom_field_value('inexistant'))
+
+    def test_prefetch_for_page_list(self):
+        """Testa se os campos de várias páginas são carregados em uma única consulta"""
+        other = Page.objects.create(title='Contact', slug='contact', content='...')
+        other.set_custom_field_value('prix', '10')
+
+        pages = list(Page.objects.order_by('pk'))
+        with self.assertNumQueries(1):
+            Page.prefetch_custom_fields(pages)
+        with self.assertNumQueries(0):
+            self.assertEqual([page.custom_values['prix'] for page in pages], [42, 10])
+
+    def test_bulk_setter_writes_only_changes(self):
+        """Testa se o setter em lote grava apenas os valores alterados"""
+        with CaptureQueriesContext(connection) as queries:
+            self.page.set_custom_field_values({'prix': 42, 'gratuit': True})
+        writes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+
+        page = Page.objects.get(pk=self.page.pk)
+        self.assertIs(page.get_typed_custom_field_value('gratuit'), True)
+
+
+class MenuRenderingTests(TestCase):
+    """Testes para o HTML do menu em cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.blog = Menu.objects.create(name='Blog', url='/blog/', order=1)
+        self.news = Menu.objects.create(name='Actualités', url='/blog/actualites/', parent=self.blog)
+        self.contact = Menu.objects.create(name='Contact', url='/contact/', order=2)
+
+    def test_active_item_and_ancestors_are_marked(self):
+        """Testa se o item ativo (por prefixo) e seus ancestrais são marcados"""
+        html = render_menu('/blog/actualites/article-1/')
+        self.assertInHTML(
+            '<a class="nav-link active" href="/blog/actualites/" aria-current="page">Actualités</a>', html
+        )
+        self.assertIn('dropdown-toggle active', html)
+        self.assertNotIn('href="/contact/" aria-current', html)
+
+    def test_html_is_cached_until_menus_change(self):
+        """Testa se o HTML é reutilizado e refeito quando um menu é alterado"""
+        render_menu('/contact/')
+        with self.assertNumQueries(0):
+            render_menu('/contact/')
+
+        self.contact.name = 'Nous contacter'
+        self.contact.save()
+        self.assertIn('Nous contacter', render_menu('/contact/'))
+
+    def test_page_outside_menus(self):
+        """Testa se uma página sem item de menu é renderizada sem item ativo"""
+        html = render_menu('/mentions-legales/')
+        self.assertNotIn('active', html)
+        self.assertEqual(render_menu('/mentions-legales/', root=self.contact).count('<li'), 1)
+
+
+class SiteChromeTests(TestCase):
+    """Testes para o estilo e o menu compartilhados pelo context processor"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.style = SiteStyle.objects.create(primary_color='#112233')
+        self.blog = Menu.objects.create(name='Blog', url='/blog/', order=1)
+        Menu.objects.create(name='Actualités', url='/blog/actualites/', parent=self.blog)
+        cache.clear()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_context_processor_is_lazy(self):
+        """Testa se o context processor não acessa o banco nem o cache antes do uso"""
+        with mock.patch('utils.context_processors.get_site_chrome', wraps=get_site_chrome) as get_chrome:
+            with self.assertNumQueries(0):
+                context = config_context(RequestFactory().get('/'))
+            get_chrome.assert_not_called()
+
+            with self.assertNumQueries(2):
+                self.assertEqual(context['site_style'].primary_color, '#112233')
+                menu = list(context['main_menu'])
+                # A árvore inteira já vem montada: percorrer os filhos não consulta o banco
+                self.assertEqual([child.name for child in menu[0].get_children()], ['Actualités'])
+            get_chrome.assert_called_once()
+
+    def test_chrome_is_cached_between_requests(self):
+        """Testa se as requisições seguintes não fazem consultas"""
+        get_site_chrome()
+        with self.assertNumQueries(0):
+            context = config_context(RequestFactory().get('/'))
+            context['site_style'].primary_color
+            [item.get_children() for item in context['main_menu']]
+
+    def test_chrome_is_rebuilt_when_style_or_menu_changes(self):
+        """Testa se alterar o estilo ou um menu gera um novo SiteChrome"""
+        get_site_chrome()
+
+        self.style.primary_color = '#445566'
+        self.style.save()
+        self.assertEqual(get_site_chrome().site_style.primary_color, '#445566')
+
+        self.blog.name = 'Journal'
+        self.blog.save()
+        self.assertEqual(get_site_chrome().main_menu[0].name, 'Journal')
+
+        Menu.objects.create(name='Contact', url='/contact/', order=2)
+        self.assertEqual([item.name for item in get_site_chrome().main_menu], ['Journal', 'Contact'])
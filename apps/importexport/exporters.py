@@ -1,27 +1,55 @@
 import json
 import csv
 import yaml
+import io
 import os
 import zipfile
 import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core import serializers
 from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils.text import slugify
-from io import StringIO, BytesIO
+from io import StringIO
 from ..pages.models import (
     Page, PageCategory, PageTemplate, FieldGroup, FieldDefinition, 
     PageFieldValue, PageGallery, PageImage, PageMeta
 )
 
 
+# Plano de consultas comum a todos os formatos: cada relação exportada é carregada
+# uma vez por bloco de páginas, em vez de uma consulta por página
+EXPORT_SELECT_RELATED = ('template', 'parent', 'created_by')
+
+
+# Formatos já comprimidos: gravados no ZIP sem nova compressão (ZIP_STORED)
+COMPRESSED_EXTENSIONS = frozenset({
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.heic',
+    '.mp3', '.ogg', '.m4a', '.mp4', '.mov', '.webm',
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar', '.woff', '.woff2',
+})
+ZIP_WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+def get_export_prefetches():
+    return [
+        'categories',
+        Prefetch('field_values', queryset=PageFieldValue.objects.select_related('field__group')),
+        'meta_items',
+        Prefetch('galleries', queryset=PageGallery.objects.prefetch_related('images')),
+    ]
+
+
 class BaseExporter:
     """Classe base para exportadores de conteúdo"""
     
-    def __init__(self, queryset=None, user=None):
-        self.queryset = queryset or []
+    def __init__(self, queryset=None, user=None, chunk_size=None):
+        self.queryset = queryset if queryset is not None else []
         self.user = user
+        self.chunk_size = chunk_size or getattr(settings, 'IMPORTEXPORT_CHUNK_SIZE', 200)
         self.export_date = timezone.now()
         self.exported_data = {}
         self.temp_files = []
@@ -34,6 +62,50 @@ class BaseExporter:
         """Exporta os dados no formato específico"""
         self.prepare_export()
         return self.get_export_data()
+
+    def stream(self):
+        """
+        Gera a exportação em partes, para StreamingHttpResponse ou write_to().
+        Por padrão, a exportação inteira é uma única parte.
+        """
+        yield self.export()
+
+    def write_to(self, output):
+        """Grava a exportação em um arquivo aberto, parte por parte"""
+        for chunk in self.stream():
+            output.write(chunk)
+
+    def iter_pages(self):
+        """
+        Percorre as páginas em blocos de chunk_size, sem carregar todas em memória.
+        As relações exportadas (EXPORT_SELECT_RELATED e get_export_prefetches())
+        são carregadas bloco a bloco.
+        """
+        if hasattr(self.queryset, 'iterator'):
+            queryset = self.queryset.select_related(*EXPORT_SELECT_RELATED).prefetch_related(*get_export_prefetches())
+            return queryset.iterator(chunk_size=self.chunk_size)
+        return self._iter_page_list()
+
+    def _iter_page_list(self):
+        pages = list(self.queryset)
+        for start in range(0, len(pages), self.chunk_size):
+            chunk = pages[start:start + self.chunk_size]
+            prefetch_related_objects(chunk, *EXPORT_SELECT_RELATED, *get_export_prefetches())
+            yield from chunk
+
+    def count_pages(self):
+        if hasattr(self.queryset, 'count') and not isinstance(self.queryset, (list, tuple)):
+            return self.queryset.count()
+        return len(self.queryset)
+
+    def get_export_info(self):
+        """Dados sobre a exportação"""
+        return {
+            'export_date': self.export_date.isoformat(),
+            'exporter': self.user.username if self.user else 'anonymous',
+            'version': '1.0',
+            'count': self.count_pages()
+        }
     
     def get_export_data(self):
         """Retorna os dados exportados no formato apropriado"""
@@ -48,63 +120,67 @@ class BaseExporter:
 
 
 class JSONExporter(BaseExporter):
-    """Exportador para formato JSON"""
+    """
+    Exportador para formato JSON.
+
+    O JSON é gerado página por página (stream()): a memória usada não depende
+    do número de páginas exportadas.
+    """
     
-    def prepare_export(self):
-        """Prepara os dados para exportação em JSON"""
-        pages_data = []
+    def serialize_page(self, page):
+        """Retorna os dados de uma página"""
+        # Dados básicos da página
+        page_data = {
+            'id': page.id,
+            'title': page.title,
+            'slug': page.slug,
+            'content': page.content,
+            'summary': page.summary,
+            'status': page.status,
+            'created_at': page.created_at.isoformat(),
+            'updated_at': page.updated_at.isoformat(),
+            'published_at': page.published_at.isoformat() if page.published_at else None,
+            'meta_title': page.meta_title,
+            'meta_description': page.meta_description,
+            'meta_keywords': page.meta_keywords,
+            'created_by': page.created_by.username if page.created_by else None,
+            'template': page.template.slug if page.template else None,
+            'parent': page.parent.slug if page.parent else None,
+            'categories': [cat.slug for cat in page.categories.all()],
+        }
         
-        for page in self.queryset:
-            # Dados básicos da página
-            page_data = {
-                'id': page.id,
-                'title': page.title,
-                'slug': page.slug,
-                'content': page.content,
-                'summary': page.summary,
-                'status': page.status,
-                'created_at': page.created_at.isoformat(),
-                'updated_at': page.updated_at.isoformat(),
-                'published_at': page.published_at.isoformat() if page.published_at else None,
-                'meta_title': page.meta_title,
-                'meta_description': page.meta_description,
-                'meta_keywords': page.meta_keywords,
-                'created_by': page.created_by.username if page.created_by else None,
-                'template': page.template.slug if page.template else None,
-                'parent': page.parent.slug if page.parent else None,
-                'categories': [cat.slug for cat in page.categories.all()],
-            }
-            
-            # Campos personalizados
-            page_data['fields'] = self._get_custom_fields(page)
-            
-            # Metadados adicionais
-            page_data['meta'] = self._get_meta_items(page)
-            
-            # Galerias
-            page_data['galleries'] = self._get_galleries(page)
-            
-            pages_data.append(page_data)
+        # Campos personalizados
+        page_data['fields'] = self._get_custom_fields(page)
         
-        # Dados de exportação
-        export_info = {
-            'export_date': self.export_date.isoformat(),
-            'exporter': self.user.username if self.user else 'anonymous',
-            'version': '1.0',
-            'count': len(pages_data)
-        }
+        # Metadados adicionais
+        page_data['meta'] = self._get_meta_items(page)
         
-        # Montagem final dos dados
-        self.exported_data = {
-            'export_info': export_info,
-            'pages': pages_data
-        }
+        # Galerias
+        page_data['galleries'] = self._get_galleries(page)
+        
+        return page_data
+    
+    def stream(self, pages=None):
+        """
+        Gera o mesmo documento de json.dumps({'export_info': ..., 'pages': [...]}, indent=2),
+        uma página por vez. Por padrão, as páginas vêm de iter_pages().
+        """
+        export_info = json.dumps(self.get_export_info(), indent=2).replace('\n', '\n  ')
+        yield f'{{\n  "export_info": {export_info},\n  "pages": ['
+        
+        separator = '\n    '
+        for page in (pages if pages is not None else self.iter_pages()):
+            page_json = json.dumps(self.serialize_page(page), indent=2).replace('\n', '\n    ')
+            yield f'{separator}{page_json}'
+            separator = ',\n    '
+        
+        yield '\n  ]\n}' if separator != '\n    ' else ']\n}'
     
     def _get_custom_fields(self, page):
         """Retorna os campos personalizados da página"""
         fields = {}
         
-        for field_value in page.field_values.select_related('field__group').all():
+        for field_value in page.field_values.all():
             group_slug = field_value.field.group.slug
             field_slug = field_value.field.slug
             
@@ -166,7 +242,7 @@ class JSONExporter(BaseExporter):
     
     def get_export_data(self):
         """Retorna os dados em formato JSON"""
-        return json.dumps(self.exported_data, indent=2)
+        return ''.join(self.stream())
 
 
 class XMLExporter(BaseExporter):
@@ -204,7 +280,7 @@ class CSVExporter(BaseExporter):
         writer.writerow(headers)
         
         # Linhas para cada página
-        for page in self.queryset:
+        for page in self.iter_pages():
             row = [
                 page.id,
                 page.title,
@@ -233,7 +309,7 @@ class YAMLExporter(BaseExporter):
         # Similar ao JSON, mas formatado como YAML
         pages_data = []
         
-        for page in self.queryset:
+        for page in self.iter_pages():
             # Dados básicos da página
             page_data = {
                 'id': page.id,
@@ -279,7 +355,7 @@ class YAMLExporter(BaseExporter):
         """Retorna os campos personalizados da página"""
         fields = {}
         
-        for field_value in page.field_values.select_related('field__group').all():
+        for field_value in page.field_values.all():
             group_slug = field_value.field.group.slug
             field_slug = field_value.field.slug
             
@@ -300,70 +376,151 @@ class YAMLExporter(BaseExporter):
         return meta
 
 
+class ZipStream(io.RawIOBase):
+    """
+    Destino não posicionável para zipfile.ZipFile: guarda apenas o que foi gravado
+    desde a última chamada a pop(). O zipfile usa descritores de dados nesse modo,
+    então o arquivo pode ser enviado enquanto é montado.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
 class ZipExporter(BaseExporter):
-    """Exportador para formato ZIP com JSON e arquivos"""
+    """
+    Exportador para formato ZIP com JSON e arquivos.
+
+    O ZIP é gerado em partes (stream()), sem manter o arquivo inteiro em memória.
+    Arquivos de mídia são lidos por um pool de threads limitado e os formatos já
+    comprimidos (COMPRESSED_EXTENSIONS) são gravados sem nova compressão.
+    """
     
-    def prepare_export(self):
-        """Prepara os dados para exportação em ZIP"""
-        # Cria um arquivo ZIP em memória
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Exporta os dados em JSON
-            json_exporter = JSONExporter(self.queryset, self.user)
-            json_data = json_exporter.export()
-            
-            # Adiciona o arquivo JSON ao ZIP
-            zip_file.writestr('pages.json', json_data)
+    def __init__(self, *args, read_workers=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_workers = read_workers or getattr(settings, 'IMPORTEXPORT_READ_WORKERS', 4)
+        # Arquivos maiores que isso não são lidos antecipadamente: são copiados em blocos
+        self.prefetch_max_size = getattr(settings, 'IMPORTEXPORT_PREFETCH_MAX_SIZE', 4 * 1024 * 1024)
+    
+    def stream(self):
+        """Gera o arquivo ZIP em partes"""
+        # Arquivos de mídia encontrados enquanto o JSON é gerado: {caminho: caminho no ZIP}
+        media_files = {}
+        
+        def pages_with_media():
+            # Uma única leitura das páginas (e do plano de consultas) para o JSON e a mídia
+            for page in self.iter_pages():
+                media_files.update(self._get_media_files(page))
+                yield page
+        
+        output = ZipStream()
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            # Exporta os dados em JSON, gravados no ZIP à medida que são gerados
+            json_exporter = JSONExporter(self.queryset, self.user, self.chunk_size)
+            # O tamanho final é desconhecido: ZIP64 evita o erro acima de 2 GB
+            with zip_file.open('pages.json', 'w', force_zip64=True) as json_file:
+                for chunk in json_exporter.stream(pages_with_media()):
+                    json_file.write(chunk.encode('utf-8'))
+                    yield output.pop()
             
             # Adiciona os arquivos associados (imagens, mídia, etc.)
-            self._add_files_to_zip(zip_file)
+            for _ in self._add_files_to_zip(zip_file, media_files):
+                yield output.pop()
             
             # Adiciona um arquivo README
-            readme_content = self._generate_readme()
-            zip_file.writestr('README.txt', readme_content)
+            zip_file.writestr('README.txt', self._generate_readme())
         
-        # Obtém os dados do ZIP
-        zip_buffer.seek(0)
-        self.exported_data = zip_buffer.getvalue()
-        zip_buffer.close()
+        yield output.pop()
     
-    def _add_files_to_zip(self, zip_file):
-        """Adiciona arquivos associados às páginas ao arquivo ZIP"""
-        media_root = settings.MEDIA_ROOT
-        media_url = settings.MEDIA_URL
-        
-        files_added = set()  # Para evitar duplicatas
-        
-        for page in self.queryset:
-            # Adiciona a imagem OG, se existir
-            if page.og_image:
-                file_path = os.path.join(media_root, page.og_image.name)
-                zip_path = os.path.join('media', page.og_image.name)
-                
-                if file_path not in files_added and os.path.exists(file_path):
-                    zip_file.write(file_path, zip_path)
-                    files_added.add(file_path)
-            
-            # Adiciona arquivos de campos personalizados
-            for field_value in page.field_values.filter(file__isnull=False):
-                if field_value.file:
-                    file_path = os.path.join(media_root, field_value.file.name)
-                    zip_path = os.path.join('media', field_value.file.name)
+    def get_export_data(self):
+        """Retorna o arquivo ZIP completo (para o envio em partes, use stream() ou write_to())"""
+        return b''.join(self.stream())
+    
+    def _get_media_files(self, page):
+        """Retorna {caminho local: caminho no ZIP} dos arquivos associados à página"""
+        files = []
+        
+        # Imagem OG, se existir
+        if page.og_image:
+            files.append(page.og_image)
+        
+        # Arquivos de campos personalizados
+        files.extend(field_value.file for field_value in page.field_values.all() if field_value.file)
+        
+        # Imagens de galerias
+        for gallery in page.galleries.all():
+            files.extend(image.image for image in gallery.images.all() if image.image)
+        
+        return {
+            os.path.join(settings.MEDIA_ROOT, file.name): os.path.join('media', file.name)
+            for file in files
+        }
+    
+    def _read_media_file(self, file_path):
+        """Executado pelas threads: lê arquivos pequenos; os grandes são copiados depois, em blocos"""
+        if os.path.getsize(file_path) > self.prefetch_max_size:
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+    
+    def _add_files_to_zip(self, zip_file, media_files):
+        """
+        Adiciona ao ZIP os arquivos associados às páginas, um por vez e na ordem,
+        enquanto as próximas leituras acontecem em paralelo. Gera após cada bloco gravado.
+        """
+        files = ((path, zip_path) for path, zip_path in media_files.items() if os.path.isfile(path))
+        pending = deque()
+        
+        with ThreadPoolExecutor(max_workers=self.read_workers) as executor:
+            try:
+                while True:
+                    # Limita as leituras antecipadas (e a memória usada por elas)
+                    for file_path, zip_path in files:
+                        pending.append((file_path, zip_path, executor.submit(self._read_media_file, file_path)))
+                        if len(pending) >= self.read_workers * 2:
+                            break
+                    if not pending:
+                        break
                     
-                    if file_path not in files_added and os.path.exists(file_path):
-                        zip_file.write(file_path, zip_path)
-                        files_added.add(file_path)
-            
-            # Adiciona imagens de galerias
-            for gallery in page.galleries.all():
-                for image in gallery.images.all():
-                    if image.image:
-                        file_path = os.path.join(media_root, image.image.name)
-                        zip_path = os.path.join('media', image.image.name)
-                        
-                        if file_path not in files_added and os.path.exists(file_path):
-                            zip_file.write(file_path, zip_path)
-                            files_added.add(file_path)
+                    file_path, zip_path, future = pending.popleft()
+                    yield from self._write_file(zip_file, file_path, zip_path, future.result())
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+    
+    def _write_file(self, zip_file, file_path, zip_path, data=None):
+        """Grava um arquivo no ZIP; gera após cada bloco, para que ele seja enviado"""
+        zip_info = zipfile.ZipInfo.from_file(file_path, zip_path)
+        extension = os.path.splitext(file_path)[1].lower()
+        zip_info.compress_type = zipfile.ZIP_STORED if extension in COMPRESSED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        
+        with zip_file.open(zip_info, 'w') as entry:
+            if data is not None:
+                entry.write(data)
+                yield zip_path
+                return
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(ZIP_WRITE_CHUNK_SIZE), b''):
+                    entry.write(chunk)
+                    yield zip_path
     
     def _generate_readme(self):
         """Gera um arquivo README com informações sobre a exportação"""
@@ -371,7 +528,7 @@ class ZipExporter(BaseExporter):
         
         Export Date: {self.export_date.strftime('%Y-%m-%d %H:%M:%S')}
         Exported By: {self.user.username if self.user else 'Anonymous'}
-        Pages Count: {self.queryset.count()}
+        Pages Count: {self.count_pages()}
 
         This archive contains the following files:
         - pages.json: Contains all page data in JSON format
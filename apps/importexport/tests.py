@@ -1,3 +1,264 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..pages.models import (
+    Page, PageCategory, PageTemplate, FieldGroup, FieldDefinition,
+    PageFieldValue, PageGallery, PageImage, PageMeta
+)
+from .exporters import JSONExporter, ZipExporter, ZipStream
+
+
+class ZipStreamTests(SimpleTestCase):
+    """Testes do destino não posicionável usado na exportação ZIP em partes"""
+
+    def test_zip_written_in_parts_is_valid(self):
+        """Testa se as partes retiradas com pop() formam um ZIP válido"""
+        output = ZipStream()
+        parts = []
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            with zip_file.open('pages.json', 'w', force_zip64=True) as entry:
+                for i in range(100):
+                    entry.write(f'{{"page": {i}}}\n'.encode())
+                    parts.append(output.pop())
+            zip_file.writestr('README.txt', 'leia-me')
+            parts.append(output.pop())
+        parts.append(output.pop())
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(parts))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.read('README.txt'), b'leia-me')
+            self.assertEqual(archive.read('pages.json').count(b'\n'), 100)
+
+    def test_pop_returns_only_new_data(self):
+        """Testa se pop() esvazia o buffer sem alterar a posição"""
+        output = ZipStream()
+        output.write(b'abc')
+        self.assertEqual(output.pop(), b'abc')
+        output.write(b'de')
+        self.assertEqual((output.pop(), output.tell()), (b'de', 5))
+        self.assertFalse(output.seekable())
+
+
+class JSONStreamTests(SimpleTestCase):
+    """Testes do JSON gerado página por página"""
+
+    def assertStreamMatchesDumps(self, pages):
+        exporter = JSONExporter(pages)
+        with mock.patch.object(JSONExporter, 'serialize_page', side_effect=lambda page: page):
+            streamed = ''.join(exporter.stream(pages))
+        expected = json.dumps({'export_info': exporter.get_export_info(), 'pages': pages}, indent=2)
+        self.assertEqual(streamed, expected)
+
+    def test_stream_matches_json_dumps(self):
+        """Testa se o documento gerado é igual ao de json.dumps(indent=2) para 0, 1 e N páginas"""
+        page = {'id': 1, 'title': 'Página', 'categories': [], 'fields': {'a': [1, 2]}, 'meta': {}}
+        for count in (0, 1, 5):
+            with self.subTest(count=count):
+                self.assertStreamMatchesDumps([dict(page, id=i) for i in range(count)])
+
+
+def _png(name='imagem.png'):
+    from PIL import Image
+    output = io.BytesIO()
+    Image.new('RGB', (4, 3)).save(output, 'PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+class ExportDataMixin:
+    """Cria páginas com todas as relações exportadas"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.template = PageTemplate.objects.create(name='Padrão', slug='padrao')
+        group = FieldGroup.objects.create(name='Evento', slug='evento', template=self.template)
+        self.field = FieldDefinition.objects.create(name='Local', slug='local', field_type='text', group=group)
+        self.categories = [
+            PageCategory.objects.create(name=f'Categoria {index}', slug=f'categoria-{index}')
+            for index in range(2)
+        ]
+        self.page_count = 0
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_pages(self, count):
+        pages = []
+        for _ in range(count):
+            self.page_count += 1
+            number = self.page_count
+            page = Page.objects.create(
+                title=f'Página {number}', slug=f'pagina-{number}', custom_url=f'/pagina-{number}/',
+                template=self.template, content='<p>Conteúdo</p>'
+            )
+            page.categories.set(self.categories)
+            PageFieldValue.objects.create(page=page, field=self.field, value=f'Sala {number}')
+            PageMeta.objects.create(page=page, key='autor', value='Equipe')
+            gallery = PageGallery.objects.create(name=f'Galeria {number}', slug=f'galeria-{number}', page=page)
+            PageImage.objects.create(gallery=gallery, image=_png(), title='Foto')
+            pages.append(page)
+        return pages
+
+
+class ExportQueryTests(ExportDataMixin, TestCase):
+    """Testes do plano de consultas dos exportadores (iter_pages/get_export_prefetches)"""
+
+    def count_export_queries(self, exporter_class):
+        with CaptureQueriesContext(connection) as queries:
+            exporter_class(Page.objects.all()).export()
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_count(self):
+        """Testa se exportar mais páginas, com todas as relações, não faz mais consultas"""
+        self.create_pages(2)
+        expected = {exporter_class: self.count_export_queries(exporter_class) for exporter_class in (JSONExporter, ZipExporter)}
+
+        self.create_pages(6)
+        for exporter_class, num_queries in expected.items():
+            with self.subTest(exporter=exporter_class.__name__), self.assertNumQueries(num_queries):
+                exporter_class(Page.objects.all()).export()
+
+    def test_exported_relations(self):
+        """Testa se as relações carregadas em bloco aparecem no JSON de cada página"""
+        self.create_pages(3)
+        data = json.loads(JSONExporter(Page.objects.order_by('pk')).export())
+
+        self.assertEqual(data['export_info']['count'], 3)
+        page = data['pages'][0]
+        self.assertEqual(page['categories'], ['categoria-0', 'categoria-1'])
+        self.assertEqual(page['fields'], {'evento': {'local': {'type': 'text', 'value': 'Sala 1'}}})
+        self.assertEqual(page['meta'], {'autor': 'Equipe'})
+        self.assertEqual([image['title'] for image in page['galleries'][0]['images']], ['Foto'])
+
+
+class ExportViewTests(ExportDataMixin, TestCase):
+    """Testes do envio da exportação em partes pela view"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_superuser(email='admin@example.com', password='password')
+        self.client.force_login(self.user)
+        self.pages = self.create_pages(3)
+
+    def export(self, export_format):
+        return self.client.post(reverse('importexport:export_selected'), {
+            'selected_pages': [page.pk for page in self.pages],
+            'export_format': export_format,
+        })
+
+    def test_json_export_is_streamed(self):
+        """Testa se a exportação JSON é uma resposta em partes com uma parte por página"""
+        response = self.export('json')
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('attachment; filename="pages_export_', response['Content-Disposition'])
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), len(self.pages))
+        data = json.loads(b''.join(chunks))
+        self.assertEqual(len(data['pages']), len(self.pages))
+
+    def test_zip_export_is_streamed(self):
+        """Testa se o ZIP enviado em partes é válido e contém o JSON e as imagens"""
+        response = self.export('zip')
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertIsNone(archive.testzip())
+            names = archive.namelist()
+            self.assertEqual(len(json.loads(archive.read('pages.json'))['pages']), len(self.pages))
+        self.assertEqual(sum(name.startswith('media/') for name in names), len(self.pages))
+
+    def test_temporary_files_are_removed_after_streaming(self):
+        """Testa se os arquivos temporários são removidos quando o envio termina"""
+        with mock.patch.object(JSONExporter, 'clean_temp_files') as clean_temp_files:
+            response = self.export('json')
+            clean_temp_files.assert_not_called()
+            b''.join(response.streaming_content)
+        clean_temp_files.assert_called_once_with()
+
+
+class ZipMediaTests(SimpleTestCase):
+    """Testes da gravação dos arquivos de mídia no ZIP"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def create_files(self, names):
+        media_files = {}
+        for index, name in enumerate(names):
+            path = os.path.join(self.directory, name)
+            with open(path, 'wb') as f:
+                f.write(f'{name} {index} '.encode() * 50)
+            media_files[path] = f'media/{name}'
+        return media_files
+
+    def write_zip(self, exporter, media_files):
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for _ in exporter._add_files_to_zip(zip_file, media_files):
+                pass
+        return zipfile.ZipFile(io.BytesIO(output.getvalue()))
+
+    def test_compressed_formats_are_stored(self):
+        """Testa se formatos já comprimidos são gravados sem compressão e os demais com deflate"""
+        media_files = self.create_files(['foto.JPG', 'video.mp4', 'fonte.woff2', 'texto.txt', 'dados.csv'])
+
+        with self.write_zip(ZipExporter([]), media_files) as archive:
+            compress_types = {info.filename: info.compress_type for info in archive.infolist()}
+
+        self.assertEqual(compress_types, {
+            'media/foto.JPG': zipfile.ZIP_STORED,
+            'media/video.mp4': zipfile.ZIP_STORED,
+            'media/fonte.woff2': zipfile.ZIP_STORED,
+            'media/texto.txt': zipfile.ZIP_DEFLATED,
+            'media/dados.csv': zipfile.ZIP_DEFLATED,
+        })
+
+    def test_parallel_reads_are_written_in_order(self):
+        """Testa se os arquivos lidos em paralelo (e os grandes, copiados em blocos) são gravados na ordem"""
+        media_files = self.create_files([f'arquivo-{index:02d}.txt' for index in range(20)])
+        exporter = ZipExporter([], read_workers=4)
+        read_media_file = exporter._read_media_file
+        # Metade dos arquivos é tratada como grande: copiada em blocos, sem leitura antecipada
+        large = set(list(media_files)[::2])
+
+        def slow_read(file_path):
+            # Leituras terminam fora de ordem
+            time.sleep(random.uniform(0, 0.01))
+            return None if file_path in large else read_media_file(file_path)
+
+        with mock.patch.object(exporter, '_read_media_file', side_effect=slow_read):
+            archive = self.write_zip(exporter, media_files)
+
+        with archive:
+            self.assertEqual(archive.namelist(), list(media_files.values()))
+            for path, zip_path in media_files.items():
+                with open(path, 'rb') as f:
+                    self.assertEqual(archive.read(zip_path), f.read())
+
+    def test_missing_files_are_skipped(self):
+        """Testa se arquivos removidos do disco são ignorados"""
+        media_files = self.create_files(['a.txt'])
+        media_files[os.path.join(self.directory, 'removido.txt')] = 'media/removido.txt'
+
+        with self.write_zip(ZipExporter([]), media_files) as archive:
+            self.assertEqual(archive.namelist(), ['media/a.txt'])
@@ -3,7 +3,7 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.utils.text import slugify
 from django.core.paginator import Paginator
@@ -98,9 +98,6 @@ def export_selected(request):
         messages.error(request, f"Formato de exportação '{export_format}' não suportado.")
         return redirect('importexport:export_list')
     
-    # Realiza a exportação
-    exported_data = exporter.export()
-    
     # Define o nome do arquivo
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f"pages_export_{timestamp}.{export_format}"
@@ -115,16 +112,21 @@ def export_selected(request):
     }
     content_type = content_types.get(export_format, 'application/octet-stream')
     
-    # Cria a resposta HTTP
-    response = HttpResponse(exported_data, content_type=content_type)
+    # A exportação é gerada enquanto a resposta é enviada
+    response = StreamingHttpResponse(_stream_export(exporter), content_type=content_type)
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
-    # Limpa arquivos temporários
-    exporter.clean_temp_files()
-    
     return response
 
 
+def _stream_export(exporter):
+    """Envia a exportação parte por parte e limpa os arquivos temporários no final"""
+    try:
+        yield from exporter.stream()
+    finally:
+        exporter.clean_temp_files()
+
+
 @login_required
 @permission_required('pages.add_page')
 def import_form(request):
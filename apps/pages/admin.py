@@ -16,6 +16,7 @@ from mptt.admin import MPTTModelAdmin, DraggableMPTTAdmin
 import csv
 from django.http import HttpResponse
 from django.template.response import TemplateResponse
+from utils.redirect_graph import import_redirects
 from .forms import PageForm
 from .models import (
     PageApproval, PageCategory, PageStatusHistory, PageTemplate, FieldGroup, FieldDefinition, Page, PageVersion,
@@ -368,6 +369,9 @@ class PageAdmin(DraggableMPTTAdmin):
             )
     
     def publish_pages(self, request, queryset):
+        # update() não chama save(): o conteúdo ainda não processado é preparado aqui
+        for page in queryset.filter(rendered_content='').exclude(content='').only('pk', 'content'):
+            Page.objects.filter(pk=page.pk).update(rendered_content=page.render_content())
         updated = queryset.update(status='published', published_at=timezone.now())
         self.message_user(request, _(f'{updated} pages were successfully published.'))
     publish_pages.short_description = _('Publish selected pages')
@@ -633,13 +637,43 @@ class PageRedirectAdmin(admin.ModelAdmin):
             csv_file = request.FILES['csv_file']
             decoded_file = csv_file.read().decode('utf-8').splitlines()
             reader = csv.DictReader(decoded_file)
-            for row in reader:
-                PageRedirect.objects.create(
-                    old_path=row['old_path'],
-                    new_path=row['new_path'],
-                    redirect_type=row['redirect_type']
-                )
-            messages.success(request, 'Redirects imported successfully.')
+            
+            # Todas as linhas são validadas juntas: cadeias achatadas e ciclos recusados
+            rules = []
+            lines = []
+            errors = []
+            rows = list(reader)
+            page_ids = Page.objects.in_bulk(
+                [row['page'] for row in rows if (row.get('page') or '').isdigit()]
+            )
+            for line, row in enumerate(rows, start=2):
+                page_id = row.get('page') or ''
+                redirect_type = row.get('redirect_type') or '301'
+                if not page_id.isdigit() or int(page_id) not in page_ids:
+                    errors.append(_('Linha {}: página de destino inválida.').format(line))
+                elif redirect_type not in ('301', '302'):
+                    errors.append(_('Linha {}: tipo de redirecionamento inválido.').format(line))
+                else:
+                    rules.append({
+                        'old_path': (row.get('old_path') or '').strip(),
+                        'new_path': (row.get('new_path') or '').strip(),
+                        'redirect_type': int(redirect_type),
+                        'page_id': int(page_id),
+                        'created_by': request.user,
+                    })
+                    lines.append(line)
+            
+            result = import_redirects(PageRedirect, rules)
+            for index, error in sorted(result.errors.items()):
+                errors.append(_('Linha {}: {}').format(lines[index], ' '.join(error.messages)))
+            
+            messages.success(request, _('{} redirecionamentos criados, {} atualizados.').format(
+                result.created, result.updated
+            ))
+            for error in errors[:20]:
+                messages.warning(request, error)
+            if len(errors) > 20:
+                messages.warning(request, _('… e mais {} linhas recusadas.').format(len(errors) - 20))
             return redirect('..')
         return render(request, 'admin/import_redirects.html')
 
@@ -647,9 +681,9 @@ class PageRedirectAdmin(admin.ModelAdmin):
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="redirects.csv"'
         writer = csv.writer(response)
-        writer.writerow(['old_path', 'new_path', 'redirect_type'])
+        writer.writerow(['old_path', 'new_path', 'redirect_type', 'page'])
         for redirect in PageRedirect.objects.all():
-            writer.writerow([redirect.old_path, redirect.new_path, redirect.redirect_type])
+            writer.writerow([redirect.old_path, redirect.new_path, redirect.redirect_type, redirect.page_id])
         return response
 
 class PageCommentAdmin(admin.ModelAdmin):
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='rendered_content',
+            field=models.TextField(blank=True, editable=False, help_text='Conteúdo com as URLs de mídia apontando para o CDN', verbose_name='Conteúdo processado'),
+        ),
+        migrations.AddField(
+            model_name='pageversion',
+            name='rendered_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='Conteúdo processado'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-20 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0002_page_rendered_content'),
+    ]
+
+    operations = [
+        # O campo existia no modelo sem migração. Registros antigos ficam com o
+        # caminho vazio e redirecionam para a URL da página (utils.redirects)
+        migrations.AddField(
+            model_name='pageredirect',
+            name='new_path',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+    ]
@@ -12,6 +12,8 @@ from django.core.validators import FileExtensionValidator
 from mptt.models import MPTTModel, TreeForeignKey
 from django_ckeditor_5.fields import CKEditor5Field
 from colorfield.fields import ColorField
+from utils.models import DirtyFieldsMixin
+from utils.redirect_graph import RedirectGraphMixin
 from django.contrib.postgres.fields import JSONField
 from mapwidgets.widgets import GooglePointFieldWidget
 from django.contrib.gis.db import models as gis_models
@@ -242,7 +244,7 @@ class FieldDefinition(models.Model):
         return [ext.strip() for ext in self.allowed_extensions.split(',')]
 
 
-class Page(MPTTModel):
+class Page(DirtyFieldsMixin, MPTTModel):
     """
     Modelo principal para páginas do site
     """
@@ -258,6 +260,8 @@ class Page(MPTTModel):
     title = models.CharField(_('Título'), max_length=200)
     slug = models.SlugField(_('Slug'), max_length=250, unique=True)
     content = CKEditor5Field(_('Conteúdo principal'), blank=True)
+    rendered_content = models.TextField(_('Conteúdo processado'), blank=True, editable=False,
+                                        help_text=_('Conteúdo com as URLs de mídia apontando para o CDN'))
     summary = models.TextField(_('Resumo'), blank=True)
     custom_url = models.CharField(max_length=255, blank=True, unique=True)
     
@@ -387,12 +391,25 @@ class Page(MPTTModel):
             self.scheduled_at = timezone.now() + timezone.timedelta(days=1)
             raise ValidationError(_('Scheduled date is required for scheduled status.'))
         
-         # Ensure custom_url is unique if provided
-        if self.custom_url:
+         # Ensure custom_url is unique if provided (só quando o valor mudou)
+        if self.custom_url and self.has_changed('custom_url'):
             if Page.objects.filter(custom_url=self.custom_url).exclude(pk=self.pk).exists():
                 raise ValidationError(_("This custom URL is already in use."))
+
+        # O conteúdo é processado uma única vez, ao salvar ou publicar
+        publishing = self.status == 'published' and self.has_changed('status')
+        if self.has_changed('content') or publishing or (self.content and not self.rendered_content):
+            self.rendered_content = self.render_content()
             
         super().save(*args, **kwargs)
+
+    def render_content(self):
+        """
+        Retorna o conteúdo com as URLs de mídia reescritas para o CDN
+        (ver apps.cdn.content.MediaRewriter).
+        """
+        from apps.cdn.content import rewrite_media_urls
+        return rewrite_media_urls(self.content)
     
     def create_version(self, user, comment=''):
         """
@@ -575,6 +592,7 @@ class PageVersion(models.Model):
     page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name='versions', verbose_name=_('Página'))
     title = models.CharField(_('Título'), max_length=200)
     content = models.TextField(_('Conteúdo'), blank=True)
+    rendered_content = models.TextField(_('Conteúdo processado'), blank=True, editable=False)
     summary = models.TextField(_('Resumo'), blank=True)
     version_number = models.IntegerField(_('Número da versão'))
     created_at = models.DateTimeField(_('Data de criação'), auto_now_add=True)
@@ -601,6 +619,15 @@ class PageVersion(models.Model):
     
     def __str__(self):
         return f"{self.page.title} - {_('Versão')} {self.version_number}"
+
+    def save(self, *args, **kwargs):
+        if self.content and not self.rendered_content:
+            if self.page_id and self.content == self.page.content and self.page.rendered_content:
+                self.rendered_content = self.page.rendered_content
+            else:
+                from apps.cdn.content import rewrite_media_urls
+                self.rendered_content = rewrite_media_urls(self.content)
+        super().save(*args, **kwargs)
     
     def restore(self):
         """Restaura esta versão para a página atual"""
@@ -806,7 +833,7 @@ class PageFieldValue(models.Model):
         return self.value
 
 
-class PageRedirect(models.Model):
+class PageRedirect(RedirectGraphMixin, models.Model):
     """
     Redirecionamentos para URLs antigas ou alternativas de páginas
     """
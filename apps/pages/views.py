@@ -33,19 +33,17 @@ from .forms import (
     PageCommentForm, PageSearchForm, GalleryForm
 )
 
+from utils.redirects import resolve_redirect
+
 import json
 import re
 
 def handle_redirect(request, path):
-    try:
-        redirect_rule = PageRedirect.objects.get(old_path=path)
-        redirect_rule.access_count += 1
-        redirect_rule.last_accessed = timezone.now()
-        redirect_rule.save()
-        return redirect(redirect_rule.new_path, permanent=(redirect_rule.redirect_type == '301'))
-    except PageRedirect.DoesNotExist:
-        # Handle 404 or fallback to default view
-        pass
+    # Usa a mesma tabela em memória do RedirectMiddleware (tipo 301/302 e regras com '*')
+    response = resolve_redirect(path)
+    if response is not None:
+        return response
+    # Handle 404 or fallback to default view
 
 
 
@@ -2,7 +2,7 @@ import logging
 import time
 from django.contrib import messages
 from django.contrib.auth.models import Group
-from django.core.cache import cache
+from utils.cache import throttle_cache
 from django.shortcuts import render, redirect
 from django.utils.timezone import datetime
 from django.utils.translation import gettext as _
@@ -56,7 +56,7 @@ def register(request):
     # Proteção contra spam de registro
     if request.method == 'POST':
         client_ip = request.META.get('REMOTE_ADDR')
-        registration_attempts = cache.get(f'registration_attempts_{client_ip}', 0)
+        registration_attempts = throttle_cache.get(f'registration_attempts_{client_ip}', 0)
         
         if registration_attempts > 5:
             messages.error(
@@ -65,7 +65,7 @@ def register(request):
             )
             return redirect('register')
         
-        cache.set(f'registration_attempts_{client_ip}', registration_attempts + 1, 3600)
+        throttle_cache.set(f'registration_attempts_{client_ip}', registration_attempts + 1, 3600)
     
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -146,7 +146,7 @@ def user_login(request):
     """
     # Proteção contra múltiplas tentativas
     client_ip = request.META.get('REMOTE_ADDR')
-    login_attempts = cast(int, cache.get(f'login_attempts_{client_ip}', 0))
+    login_attempts = cast(int, throttle_cache.get(f'login_attempts_{client_ip}', 0))
     
     if login_attempts > 10:  # Limite de 10 tentativas por hora
         messages.error(
@@ -159,7 +159,7 @@ def user_login(request):
         form = CustomAuthenticationForm(request, data=request.POST)
         
         # Incrementa tentativas de login
-        cache.set(f'login_attempts_{client_ip}', login_attempts + 1, 3600)  # 1 hora
+        throttle_cache.set(f'login_attempts_{client_ip}', login_attempts + 1, 3600)  # 1 hora
         
         if form.is_valid():
             user = cast(CustomUser, form.get_user())
@@ -188,7 +188,7 @@ def user_login(request):
                 user.reset_failed_login_attempts()
                 
                 # Limpa cache de tentativas para este IP
-                cache.delete(f'login_attempts_{client_ip}')
+                throttle_cache.delete(f'login_attempts_{client_ip}')
                 
                 # Log de sucesso
                 logger.info(f"Connexion réussie: {user.email}")
@@ -298,8 +298,8 @@ def profile(request):
                 if user.has_changed('email'):
                     user.email_verified = False
                     # Limpa cache relacionado ao usuário
-                    cache.delete(f'login_attempts_{user.pk}')
-                    cache.delete(f'reset_attempts_{user.pk}')
+                    throttle_cache.delete(f'login_attempts_{user.pk}')
+                    throttle_cache.delete(f'reset_attempts_{user.pk}')
                 
                 user.save()
                 profile_form.save()
@@ -355,7 +355,7 @@ def password_reset_request(request):
             
             # Proteção contra força bruta
             client_ip = request.META.get('REMOTE_ADDR')
-            reset_attempts = cache.get(f'reset_attempts_{client_ip}', 0)
+            reset_attempts = throttle_cache.get(f'reset_attempts_{client_ip}', 0)
             
             if reset_attempts > 3:
                 logger.warning(f"Trop de tentatives de réinitialisation depuis IP: {client_ip}")
@@ -365,14 +365,14 @@ def password_reset_request(request):
                 )
                 return redirect('password_reset')
                 
-            cache.set(f'reset_attempts_{client_ip}', reset_attempts + 1, 3600)  # 1 hora
+            throttle_cache.set(f'reset_attempts_{client_ip}', reset_attempts + 1, 3600)  # 1 hora
             
             try:
                 user = CustomUser.objects.get(email=email)
                 
                 # Verifica reset pendente
                 reset_key = f'password_reset_{user.pk}'
-                if cache.get(reset_key):
+                if throttle_cache.get(reset_key):
                     logger.info(f"Tentative de réinitialisation multiple pour: {email}")
                     messages.info(
                         request, 
@@ -384,7 +384,7 @@ def password_reset_request(request):
                 try:
                     # Envia email de reset
                     send_password_reset_email(request, user)
-                    cache.set(reset_key, True, 300)  # 5 minutos
+                    throttle_cache.set(reset_key, True, 300)  # 5 minutos
                     
                     logger.info(f"E-mail de réinitialisation envoyé à: {email}")
                     messages.success(
@@ -452,8 +452,8 @@ def password_reset_confirm(request, uidb64, token):
                     user.save()
                     
                     # Limpar caches relacionados
-                    cache.delete(f'password_reset_{user.pk}')
-                    cache.delete(f'login_attempts_{user.pk}')
+                    throttle_cache.delete(f'password_reset_{user.pk}')
+                    throttle_cache.delete(f'login_attempts_{user.pk}')
                     
                     logger.info(f"Réinitialisation du mot de passe réussie pour: {user.email}")
                     messages.success(
@@ -508,7 +508,7 @@ def newsletter_signup(request):
     try:
         # Proteção contra múltiplas tentativas
         client_ip = request.META.get('REMOTE_ADDR')
-        signup_attempts = cache.get(f'newsletter_signup_{client_ip}', 0)
+        signup_attempts = throttle_cache.get(f'newsletter_signup_{client_ip}', 0)
         
         if signup_attempts > 5:  # Limite de 5 tentativas por hora
             logger.warning(f"Trop de tentatives d'inscription depuis IP: {client_ip}")
@@ -517,7 +517,7 @@ def newsletter_signup(request):
                 'message': _("Trop de tentatives. Veuillez réessayer plus tard.")
             }, status=429)
             
-        cache.set(f'newsletter_signup_{client_ip}', signup_attempts + 1, 3600)
+        throttle_cache.set(f'newsletter_signup_{client_ip}', signup_attempts + 1, 3600)
 
         # Validação dos campos
         name = request.POST.get('name', '').strip()
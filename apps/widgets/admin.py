@@ -18,9 +18,41 @@ from .models import (
     Widget, 
     WidgetInstance
 )
+from .profiling import get_render_stats, get_render_stats_many
 import json
 
 
+class RenderProfileAdminMixin:
+    """
+    Exibe os percentis de renderização coletados pelo perfilamento de widgets.
+    Na listagem, as estatísticas da página inteira são lidas de uma vez.
+    """
+    profile_kind = None
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        if 'render_profile' in changelist.list_display:
+            stats = get_render_stats_many(self.profile_kind, [obj.pk for obj in changelist.result_list])
+            for obj in changelist.result_list:
+                obj._render_stats = stats[obj.pk]
+        return changelist
+
+    def render_profile(self, obj):
+        if hasattr(obj, '_render_stats'):
+            stats = obj._render_stats
+        else:
+            stats = get_render_stats(self.profile_kind, obj.pk) if obj.pk else None
+        if not stats:
+            return '-'
+        # format_html escapa os argumentos como texto: os números são formatados antes
+        return format_html(
+            'p50 {} ms · p95 {} ms · p99 {} ms<br><small>{} SQL · {} bytes · {} amostras</small>',
+            f"{stats['p50']:.1f}", f"{stats['p95']:.1f}", f"{stats['p99']:.1f}",
+            f"{stats['queries']:.1f}", f"{stats['size']:.0f}", stats['count']
+        )
+    render_profile.short_description = _('Desempenho')
+
+
 class JsonWidget(forms.Textarea):
     """
     Widget personalizado para edição de campos JSON com validação básica.
@@ -98,7 +130,7 @@ class TemplateRegionInline(admin.TabularInline):
 class WidgetAreaInline(admin.TabularInline):
     model = WidgetArea
     extra = 1
-    fields = ('name', 'slug', 'description', 'order', 'css_classes', 'max_widgets')
+    fields = ('name', 'slug', 'description', 'order', 'css_classes', 'max_widgets', 'render_mode', 'cache_timeout')
     prepopulated_fields = {'slug': ('name',)}
 
 
@@ -233,9 +265,10 @@ class ComponentInstanceAdminForm(forms.ModelForm):
         }
 
 
-class ComponentInstanceAdmin(admin.ModelAdmin):
+class ComponentInstanceAdmin(RenderProfileAdminMixin, admin.ModelAdmin):
+    profile_kind = 'component'
     form = ComponentInstanceAdminForm
-    list_display = ('component', 'region', 'order', 'is_visible')
+    list_display = ('component', 'region', 'order', 'is_visible', 'render_profile')
     list_filter = ('region__template', 'component__component_type', 'is_visible')
     search_fields = ('component__name', 'region__name', 'custom_classes')
     fieldsets = (
@@ -248,12 +281,16 @@ class ComponentInstanceAdmin(admin.ModelAdmin):
         (_('Visibilidade Condicional'), {
             'fields': ('visibility_rules',)
         }),
+        (_('Desempenho'), {
+            'classes': ('collapse',),
+            'fields': ('render_profile',)
+        }),
         (_('Informações de Auditoria'), {
             'classes': ('collapse',),
             'fields': ('created_at', 'updated_at', 'created_by', 'updated_by')
         }),
     )
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'render_profile')
 
     def save_model(self, request, obj, form, change):
         if not change:
@@ -276,13 +313,13 @@ class WidgetAdminForm(forms.ModelForm):
 
 class WidgetAdmin(admin.ModelAdmin):
     form = WidgetAdminForm
-    list_display = ('name', 'slug', 'widget_type', 'category', 'is_active')
-    list_filter = ('widget_type', 'category', 'is_active')
+    list_display = ('name', 'slug', 'widget_type', 'category', 'is_parallel_safe', 'is_active')
+    list_filter = ('widget_type', 'category', 'is_parallel_safe', 'is_active')
     search_fields = ('name', 'slug', 'description', 'template_code')
     prepopulated_fields = {'slug': ('name',)}
     fieldsets = (
         (_('Informações Básicas'), {
-            'fields': ('name', 'slug', 'description', 'widget_type', 'category', 'icon', 'is_active')
+            'fields': ('name', 'slug', 'description', 'widget_type', 'category', 'icon', 'is_active', 'is_parallel_safe')
         }),
         (_('Código do Widget'), {
             'fields': ('template_code', 'css_code', 'js_code', 'default_settings')
@@ -312,9 +349,10 @@ class WidgetInstanceAdminForm(forms.ModelForm):
         }
 
 
-class WidgetInstanceAdmin(admin.ModelAdmin):
+class WidgetInstanceAdmin(RenderProfileAdminMixin, admin.ModelAdmin):
+    profile_kind = 'widget'
     form = WidgetInstanceAdminForm
-    list_display = ('widget', 'area', 'title', 'order', 'is_visible')
+    list_display = ('widget', 'area', 'title', 'order', 'is_visible', 'render_profile')
     list_filter = ('area__template', 'widget__widget_type', 'is_visible')
     search_fields = ('widget__name', 'area__name', 'title', 'custom_classes')
     fieldsets = (
@@ -327,12 +365,16 @@ class WidgetInstanceAdmin(admin.ModelAdmin):
         (_('Visibilidade Condicional'), {
             'fields': ('visibility_rules',)
         }),
+        (_('Desempenho'), {
+            'classes': ('collapse',),
+            'fields': ('render_profile',)
+        }),
         (_('Informações de Auditoria'), {
             'classes': ('collapse',),
             'fields': ('created_at', 'updated_at', 'created_by', 'updated_by')
         }),
     )
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'render_profile')
 
     def save_model(self, request, obj, form, change):
         if not change:
@@ -0,0 +1,202 @@
+# apps/widgets/bundles.py
+
+import re
+import threading
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from utils.cache import widgets_cache
+from utils.minify import minify_css, minify_js, content_hash
+from .models import ComponentTemplate, LayoutTemplate
+
+
+BUNDLE_DIR = 'widgets/bundles'
+BUNDLE_CACHE_KEY = 'component_bundle_{scope}'
+BUNDLE_ALL_SCOPE = '__all__'
+BUNDLE_FILENAME_RE = re.compile(r'^[\w-]+\.[0-9a-f]{12}\.(css|js)$')
+# Versões anteriores mantidas para páginas ainda em cache que as referenciam
+BUNDLE_KEEP_PREVIOUS = 1
+
+_pending_rebuild = threading.local()
+
+
+def get_bundle_components(layout=None):
+    """
+    Retorna os componentes ativos que fazem parte do bundle.
+    Quando um layout é informado, considera apenas os componentes usados
+    nas regiões dos templates que compõem o layout.
+    """
+    components = ComponentTemplate.objects.filter(is_active=True)
+
+    if layout is not None:
+        template_ids = [
+            template_id for template_id in (
+                layout.template_id,
+                layout.header_id,
+                layout.footer_id,
+                layout.sidebar_id,
+            ) if template_id
+        ]
+        components = components.filter(
+            instances__region__template_id__in=template_ids
+        ).distinct()
+
+    return components.filter(
+        ~Q(css_code='') | ~Q(js_code='')
+    ).only('slug', 'css_code', 'js_code').order_by('slug')
+
+
+def _write_bundle_file(prefix, extension, content):
+    """
+    Grava o conteúdo no storage de arquivos estáticos com o hash no nome.
+    Como o nome depende do conteúdo, um arquivo existente nunca é sobrescrito.
+    """
+    if not content:
+        return None
+
+    name = f'{BUNDLE_DIR}/{prefix}.{content_hash(content)}.{extension}'
+    if not staticfiles_storage.exists(name):
+        staticfiles_storage.save(name, ContentFile(content.encode('utf-8')))
+    return name
+
+
+def get_bundle_prefix(layout_slug=None):
+    return f'components-{layout_slug}' if layout_slug else 'components'
+
+
+def prune_bundle_files(prefix, current=(), keep_previous=BUNDLE_KEEP_PREVIOUS):
+    """
+    Remove os arquivos substituídos de um bundle, mantendo os atuais e as
+    `keep_previous` versões anteriores mais recentes de cada extensão.
+    """
+    try:
+        _, filenames = staticfiles_storage.listdir(BUNDLE_DIR)
+    except FileNotFoundError:
+        return
+
+    pattern = re.compile(rf'^{re.escape(prefix)}\.[0-9a-f]{{12}}\.(css|js)$')
+    previous = {}
+    for filename in filenames:
+        match = pattern.match(filename)
+        name = f'{BUNDLE_DIR}/{filename}'
+        if match and name not in current:
+            previous.setdefault(match.group(1), []).append(name)
+
+    for names in previous.values():
+        names.sort(key=staticfiles_storage.get_modified_time, reverse=True)
+        for name in names[keep_previous:]:
+            staticfiles_storage.delete(name)
+
+
+def build_component_bundle(layout=None):
+    """
+    Concatena e minifica o CSS/JS dos componentes e grava os arquivos do bundle.
+    Retorna o manifesto {'css': nome_do_arquivo, 'js': nome_do_arquivo}.
+    """
+    css_parts = []
+    js_parts = []
+
+    for component in get_bundle_components(layout):
+        if component.css_code:
+            css_parts.append(minify_css(component.css_code))
+        if component.js_code:
+            # O ponto e vírgula evita que dois componentes se fundam em uma única expressão
+            js_parts.append(f';{minify_js(component.js_code)}\n')
+
+    prefix = get_bundle_prefix(layout.slug if layout is not None else None)
+    manifest = {
+        'css': _write_bundle_file(prefix, 'css', ''.join(css_parts)),
+        'js': _write_bundle_file(prefix, 'js', ''.join(js_parts)),
+    }
+    prune_bundle_files(prefix, current={name for name in manifest.values() if name})
+
+    scope = layout.slug if layout is not None else BUNDLE_ALL_SCOPE
+    widgets_cache.set(BUNDLE_CACHE_KEY.format(scope=scope), manifest, None)
+    return manifest
+
+
+def get_component_bundle(layout_slug=None):
+    """
+    Retorna o manifesto do bundle (todos os componentes ou apenas os de um layout),
+    gerando os arquivos na primeira chamada.
+    """
+    scope = layout_slug or BUNDLE_ALL_SCOPE
+    manifest = widgets_cache.get(BUNDLE_CACHE_KEY.format(scope=scope))
+    if manifest is not None:
+        return manifest
+
+    layout = None
+    if layout_slug:
+        layout = LayoutTemplate.objects.filter(slug=layout_slug, is_active=True).first()
+        if layout is None:
+            return {'css': None, 'js': None}
+
+    return build_component_bundle(layout)
+
+
+def get_layouts_using_templates(template_ids):
+    """
+    Retorna os ids dos layouts ativos que usam algum dos templates
+    (como template principal, cabeçalho, rodapé ou barra lateral).
+    """
+    template_ids = [template_id for template_id in template_ids if template_id]
+    if not template_ids:
+        return set()
+    return set(LayoutTemplate.objects.filter(is_active=True).filter(
+        Q(template_id__in=template_ids) | Q(header_id__in=template_ids)
+        | Q(footer_id__in=template_ids) | Q(sidebar_id__in=template_ids)
+    ).values_list('pk', flat=True))
+
+
+def rebuild_component_bundles(layout_ids=None, include_global=True):
+    """
+    Reconstrói o bundle global (com include_global) e os bundles dos layouts
+    informados, ou de todos os layouts ativos quando layout_ids é None.
+    """
+    if include_global:
+        build_component_bundle()
+    layouts = LayoutTemplate.objects.filter(is_active=True)
+    if layout_ids is not None:
+        if not layout_ids:
+            return
+        layouts = layouts.filter(pk__in=layout_ids)
+    for layout in layouts:
+        build_component_bundle(layout)
+
+
+def schedule_bundle_rebuild(layout_ids=(), include_global=False):
+    """
+    Agenda a reconstrução para depois do commit. Várias alterações na mesma
+    transação (uma exclusão em cascata, por exemplo) reconstroem cada bundle uma vez.
+    """
+    pending = getattr(_pending_rebuild, 'value', None)
+    if pending is None:
+        pending = _pending_rebuild.value = {'layout_ids': set(), 'include_global': False}
+    pending['layout_ids'].update(layout_ids)
+    pending['include_global'] |= include_global
+    transaction.on_commit(_run_pending_rebuild)
+
+
+def _run_pending_rebuild():
+    pending = getattr(_pending_rebuild, 'value', None)
+    _pending_rebuild.value = None
+    if pending is not None:
+        rebuild_component_bundles(**pending)
+
+
+def discard_layout_bundle(layout_slug):
+    """
+    Remove o manifesto e os arquivos do bundle de um layout excluído, desativado
+    ou renomeado.
+    """
+    widgets_cache.delete(BUNDLE_CACHE_KEY.format(scope=layout_slug))
+    prune_bundle_files(get_bundle_prefix(layout_slug), keep_previous=0)
+
+
+def get_bundle_max_age():
+    """
+    Tempo de cache (em segundos) enviado com os arquivos do bundle.
+    """
+    return getattr(settings, 'COMPONENT_BUNDLE_MAX_AGE', 60 * 60 * 24 * 365)
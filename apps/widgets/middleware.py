@@ -3,6 +3,7 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 from django.utils import translation
+from .profiling import is_profiling_enabled, start_request, finish_request, format_server_timing
 
 
 class TemplateOverrideMiddleware(MiddlewareMixin):
@@ -143,4 +144,30 @@ class LayoutMiddleware(MiddlewareMixin):
                 response.context_data['layout_css_classes'] = layout.css_classes
         
         return response
-    
\ No newline at end of file
+    
+
+
+class RenderProfilingMiddleware(MiddlewareMixin):
+    """
+    Middleware para coletar o perfil de renderização de widgets e componentes.
+    
+    As amostras da requisição são gravadas uma única vez ao final, e para
+    usuários da equipe são enviadas no cabeçalho Server-Timing.
+    """
+    
+    def process_request(self, request):
+        if is_profiling_enabled():
+            request._render_profiling_token = start_request()
+    
+    def process_response(self, request, response):
+        token = getattr(request, '_render_profiling_token', None)
+        if token is None:
+            return response
+        
+        samples = finish_request(token)
+        
+        user = getattr(request, 'user', None)
+        if samples and user is not None and user.is_staff:
+            response['Server-Timing'] = format_server_timing(samples)
+        
+        return response
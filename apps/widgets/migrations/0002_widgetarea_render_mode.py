@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('widgets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='widgetarea',
+            name='cache_timeout',
+            field=models.PositiveIntegerField(default=300, help_text='Tempo de cache do conteúdo da área diferida em segundos (0 = sem cache)', verbose_name='Tempo de Cache'),
+        ),
+        migrations.AddField(
+            model_name='widgetarea',
+            name='render_mode',
+            field=models.CharField(choices=[('inline', 'Inline'), ('deferred', 'Diferido')], default='inline', help_text='Áreas diferidas são carregadas por um endpoint próprio, mantendo a página cacheável', max_length=20, verbose_name='Modo de Renderização'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('widgets', '0002_widgetarea_render_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='widget',
+            name='is_parallel_safe',
+            field=models.BooleanField(default=False, help_text='Indica que o widget pode ser renderizado em outra thread (não depende de estado compartilhado da requisição)', verbose_name='Renderização Paralela'),
+        ),
+    ]
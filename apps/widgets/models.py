@@ -12,9 +12,11 @@ from django.utils.text import slugify
 from django.urls import reverse
 import json
 from django.core.exceptions import ValidationError
+from utils.models import DirtyFieldsMixin
+from .profiling import profile_render
 
 
-class BaseTemplate(models.Model):
+class BaseTemplate(DirtyFieldsMixin):
     """
     Modelo base para templates do sistema.
     Contém os campos comuns para todos os templates.
@@ -179,7 +181,7 @@ class DjangoTemplate(BaseTemplate):
         return reverse('template_preview', kwargs={'slug': self.slug})
 
 
-class TemplateRegion(models.Model):
+class TemplateRegion(DirtyFieldsMixin):
     """
     Define uma região editável dentro de um template.
     Cada região pode conter múltiplos blocos de conteúdo.
@@ -417,7 +419,7 @@ class ComponentTemplate(BaseTemplate):
         return template.render(Context(context))
 
 
-class ComponentInstance(models.Model):
+class ComponentInstance(DirtyFieldsMixin):
     """
     Representa uma instância de um componente em uma região específica.
     Permite configurar o componente com valores específicos.
@@ -547,6 +549,7 @@ class ComponentInstance(models.Model):
         
         return True
 
+    @profile_render('component', related='component')
     def render(self, request=None, context=None):
         """
         Renderiza a instância do componente com seu contexto específico
@@ -569,11 +572,16 @@ class ComponentInstance(models.Model):
         return self.component.render(context)
 
 
-class WidgetArea(models.Model):
+class WidgetArea(DirtyFieldsMixin):
     """
     Define uma área de widgets em um template.
     As áreas de widgets são regiões especiais que podem conter múltiplos widgets.
     """
+    RENDER_MODES = (
+        ('inline', _('Inline')),
+        ('deferred', _('Diferido')),
+    )
+    
     name = models.CharField(
         _('Nome'), 
         max_length=100,
@@ -611,6 +619,18 @@ class WidgetArea(models.Model):
         default=0,
         help_text=_('Número máximo de widgets permitidos (0 = ilimitado)')
     )
+    render_mode = models.CharField(
+        _('Modo de Renderização'), 
+        max_length=20, 
+        choices=RENDER_MODES,
+        default='inline',
+        help_text=_('Áreas diferidas são carregadas por um endpoint próprio, mantendo a página cacheável')
+    )
+    cache_timeout = models.PositiveIntegerField(
+        _('Tempo de Cache'), 
+        default=300,
+        help_text=_('Tempo de cache do conteúdo da área diferida em segundos (0 = sem cache)')
+    )
 
     class Meta:
         verbose_name = _('Área de Widgets')
@@ -626,6 +646,59 @@ class WidgetArea(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+    @property
+    def is_deferred(self):
+        return self.render_mode == 'deferred'
+
+    def get_fragment_url(self):
+        return reverse('templates:widget_area_fragment', kwargs={
+            'template_slug': self.template.slug,
+            'area_slug': self.slug
+        })
+
+    def get_visibility_dependencies(self):
+        """
+        Retorna as regras de visibilidade dos widgets desta área que dependem da requisição
+        ('user_auth' e/ou 'device'). Usado para definir a política de cache do fragmento.
+        """
+        dependencies = set()
+        rules_list = self.widget_instances.filter(
+            is_visible=True,
+            visibility_rules__isnull=False
+        ).values_list('visibility_rules', flat=True)
+        
+        for rules in rules_list:
+            if isinstance(rules, dict):
+                dependencies.update(key for key in ('user_auth', 'device') if key in rules)
+        
+        return dependencies
+
+    def get_next_visibility_change(self, now=None):
+        """
+        Retorna o próximo início ou fim de 'date_range' dos widgets desta área, ou None.
+        Até esse momento, as regras de data dão o mesmo resultado (ver WidgetInstance.should_render).
+        """
+        from datetime import datetime
+        now = now or datetime.now()
+        boundaries = []
+        rules_list = self.widget_instances.filter(
+            is_visible=True,
+            visibility_rules__isnull=False
+        ).values_list('visibility_rules', flat=True)
+        
+        for rules in rules_list:
+            if not isinstance(rules, dict) or not isinstance(rules.get('date_range'), dict):
+                continue
+            for key in ('start', 'end'):
+                try:
+                    boundary = datetime.fromisoformat(rules['date_range'][key])
+                    if boundary > now:
+                        boundaries.append(boundary)
+                except (KeyError, TypeError, ValueError):
+                    continue
+        
+        return min(boundaries, default=None)
+
 
 class Widget(BaseTemplate):
     """
@@ -690,6 +763,11 @@ class Widget(BaseTemplate):
         related_name='widgets',
         verbose_name=_('Categoria')
     )
+    is_parallel_safe = models.BooleanField(
+        _('Renderização Paralela'), 
+        default=False,
+        help_text=_('Indica que o widget pode ser renderizado em outra thread (não depende de estado compartilhado da requisição)')
+    )
 
     class Meta:
         verbose_name = _('Widget')
@@ -720,7 +798,7 @@ class Widget(BaseTemplate):
         return template.render(Context(context))
 
 
-class WidgetInstance(models.Model):
+class WidgetInstance(DirtyFieldsMixin):
     """
     Representa uma instância de um widget em uma área específica.
     Permite configurar o widget com valores específicos.
@@ -870,6 +948,7 @@ class WidgetInstance(models.Model):
         
         return True
 
+    @profile_render('widget', related='widget')
     def render(self, request=None, context=None):
         """
         Renderiza a instância do widget com suas configurações específicas
@@ -884,4 +963,4 @@ class WidgetInstance(models.Model):
         context['widget_title'] = self.title
         context['custom_classes'] = self.custom_classes
             
-        return self.widget.render(context, self.settings)
\ No newline at end of file
+        return self.widget.render(context, self.widget_settings)
\ No newline at end of file
@@ -0,0 +1,215 @@
+# apps/widgets/profiling.py
+
+import functools
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connection
+from utils.cache import profiling_cache
+
+
+PROFILE_CACHE_KEY = 'render_profile_{kind}_{pk}'
+# Janela deslizante: um contador atômico distribui as amostras em posições próprias,
+# então processos concorrentes nunca sobrescrevem as amostras uns dos outros
+PROFILE_COUNTER_KEY = PROFILE_CACHE_KEY + '_count'
+PROFILE_SLOT_KEY = PROFILE_CACHE_KEY + '_{slot}'
+
+# Amostras coletadas durante a requisição atual (None fora do middleware)
+_request_samples = ContextVar('widget_render_samples', default=None)
+
+
+def is_profiling_enabled():
+    """
+    A instrumentação é opcional e fica desligada por padrão.
+    """
+    return getattr(settings, 'WIDGET_PROFILING_ENABLED', False)
+
+
+def get_sample_size():
+    """
+    Quantidade de amostras mantidas por instância para o cálculo dos percentis.
+    """
+    return getattr(settings, 'WIDGET_PROFILING_SAMPLE_SIZE', 200)
+
+
+class _QueryCounter:
+    """
+    Wrapper de execução que conta as consultas SQL feitas durante a renderização.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_profile_label(kind, instance, related=None):
+    """
+    Descrição da instância para o Server-Timing, sem consultas ao banco: usa o nome
+    do objeto relacionado apenas se ele já estiver carregado.
+    """
+    if related is not None:
+        field = instance._meta.get_field(related)
+        if field.is_cached(instance):
+            return f'{getattr(instance, related)} #{instance.pk}'
+    return f'{kind} #{instance.pk}'
+
+
+def profile_render(kind, related=None):
+    """
+    Decorador para os métodos render() das instâncias de widgets e componentes.
+    Registra o tempo de renderização, o número de consultas SQL e o tamanho da saída.
+    `related` é o campo cujo nome descreve a instância (ver get_profile_label).
+    """
+    def decorator(render):
+        @functools.wraps(render)
+        def wrapper(self, *args, **kwargs):
+            if not is_profiling_enabled():
+                return render(self, *args, **kwargs)
+
+            counter = _QueryCounter()
+            start = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                output = render(self, *args, **kwargs)
+            duration = (time.perf_counter() - start) * 1000
+
+            record_sample(kind, self, {
+                'duration': duration,
+                'queries': counter.count,
+                'size': len(output or ''),
+            }, get_profile_label(kind, self, related))
+            return output
+        return wrapper
+    return decorator
+
+
+def record_sample(kind, instance, sample, label=None):
+    """
+    Registra uma amostra. Durante uma requisição as amostras são acumuladas e
+    gravadas de uma vez pelo middleware; fora dela são gravadas imediatamente.
+    """
+    samples = _request_samples.get()
+    if samples is not None:
+        samples.append((kind, instance.pk, label or f'{kind} #{instance.pk}', sample))
+    else:
+        store_samples(kind, instance.pk, [sample])
+
+
+def store_samples(kind, pk, new_samples):
+    """
+    Acrescenta amostras à janela deslizante de uma instância. O incremento do
+    contador reserva as posições de forma atômica; cada amostra tem a sua chave.
+    """
+    size = get_sample_size()
+    total = profiling_cache.incr(PROFILE_COUNTER_KEY.format(kind=kind, pk=pk), len(new_samples), None)
+    first = total - len(new_samples)
+    profiling_cache.set_many({
+        PROFILE_SLOT_KEY.format(kind=kind, pk=pk, slot=(first + index) % size): sample
+        for index, sample in enumerate(new_samples[-size:], start=max(0, len(new_samples) - size))
+    }, None)
+
+
+def get_samples(kind, pk):
+    """
+    Amostras da janela deslizante de uma instância (em ordem arbitrária).
+    """
+    return get_samples_many(kind, [pk])[pk]
+
+
+def get_samples_many(kind, pks):
+    """
+    Amostras de várias instâncias com duas leituras do cache, qualquer que seja
+    o número de instâncias. Retorna {pk: [amostras]}.
+    """
+    counter_keys = {PROFILE_COUNTER_KEY.format(kind=kind, pk=pk): pk for pk in pks}
+    size = get_sample_size()
+    slot_keys = {}
+    for key, total in profiling_cache.get_many(list(counter_keys)).items():
+        pk = counter_keys[key]
+        for slot in range(min(total or 0, size)):
+            slot_keys[PROFILE_SLOT_KEY.format(kind=kind, pk=pk, slot=slot)] = pk
+
+    samples = {pk: [] for pk in pks}
+    if slot_keys:
+        for key, sample in profiling_cache.get_many(list(slot_keys)).items():
+            samples[slot_keys[key]].append(sample)
+    return samples
+
+
+def start_request():
+    """
+    Inicia a coleta de amostras para a requisição atual.
+    """
+    return _request_samples.set([])
+
+
+def finish_request(token):
+    """
+    Encerra a coleta, grava as amostras agrupadas por instância e
+    retorna a lista de amostras da requisição.
+    """
+    samples = _request_samples.get() or []
+    _request_samples.reset(token)
+
+    grouped = {}
+    for kind, pk, label, sample in samples:
+        grouped.setdefault((kind, pk), []).append(sample)
+    for (kind, pk), instance_samples in grouped.items():
+        store_samples(kind, pk, instance_samples)
+
+    return samples
+
+
+def _percentile(values, percent):
+    """
+    Percentil pelo método do vizinho mais próximo.
+    """
+    values = sorted(values)
+    index = max(0, int(round(percent / 100 * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def get_render_stats(kind, pk):
+    """
+    Retorna os percentis de tempo e as médias de consultas e tamanho de uma instância,
+    ou None se não houver amostras.
+    """
+    return _summarize(get_samples(kind, pk))
+
+
+def get_render_stats_many(kind, pks):
+    """
+    Como get_render_stats, para várias instâncias de uma vez (listagens do admin).
+    Retorna {pk: estatísticas ou None}.
+    """
+    return {pk: _summarize(samples) for pk, samples in get_samples_many(kind, pks).items()}
+
+
+def _summarize(samples):
+    if not samples:
+        return None
+
+    durations = [sample['duration'] for sample in samples]
+    return {
+        'count': len(samples),
+        'p50': _percentile(durations, 50),
+        'p95': _percentile(durations, 95),
+        'p99': _percentile(durations, 99),
+        'queries': sum(sample['queries'] for sample in samples) / len(samples),
+        'size': sum(sample['size'] for sample in samples) / len(samples),
+    }
+
+
+def format_server_timing(samples):
+    """
+    Monta o valor do cabeçalho Server-Timing a partir das amostras da requisição.
+    """
+    entries = []
+    for kind, pk, label, sample in samples:
+        description = label.replace('\\', '').replace('"', '')
+        entries.append(
+            f'{kind}-{pk};dur={sample["duration"]:.2f};desc="{description} ({sample["queries"]} SQL)"'
+        )
+    return ', '.join(entries)
@@ -1,10 +1,16 @@
+from functools import partial
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
+from utils.cache import widgets_cache
+from django.db import transaction
+from .bundles import discard_layout_bundle, get_layouts_using_templates, schedule_bundle_rebuild
+from .utils import invalidate_widget_area_fragments
 from .models import (
     ComponentTemplate, 
     ComponentInstance, 
+    TemplateRegion,
     Widget, 
+    WidgetArea,
     WidgetInstance,
     LayoutTemplate
 )
@@ -16,7 +22,7 @@ def clear_component_cache(sender, instance, **kwargs):
     Limpa o cache quando um template de componente é atualizado.
     """
     cache_key = f'component_{instance.slug}'
-    cache.delete(cache_key)
+    widgets_cache.delete(cache_key)
 
 
 @receiver(post_save, sender=ComponentInstance)
@@ -26,7 +32,7 @@ def clear_region_cache(sender, instance, **kwargs):
     """
     region = instance.region
     cache_key = f'region_{region.template.slug}_{region.slug}'
-    cache.delete(cache_key)
+    widgets_cache.delete(cache_key)
 
 
 
@@ -37,7 +43,7 @@ def clear_region_cache_on_delete(sender, instance, **kwargs):
     """
     region = instance.region
     cache_key = f'region_{region.template.slug}_{region.slug}'
-    cache.delete(cache_key)
+    widgets_cache.delete(cache_key)
 
 
 @receiver(post_save, sender=Widget)
@@ -46,7 +52,7 @@ def clear_widget_cache(sender, instance, **kwargs):
     Limpa o cache quando um widget é atualizado.
     """
     cache_key = f'widget_{instance.slug}'
-    cache.delete(cache_key)
+    widgets_cache.delete(cache_key)
 
 
 @receiver(post_save, sender=WidgetInstance)
@@ -56,7 +62,8 @@ def clear_widget_area_cache(sender, instance, **kwargs):
     """
     area = instance.area
     cache_key = f'widget_area_{area.template.slug}_{area.slug}'
-    cache.delete(cache_key)
+    widgets_cache.delete(cache_key)
+    invalidate_widget_area_fragments(area)
 
 
 @receiver(post_delete, sender=WidgetInstance)
@@ -66,7 +73,25 @@ def clear_widget_area_cache_on_delete(sender, instance, **kwargs):
     """
     area = instance.area
     cache_key = f'widget_area_{area.template.slug}_{area.slug}'
-    cache.delete(cache_key)
+    widgets_cache.delete(cache_key)
+    invalidate_widget_area_fragments(area)
+
+
+@receiver(post_save, sender=WidgetArea)
+def clear_widget_area_fragments(sender, instance, **kwargs):
+    """
+    Limpa o fragmento cacheado quando a configuração de uma área é alterada.
+    """
+    invalidate_widget_area_fragments(instance)
+
+
+@receiver(post_save, sender=Widget)
+def clear_widget_fragments(sender, instance, **kwargs):
+    """
+    Limpa os fragmentos das áreas que usam um widget alterado.
+    """
+    for area in WidgetArea.objects.filter(widget_instances__widget=instance).select_related('template').distinct():
+        invalidate_widget_area_fragments(area)
 
 
 @receiver(post_save, sender=LayoutTemplate)
@@ -75,11 +100,72 @@ def clear_layout_cache(sender, instance, **kwargs):
     Limpa o cache quando um layout é atualizado.
     """
     cache_key = f'layout_{instance.slug}'
-    cache.delete(cache_key)
+    widgets_cache.delete(cache_key)
     
     # Se o layout for definido como padrão, limpa o cache de layout padrão
     if instance.is_default:
-        cache.delete('default_layout')
+        widgets_cache.delete('default_layout')
 # your_cms_app/templates/__init__.py
 
-default_app_config = 'apps.widgets.apps.WidgetsConfig'
\ No newline at end of file
+default_app_config = 'apps.widgets.apps.WidgetsConfig'
+
+
+# Campos que afetam o conteúdo dos bundles (componentes, instâncias e layouts)
+BUNDLE_FIELDS = {
+    'slug', 'css_code', 'js_code', 'is_active',
+    'component', 'region', 'is_visible',
+    'template', 'header', 'footer', 'sidebar',
+}
+
+
+def _touches_bundles(update_fields):
+    # Saves parciais que não tocam em campos usados pelos bundles não reconstroem nada
+    return update_fields is None or bool(BUNDLE_FIELDS.intersection(update_fields))
+
+
+@receiver([post_save, post_delete], sender=ComponentTemplate)
+def rebuild_component_bundles_for_component(sender, instance, update_fields=None, **kwargs):
+    """
+    Reconstrói o bundle global e os dos layouts que usam o componente.
+    As reconstruções acontecem após o commit para não gravar arquivos de transações revertidas.
+    """
+    if not _touches_bundles(update_fields):
+        return
+    template_ids = ComponentInstance.objects.filter(component=instance).values_list('region__template_id', flat=True)
+    schedule_bundle_rebuild(get_layouts_using_templates(template_ids), include_global=True)
+
+
+@receiver([post_save, post_delete], sender=ComponentInstance)
+def rebuild_component_bundles_for_instance(sender, instance, update_fields=None, **kwargs):
+    """
+    Reconstrói os bundles dos layouts da região da instância (e da região anterior,
+    se ela foi movida). O bundle global não depende das instâncias.
+    """
+    if not _touches_bundles(update_fields):
+        return
+    region_ids = {instance.region_id}
+    if kwargs.get('created') is False:
+        region_ids.add(instance.get_original_value('region'))
+    template_ids = TemplateRegion.objects.filter(pk__in=region_ids).values_list('template_id', flat=True)
+    schedule_bundle_rebuild(get_layouts_using_templates(template_ids))
+
+
+@receiver(post_save, sender=LayoutTemplate)
+def rebuild_layout_bundle(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Reconstrói o bundle do layout, ou o descarta se o layout foi desativado.
+    """
+    if not _touches_bundles(update_fields):
+        return
+    original_slug = None if created else instance.get_original_value('slug')
+    if original_slug and original_slug != instance.slug:
+        transaction.on_commit(partial(discard_layout_bundle, original_slug))
+    if instance.is_active:
+        schedule_bundle_rebuild({instance.pk})
+    else:
+        transaction.on_commit(partial(discard_layout_bundle, instance.slug))
+
+
+@receiver(post_delete, sender=LayoutTemplate)
+def discard_deleted_layout_bundle(sender, instance, **kwargs):
+    transaction.on_commit(partial(discard_layout_bundle, instance.slug))
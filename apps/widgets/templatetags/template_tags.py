@@ -2,6 +2,7 @@
 
 from django import template
 from django.utils.safestring import mark_safe
+from django.utils.html import format_html
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.conf import settings
@@ -19,8 +20,13 @@ from ..models import (
 from ..utils import (
     render_component, 
     get_component_instances_for_region, 
-    get_widgets_for_area
+    get_widgets_for_area,
+    get_widget_area,
+    render_widget_area_content,
+    render_deferred_widget_area,
+    prefetch_widget_areas as prefetch_areas
 )
+from ..bundles import get_component_bundle
 import json
 import re
 
@@ -52,6 +58,8 @@ def render_region(context, region_slug, template_slug=None):
 def render_widget_area(context, area_slug, template_slug=None):
     """
     Renderiza uma área de widgets com todos os seus widgets.
+    Áreas no modo diferido emitem apenas um placeholder, carregado depois
+    a partir do endpoint da área.
     
     Uso:
     {% render_widget_area 'sidebar' 'home_page' %}
@@ -64,11 +72,66 @@ def render_widget_area(context, area_slug, template_slug=None):
         if not template_slug:
             return ''
     
+    # Área já renderizada por {% prefetch_widget_areas %}
+    prefetched = _get_prefetched_widget_areas(context)
+    if (template_slug, area_slug) in prefetched:
+        return mark_safe(prefetched.pop((template_slug, area_slug)))
+    
+    area = get_widget_area(area_slug, template_slug)
+    if area is None:
+        # Mantém o comportamento de erro padrão (exceção em DEBUG)
+        return mark_safe(get_widgets_for_area(area_slug, template_slug, context, request))
+    
+    if area.is_deferred and not getattr(request, 'is_edit_mode', False):
+        return mark_safe(render_deferred_widget_area(area, context.render_context))
+    
     # Renderiza todos os widgets da área
-    content = get_widgets_for_area(area_slug, template_slug, context, request)
+    content = render_widget_area_content(area, context, request)
     return mark_safe(content)
 
 
+def _get_prefetched_widget_areas(context):
+    """
+    Armazenamento das áreas pré-renderizadas. Fica na requisição para que
+    templates incluídos (header, sidebar, footer) também o encontrem.
+    """
+    request = context.get('request')
+    if request is None:
+        return context.render_context.setdefault('prefetched_widget_areas', {})
+    
+    if not hasattr(request, '_prefetched_widget_areas'):
+        request._prefetched_widget_areas = {}
+    return request._prefetched_widget_areas
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_widget_areas(context, *area_slugs, template_slug=None):
+    """
+    Renderiza antecipadamente várias áreas independentes. Com a renderização
+    concorrente ativa, as áreas com widgets seguros para paralelismo são
+    renderizadas ao mesmo tempo; cada {% render_widget_area %} posterior
+    apenas insere o HTML já pronto, no lugar de sempre.
+    
+    Uso:
+    {% prefetch_widget_areas 'sidebar-left' 'sidebar-right' template_slug='home_page' %}
+    """
+    request = context.get('request')
+    
+    if not template_slug:
+        template_slug = context.get('current_template_slug')
+        if not template_slug:
+            return ''
+    
+    if getattr(request, 'is_edit_mode', False):
+        return ''
+    
+    prefetched = _get_prefetched_widget_areas(context)
+    for area_slug, content in prefetch_areas(list(area_slugs), template_slug, context, request).items():
+        prefetched[(template_slug, area_slug)] = content
+    
+    return ''
+
+
 @register.simple_tag
 def component(component_slug, **kwargs):
     """
@@ -132,6 +195,30 @@ def render_layout(context, layout_slug=None):
     return mark_safe(render_layout(layout_slug, context))
 
 
+@register.simple_tag
+def component_bundle(layout_slug=None):
+    """
+    Emite uma tag <link> e uma tag <script> com o bundle de CSS/JS dos componentes.
+    Sem argumentos inclui todos os componentes ativos; com um layout, apenas os usados nele.
+    
+    Uso:
+    {% component_bundle %}
+    {% component_bundle 'default' %}
+    """
+    bundle = get_component_bundle(layout_slug)
+    tags = []
+    
+    if bundle.get('css'):
+        url = reverse('templates:component_bundle_file', args=[bundle['css'].rsplit('/', 1)[-1]])
+        tags.append(format_html('<link rel="stylesheet" href="{}">', url))
+    
+    if bundle.get('js'):
+        url = reverse('templates:component_bundle_file', args=[bundle['js'].rsplit('/', 1)[-1]])
+        tags.append(format_html('<script src="{}" defer></script>', url))
+    
+    return mark_safe('\n'.join(tags))
+
+
 @register.simple_tag
 def get_available_layouts():
     """
@@ -0,0 +1,151 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.template import Context, Template
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from ..bundles import BUNDLE_DIR, build_component_bundle, get_component_bundle
+from ..models import (
+    ComponentTemplate, ComponentInstance, DjangoTemplate, LayoutTemplate,
+    TemplateCategory, TemplateRegion, TemplateType
+)
+from utils.minify import minify_css, minify_js
+
+User = get_user_model()
+
+
+class ComponentBundleTests(TestCase):
+    """Testes para o bundle de CSS/JS dos componentes"""
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.override = override_settings(STATIC_ROOT=self.static_root)
+        self.override.enable()
+        cache.clear()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='password'
+        )
+        self.component = ComponentTemplate.objects.create(
+            name='Bundle Component',
+            component_type='card',
+            template_code='<div class="card"></div>',
+            css_code='.card {\n    color: red;\n}\n/* comentário */',
+            js_code='// inicialização\nconsole.log("card");',
+            created_by=self.user,
+            updated_by=self.user
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.static_root, ignore_errors=True)
+
+    def test_bundle_is_minified_and_hashed(self):
+        """Testa se o bundle é minificado e gravado com o hash no nome"""
+        manifest = build_component_bundle()
+        self.assertRegex(manifest['css'], r'^widgets/bundles/components\.[0-9a-f]{12}\.css$')
+
+        with staticfiles_storage.open(manifest['css']) as f:
+            self.assertEqual(f.read().decode(), '.card{color:red}')
+        with staticfiles_storage.open(manifest['js']) as f:
+            self.assertNotIn('inicialização', f.read().decode())
+
+    def test_bundle_name_changes_with_content(self):
+        """Testa se alterar um componente gera um novo arquivo de bundle"""
+        first = build_component_bundle()
+        self.component.css_code = '.card { color: blue; }'
+        self.component.save()
+        second = build_component_bundle()
+        self.assertNotEqual(first['css'], second['css'])
+
+    def create_layout(self, name):
+        category, _ = TemplateCategory.objects.get_or_create(name='Layouts', defaults={'created_by': self.user})
+        template_type, _ = TemplateType.objects.get_or_create(
+            name='Page', defaults={'type': 'page', 'category': category, 'created_by': self.user}
+        )
+        template = DjangoTemplate.objects.create(
+            name=name, file_path=f'templates/{name}.html', type=template_type, created_by=self.user
+        )
+        layout = LayoutTemplate.objects.create(name=name, template=template, created_by=self.user)
+        return layout, TemplateRegion.objects.create(name='Main', slug='main', template=template)
+
+    def test_component_change_rebuilds_only_layouts_using_it(self):
+        """Testa se alterar um componente reconstrói só o bundle global e os dos layouts que o usam"""
+        with self.captureOnCommitCallbacks(execute=True):
+            used, region = self.create_layout('Usado')
+            self.create_layout('Outro')
+            ComponentInstance.objects.create(component=self.component, region=region, created_by=self.user)
+
+        built = []
+        with mock.patch('apps.widgets.bundles.build_component_bundle',
+                        side_effect=lambda layout=None: built.append(layout and layout.slug)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.component.css_code = '.card { color: green; }'
+                self.component.save()
+
+        self.assertCountEqual(built, [None, used.slug])
+
+    def test_superseded_bundle_files_are_pruned(self):
+        """Testa se só o bundle atual e a versão anterior são mantidos"""
+        names = []
+        for color in ('red', 'green', 'blue'):
+            self.component.css_code = f'.card {{ color: {color}; }}'
+            self.component.save()
+            names.append(build_component_bundle()['css'])
+
+        _, filenames = staticfiles_storage.listdir(BUNDLE_DIR)
+        css = {f'{BUNDLE_DIR}/{filename}' for filename in filenames if filename.endswith('.css')}
+        self.assertIn(names[-1], css)
+        self.assertNotIn(names[0], css)
+        self.assertEqual(len(css), 2)
+
+    def test_component_bundle_tag(self):
+        """Testa se a tag emite um único <link> e um único <script>"""
+        template = Template('{% load template_tags %}{% component_bundle %}')
+        rendered = template.render(Context({}))
+        self.assertEqual(rendered.count('<link'), 1)
+        self.assertEqual(rendered.count('<script'), 1)
+
+    def test_unknown_layout_has_empty_bundle(self):
+        """Testa se um layout inexistente não gera arquivos"""
+        self.assertEqual(get_component_bundle('inexistente'), {'css': None, 'js': None})
+
+    def test_bundle_view_rejects_invalid_names(self):
+        """Testa se nomes fora do padrão dos bundles (como "..") retornam 404"""
+        manifest = build_component_bundle()
+        filename = manifest['css'].rsplit('/', 1)[-1]
+
+        response = self.client.get(reverse('templates:component_bundle_file', args=[filename]))
+        self.assertEqual(response.status_code, 200)
+        for name in ('..', '.', 'components.css', 'a.b.c'):
+            response = self.client.get(reverse('templates:component_bundle_file', args=[name]))
+            self.assertEqual(response.status_code, 404)
+
+
+class MinifyTests(SimpleTestCase):
+    """Testes da minificação de CSS e JavaScript"""
+
+    def test_css_keeps_significant_whitespace_and_strings(self):
+        """Testa se seletores e strings não são alterados"""
+        self.assertEqual(minify_css('.a :hover { color : red ; }'), '.a :hover{color:red}')
+        self.assertEqual(
+            minify_css('a::before { content: "a : b  /* x */"; }'),
+            'a::before{content:"a : b  /* x */"}'
+        )
+        self.assertEqual(
+            minify_css('@media (min-width: 600px) { .a > .b :focus { margin : 0 auto } }'),
+            '@media (min-width: 600px){.a>.b :focus{margin:0 auto}}'
+        )
+
+    def test_js_keeps_template_literals(self):
+        """Testa se linhas dentro de template literals e strings continuadas são mantidas"""
+        js = 'const a = `linha\n    // não é comentário\n\n  fim`;\n  // comentário\nvar s = "x\\\n// mantido";'
+        self.assertEqual(
+            minify_js(js),
+            'const a = `linha\n    // não é comentário\n\n  fim`;\nvar s = "x\\\n// mantido";'
+        )
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from django.core.cache import cache
+from utils.cache import widgets_cache, menus_cache, throttle_cache, invalidate_namespaces
+
+
+class CacheNamespaceTests(TestCase):
+    """Testes para os namespaces de cache usados pelos widgets"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_only_affects_its_namespace(self):
+        """Testa se invalidar um namespace preserva as chaves dos outros"""
+        widgets_cache.set('fragment', 'widgets')
+        menus_cache.set('fragment', 'menus')
+
+        menus_cache.invalidate()
+
+        self.assertEqual(widgets_cache.get('fragment'), 'widgets')
+        self.assertIsNone(menus_cache.get('fragment'))
+
+    def test_invalidate_all_content_keeps_throttle_counters(self):
+        """Testa se ?clear_cache não zera os contadores de tentativas de login"""
+        throttle_cache.set('login_attempts_127.0.0.1', 3, 3600)
+        widgets_cache.set('fragment', 'widgets')
+
+        invalidate_namespaces()
+
+        self.assertIsNone(widgets_cache.get('fragment'))
+        self.assertEqual(throttle_cache.get('login_attempts_127.0.0.1'), 3)
+
+    def test_many_operations_use_current_generation(self):
+        """Testa se get_many/delete_many usam as chaves sem o prefixo do namespace"""
+        widgets_cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(widgets_cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+
+        widgets_cache.delete_many(['a'])
+        self.assertEqual(widgets_cache.get_many(['a', 'b']), {'b': 2})
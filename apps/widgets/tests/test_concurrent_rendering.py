@@ -0,0 +1,105 @@
+import threading
+
+from django.test import TransactionTestCase, RequestFactory, override_settings
+from django.template import Context, Template
+from django.contrib.auth import get_user_model
+from ..utils import prefetch_widget_areas
+from ..models import (
+    TemplateCategory, TemplateType, DjangoTemplate,
+    WidgetArea, Widget, WidgetInstance
+)
+
+User = get_user_model()
+
+
+@override_settings(WIDGET_CONCURRENT_RENDERING=True)
+class ConcurrentRenderingTests(TransactionTestCase):
+    """Testes para a renderização concorrente das áreas de widgets"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='password'
+        )
+        self.category = TemplateCategory.objects.create(
+            name='Test Category',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.template_type = TemplateType.objects.create(
+            name='Test Type',
+            type='page',
+            category=self.category,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.django_template = DjangoTemplate.objects.create(
+            name='Home Page',
+            file_path='templates/home.html',
+            type=self.template_type,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.safe_widget = Widget.objects.create(
+            name='Safe Widget',
+            widget_type='text',
+            template_code='<p>{{ widget_title }}</p>',
+            is_parallel_safe=True,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.unsafe_widget = Widget.objects.create(
+            name='Unsafe Widget',
+            widget_type='text',
+            template_code='<div>{{ widget_title }}</div>',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        for index, widget in enumerate([self.safe_widget, self.unsafe_widget, self.safe_widget]):
+            area = WidgetArea.objects.create(
+                name=f'Sidebar {index}',
+                template=self.django_template
+            )
+            WidgetInstance.objects.create(
+                widget=widget,
+                area=area,
+                title=f'Area {index}'
+            )
+
+    def test_output_order_is_deterministic(self):
+        """Testa se o HTML volta na ordem das áreas, independentemente das threads"""
+        rendered = prefetch_widget_areas(
+            ['sidebar-2', 'sidebar-1', 'sidebar-0'], 'home-page'
+        )
+        self.assertEqual(list(rendered), ['sidebar-2', 'sidebar-1', 'sidebar-0'])
+        self.assertEqual(rendered['sidebar-0'], '<p>Area 0</p>')
+        self.assertEqual(rendered['sidebar-1'], '<div>Area 1</div>')
+
+    def test_only_parallel_safe_areas_use_threads(self):
+        """Testa se apenas as áreas seguras são renderizadas fora da thread atual"""
+        threads = []
+        original_render = WidgetInstance.render
+
+        def tracking_render(instance, *args, **kwargs):
+            threads.append((instance.title, threading.current_thread() is threading.main_thread()))
+            return original_render(instance, *args, **kwargs)
+
+        WidgetInstance.render = tracking_render
+        try:
+            prefetch_widget_areas(['sidebar-0', 'sidebar-1', 'sidebar-2'], 'home-page')
+        finally:
+            WidgetInstance.render = original_render
+
+        self.assertEqual(dict(threads), {'Area 0': False, 'Area 1': True, 'Area 2': False})
+
+    def test_prefetch_tag(self):
+        """Testa se render_widget_area reutiliza o HTML pré-renderizado"""
+        template = Template(
+            '{% load template_tags %}'
+            "{% prefetch_widget_areas 'sidebar-0' 'sidebar-1' template_slug='home-page' %}"
+            "{% render_widget_area 'sidebar-1' 'home-page' %}"
+            "{% render_widget_area 'sidebar-0' 'home-page' %}"
+        )
+        rendered = template.render(Context({'request': self.factory.get('/')}))
+        self.assertEqual(rendered, '<div>Area 1</div><p>Area 0</p>')
@@ -0,0 +1,133 @@
+from django.test import TestCase, Client
+from django.template import Context, Template
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from ..models import (
+    TemplateCategory, TemplateType, DjangoTemplate,
+    WidgetArea, Widget, WidgetInstance
+)
+
+User = get_user_model()
+
+
+class DeferredWidgetAreaTests(TestCase):
+    """Testes para as áreas de widgets diferidas"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='password'
+        )
+        self.category = TemplateCategory.objects.create(
+            name='Test Category',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.template_type = TemplateType.objects.create(
+            name='Test Type',
+            type='page',
+            category=self.category,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.django_template = DjangoTemplate.objects.create(
+            name='Home Page',
+            file_path='templates/home.html',
+            type=self.template_type,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.area = WidgetArea.objects.create(
+            name='Sidebar',
+            template=self.django_template,
+            render_mode='deferred'
+        )
+        self.widget = Widget.objects.create(
+            name='Text Widget',
+            widget_type='text',
+            template_code='<p>{{ widget_title }}</p>',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.instance = WidgetInstance.objects.create(
+            widget=self.widget,
+            area=self.area,
+            title='Bem-vindo'
+        )
+
+    def test_deferred_area_renders_placeholder(self):
+        """Testa se a área diferida emite apenas o placeholder e o script uma única vez"""
+        template = Template(
+            '{% load template_tags %}'
+            "{% render_widget_area 'sidebar' 'home-page' %}"
+            "{% render_widget_area 'sidebar' 'home-page' %}"
+        )
+        rendered = template.render(Context({}))
+
+        self.assertNotIn('Bem-vindo', rendered)
+        self.assertEqual(rendered.count('data-widget-area-src="/widgets/widget-area/fragment/home-page/sidebar/"'), 2)
+        self.assertEqual(rendered.count('deferred_areas.js'), 1)
+
+    def test_fragment_view_is_public_without_user_rules(self):
+        """Testa se o fragmento sem regras de usuário é cacheável publicamente"""
+        response = self.client.get(self.area.get_fragment_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<p>Bem-vindo</p>')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=300', response['Cache-Control'])
+
+    def test_fragment_view_is_private_with_user_rules(self):
+        """Testa se o fragmento que depende do usuário não é compartilhado entre visitantes"""
+        self.instance.visibility_rules = {'user_auth': 'authenticated'}
+        self.instance.save()
+
+        response = self.client.get(self.area.get_fragment_url())
+        self.assertNotContains(response, 'Bem-vindo')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        self.client.login(email='test@example.com', password='password')
+        response = self.client.get(self.area.get_fragment_url())
+        self.assertContains(response, 'Bem-vindo')
+
+    def test_fragment_cache_is_invalidated_on_save(self):
+        """Testa se alterar uma instância invalida o fragmento cacheado"""
+        self.client.get(self.area.get_fragment_url())
+
+        self.instance.title = 'Olá'
+        self.instance.save()
+
+        response = self.client.get(self.area.get_fragment_url())
+        self.assertContains(response, '<p>Olá</p>')
+
+    def test_fragment_is_not_shared_between_users(self):
+        """Testa se o fragmento de um usuário autenticado não é servido a outro usuário"""
+        self.widget.template_code = '<p>{{ request.user.email }}</p>'
+        self.widget.save()
+        User.objects.create_user(email='other@example.com', password='password')
+
+        self.client.login(email='test@example.com', password='password')
+        response = self.client.get(self.area.get_fragment_url())
+        self.assertContains(response, 'test@example.com')
+        self.assertIn('private', response['Cache-Control'])
+
+        other = Client()
+        other.login(email='other@example.com', password='password')
+        response = other.get(self.area.get_fragment_url())
+        self.assertContains(response, 'other@example.com')
+        self.assertNotContains(response, 'test@example.com')
+
+    def test_fragment_timeout_is_capped_by_date_rules(self):
+        """Testa se o cache do fragmento não ultrapassa o início de uma regra de data"""
+        from datetime import datetime, timedelta
+        start = datetime.now() + timedelta(seconds=60)
+        self.instance.visibility_rules = {'date_range': {'start': start.isoformat()}}
+        self.instance.save()
+
+        response = self.client.get(self.area.get_fragment_url())
+        self.assertNotContains(response, 'Bem-vindo')
+        max_age = int(response['Cache-Control'].split('max-age=')[1].split(',')[0])
+        self.assertLessEqual(max_age, 60)
@@ -0,0 +1,145 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from ..models import (
+    TemplateCategory, TemplateType, DjangoTemplate,
+    WidgetArea, Widget, WidgetInstance
+)
+
+User = get_user_model()
+
+
+class DirtyFieldsTests(TestCase):
+    """Testes para o rastreamento de campos alterados nos modelos de widgets"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='password'
+        )
+        self.category = TemplateCategory.objects.create(
+            name='Test Category',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.template_type = TemplateType.objects.create(
+            name='Test Type',
+            type='page',
+            category=self.category,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.django_template = DjangoTemplate.objects.create(
+            name='Home Page',
+            file_path='templates/home.html',
+            type=self.template_type,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.area = WidgetArea.objects.create(
+            name='Sidebar',
+            template=self.django_template
+        )
+        self.widget = Widget.objects.create(
+            name='Text Widget',
+            widget_type='text',
+            template_code='<p>{{ widget_title }}</p>',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        WidgetInstance.objects.create(
+            widget=self.widget,
+            area=self.area,
+            title='Bem-vindo',
+            widget_settings={'color': 'blue'}
+        )
+
+    def test_unchanged_save_skips_query(self):
+        """Testa se save(skip_if_unchanged=True) sem alterações não acessa o banco"""
+        instance = WidgetInstance.objects.get(title='Bem-vindo')
+        self.assertEqual(instance.changed_fields, set())
+        with self.assertNumQueries(0):
+            instance.save(skip_if_unchanged=True)
+
+    def test_unchanged_save_sends_signals(self):
+        """Testa se um save comum sem alterações ainda envia os signals e atualiza os auto_now"""
+        instance = WidgetInstance.objects.get(title='Bem-vindo')
+        updated_at = instance.updated_at
+        received = []
+
+        def receiver(sender, instance, update_fields, **kwargs):
+            received.append(update_fields)
+
+        post_save.connect(receiver, sender=WidgetInstance)
+        self.addCleanup(post_save.disconnect, receiver, sender=WidgetInstance)
+        with CaptureQueriesContext(connection) as queries:
+            instance.save()
+
+        self.assertEqual(len(received), 1)
+        self.assertEqual(set(received[0]), {'updated_at'})
+        self.assertNotIn('"title"', queries.captured_queries[-1]['sql'])
+        self.assertGreater(WidgetInstance.objects.get(pk=instance.pk).updated_at, updated_at)
+
+    def test_save_updates_only_changed_fields(self):
+        """Testa se apenas os campos alterados (e os auto_now) são gravados"""
+        instance = WidgetInstance.objects.get(title='Bem-vindo')
+        instance.title = 'Olá'
+        self.assertEqual(instance.changed_fields, {'title'})
+
+        with CaptureQueriesContext(connection) as queries:
+            instance.save()
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"title"', sql)
+        self.assertIn('"updated_at"', sql)
+        self.assertNotIn('"widget_settings"', sql)
+        self.assertEqual(instance.changed_fields, set())
+
+    def test_json_mutation_is_detected(self):
+        """Testa se alterações dentro de um campo JSON são detectadas"""
+        instance = WidgetInstance.objects.get(title='Bem-vindo')
+        instance.widget_settings['color'] = 'red'
+        self.assertIn('widget_settings', instance.changed_fields)
+        instance.save()
+
+        instance.refresh_from_db()
+        self.assertEqual(instance.widget_settings['color'], 'red')
+
+    def test_get_original_value(self):
+        """Testa se o valor original continua disponível após a alteração"""
+        widget = Widget.objects.get(pk=self.widget.pk)
+        widget.slug = 'novo-slug'
+        self.assertTrue(widget.has_changed('slug'))
+        with self.assertNumQueries(0):
+            self.assertEqual(widget.get_original_value('slug'), 'text-widget')
+
+    def test_refresh_from_db_resets_snapshot(self):
+        """Testa se, após recarregar do banco, o save grava as alterações feitas depois"""
+        instance = WidgetInstance.objects.get(title='Bem-vindo')
+        WidgetInstance.objects.filter(pk=instance.pk).update(title='Outro')
+
+        instance.refresh_from_db()
+        self.assertEqual(instance.changed_fields, set())
+
+        instance.title = 'Bem-vindo'
+        self.assertEqual(instance.changed_fields, {'title'})
+        instance.save()
+        self.assertEqual(WidgetInstance.objects.get(pk=instance.pk).title, 'Bem-vindo')
+
+    def test_partial_refresh_keeps_other_changes(self):
+        """Testa se recarregar alguns campos mantém as demais alterações pendentes"""
+        instance = WidgetInstance.objects.get(title='Bem-vindo')
+        instance.widget_settings = {'color': 'red'}
+        WidgetInstance.objects.filter(pk=instance.pk).update(title='Outro')
+
+        instance.refresh_from_db(fields=['title'])
+        self.assertEqual(instance.changed_fields, {'widget_settings'})
+
+    def test_json_snapshot_is_not_a_copy(self):
+        """Testa se o valor original de um campo JSON é guardado serializado e reconstruído sob demanda"""
+        instance = WidgetInstance.objects.get(title='Bem-vindo')
+        self.assertIsInstance(instance._loaded_values['widget_settings'], str)
+
+        instance.widget_settings['color'] = 'red'
+        self.assertEqual(instance.get_original_value('widget_settings'), {'color': 'blue'})
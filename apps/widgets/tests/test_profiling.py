@@ -0,0 +1,164 @@
+import threading
+from unittest import mock
+
+from django.test import TestCase, RequestFactory, override_settings
+from django.http import HttpResponse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib import admin
+from ..middleware import RenderProfilingMiddleware
+from ..admin import WidgetInstanceAdmin
+from ..profiling import get_render_stats, get_render_stats_many, get_profile_label, get_samples, store_samples
+from utils.cache import profiling_cache
+from ..models import (
+    TemplateCategory, TemplateType, DjangoTemplate,
+    WidgetArea, Widget, WidgetInstance
+)
+
+User = get_user_model()
+
+
+@override_settings(WIDGET_PROFILING_ENABLED=True)
+class RenderProfilingTests(TestCase):
+    """Testes para o perfilamento de renderização dos widgets"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            email='staff@example.com',
+            password='password',
+            is_staff=True
+        )
+        self.category = TemplateCategory.objects.create(
+            name='Test Category',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.template_type = TemplateType.objects.create(
+            name='Test Type',
+            type='page',
+            category=self.category,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.django_template = DjangoTemplate.objects.create(
+            name='Home Page',
+            file_path='templates/home.html',
+            type=self.template_type,
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.area = WidgetArea.objects.create(
+            name='Sidebar',
+            template=self.django_template
+        )
+        self.widget = Widget.objects.create(
+            name='Text Widget',
+            widget_type='text',
+            template_code='<p>{{ widget_title }}</p>',
+            created_by=self.user,
+            updated_by=self.user
+        )
+        self.instance = WidgetInstance.objects.create(
+            widget=self.widget,
+            area=self.area,
+            title='Bem-vindo'
+        )
+
+    def test_render_records_sample(self):
+        """Testa se cada renderização registra tempo, consultas e tamanho"""
+        self.instance.render()
+        self.instance.render()
+
+        stats = get_render_stats('widget', self.instance.pk)
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['size'], len('<p>Bem-vindo</p>'))
+        self.assertGreaterEqual(stats['p95'], stats['p50'])
+
+    @override_settings(WIDGET_PROFILING_ENABLED=False)
+    def test_disabled_by_setting(self):
+        """Testa se nada é registrado com o perfilamento desligado"""
+        self.instance.render()
+        self.assertIsNone(get_render_stats('widget', self.instance.pk))
+
+    def test_server_timing_for_staff(self):
+        """Testa se o cabeçalho Server-Timing é enviado apenas para a equipe"""
+        def view(request):
+            return HttpResponse(self.instance.render(request))
+
+        request = self.factory.get('/')
+        request.user = self.user
+        response = RenderProfilingMiddleware(view)(request)
+        self.assertIn(f'widget-{self.instance.pk};dur=', response['Server-Timing'])
+
+        request = self.factory.get('/')
+        request.user = User(email='visitor@example.com')
+        response = RenderProfilingMiddleware(view)(request)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(get_render_stats('widget', self.instance.pk)['count'], 2)
+
+    def test_concurrent_samples_are_not_lost(self):
+        """Testa se gravações simultâneas de várias threads mantêm todas as amostras"""
+        sample = {'duration': 1.0, 'queries': 0, 'size': 10}
+
+        def worker():
+            for _ in range(25):
+                store_samples('widget', self.instance.pk, [sample])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(get_render_stats('widget', self.instance.pk)['count'], 100)
+
+    @override_settings(WIDGET_PROFILING_SAMPLE_SIZE=5)
+    def test_sample_window_is_bounded(self):
+        """Testa se apenas as últimas amostras são mantidas"""
+        for duration in range(8):
+            store_samples('widget', self.instance.pk, [{'duration': duration, 'queries': 0, 'size': 0}])
+        durations = sorted(sample['duration'] for sample in get_samples('widget', self.instance.pk))
+        self.assertEqual(durations, [3, 4, 5, 6, 7])
+
+    def test_label_does_not_query(self):
+        """Testa se a descrição da amostra não faz consultas extras"""
+        instance = WidgetInstance.objects.get(pk=self.instance.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile_label('widget', instance, 'widget'), f'widget #{instance.pk}')
+        instance.widget
+        self.assertEqual(get_profile_label('widget', instance, 'widget'), f'{self.widget} #{instance.pk}')
+
+    def test_stats_of_many_instances_use_two_cache_reads(self):
+        """Testa se as estatísticas de várias instâncias são lidas com duas leituras do cache"""
+        instances = [self.instance] + [
+            WidgetInstance.objects.create(widget=self.widget, area=self.area, title=f'Extra {index}', order=index + 1)
+            for index in range(4)
+        ]
+        for instance in instances[:3]:
+            instance.render()
+
+        with mock.patch.object(profiling_cache, 'get_many', wraps=profiling_cache.get_many) as get_many:
+            stats = get_render_stats_many('widget', [instance.pk for instance in instances])
+
+        self.assertEqual(get_many.call_count, 2)
+        self.assertEqual([stats[instance.pk] and stats[instance.pk]['count'] for instance in instances],
+                         [1, 1, 1, None, None])
+
+    def test_admin_changelist_reads_stats_once(self):
+        """Testa se a listagem do admin não lê o cache de perfilamento a cada linha"""
+        for index in range(4):
+            WidgetInstance.objects.create(
+                widget=self.widget, area=self.area, title=f'Extra {index}', order=index + 1
+            ).render()
+        request = self.factory.get('/admin/widgets/widgetinstance/')
+        request.user = User.objects.create_superuser(email='admin@example.com', password='password')
+        model_admin = WidgetInstanceAdmin(WidgetInstance, admin.site)
+
+        with mock.patch.object(profiling_cache, 'get_many', wraps=profiling_cache.get_many) as get_many:
+            changelist = model_admin.get_changelist_instance(request)
+            rendered = [model_admin.render_profile(obj) for obj in changelist.result_list]
+
+        self.assertEqual(get_many.call_count, 2)
+        self.assertEqual(sorted(str(value).endswith('1 amostras</small>') for value in rendered), [False] + [True] * 4)
@@ -27,6 +27,13 @@ urlpatterns = [
     path('widget-area/editor/<slug:template_slug>/<slug:area_slug>/', 
          views.WidgetAreaEditorView.as_view(), name='widget_area_editor'),
     
+    # Conteúdo das áreas de widgets diferidas
+    path('widget-area/fragment/<slug:template_slug>/<slug:area_slug>/', 
+         views.widget_area_fragment, name='widget_area_fragment'),
+    
+    # Bundles de CSS/JS dos componentes (nomes com hash do conteúdo)
+    path('bundles/<str:filename>', views.component_bundle_file, name='component_bundle_file'),
+    
     # APIs para manipulação de componentes
     path('api/region/<slug:template_slug>/<slug:region_slug>/component/add/', 
          views.add_component_to_region, name='add_component_to_region'),
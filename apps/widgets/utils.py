@@ -4,6 +4,13 @@ from django.template import loader, Context
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ImproperlyConfigured
+from utils.cache import widgets_cache
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.db import connections
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import threading
 import os
 import json
 import re
@@ -120,21 +127,37 @@ def get_component_instances_for_region(region_slug, template_slug, context=None,
     return "".join(rendered_components)
 
 
+def get_widget_area(area_slug, template_slug):
+    """
+    Obtém uma área de widgets de um template ativo, ou None se não existir.
+    """
+    return WidgetArea.objects.select_related('template').filter(
+        slug=area_slug,
+        template__slug=template_slug,
+        template__is_active=True
+    ).first()
+
+
 def get_widgets_for_area(area_slug, template_slug, context=None, request=None):
     """
     Obtém e renderiza todos os widgets para uma área específica.
     """
-    if context is None:
-        context = {}
-    
-    try:
-        template = DjangoTemplate.objects.get(slug=template_slug, is_active=True)
-        area = template.widget_areas.get(slug=area_slug)
-    except (DjangoTemplate.DoesNotExist, WidgetArea.DoesNotExist):
+    area = get_widget_area(area_slug, template_slug)
+    if area is None:
         if settings.DEBUG:
             raise ImproperlyConfigured(f"Template '{template_slug}' ou área '{area_slug}' não encontrados")
         return ""
     
+    return render_widget_area_content(area, context, request)
+
+
+def render_widget_area_content(area, context=None, request=None):
+    """
+    Renderiza os widgets visíveis de uma área já carregada.
+    """
+    if context is None:
+        context = {}
+    
     # Obtém as instâncias de widgets para esta área, na ordem correta
     instances = WidgetInstance.objects.filter(
         area=area, 
@@ -150,6 +173,178 @@ def get_widgets_for_area(area_slug, template_slug, context=None, request=None):
     return "".join(rendered_widgets)
 
 
+_render_executor = None
+_render_executor_lock = threading.Lock()
+
+
+def is_concurrent_rendering_enabled():
+    """
+    A renderização concorrente das áreas é opcional e fica desligada por padrão.
+    """
+    return getattr(settings, 'WIDGET_CONCURRENT_RENDERING', False)
+
+
+def get_render_executor():
+    """
+    Retorna o pool de threads compartilhado usado na renderização das áreas.
+    O tamanho é limitado por WIDGET_RENDER_MAX_WORKERS.
+    """
+    global _render_executor
+    
+    if _render_executor is None:
+        with _render_executor_lock:
+            if _render_executor is None:
+                _render_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'WIDGET_RENDER_MAX_WORKERS', 4),
+                    thread_name_prefix='widget-render'
+                )
+    return _render_executor
+
+
+def is_area_parallel_safe(area):
+    """
+    Uma área pode ser renderizada em outra thread apenas se todos os seus
+    widgets visíveis foram declarados como seguros para renderização paralela.
+    """
+    return not area.widget_instances.filter(
+        is_visible=True,
+        widget__is_parallel_safe=False
+    ).exists()
+
+
+def _render_widget_area_in_thread(area, context, request):
+    """
+    Renderiza uma área em uma thread do pool. As conexões com o banco são
+    locais a cada thread, então são fechadas ao final para não ficarem abertas.
+    """
+    try:
+        return render_widget_area_content(area, context, request)
+    finally:
+        connections.close_all()
+
+
+def render_widget_areas(areas, context=None, request=None):
+    """
+    Renderiza várias áreas independentes e retorna o HTML na mesma ordem recebida.
+    Com WIDGET_CONCURRENT_RENDERING ativo, as áreas seguras são renderizadas no
+    pool de threads enquanto as demais são renderizadas na thread atual.
+    """
+    if context is None:
+        context = {}
+    
+    # Cada área recebe sua própria cópia do contexto, que é alterado durante a renderização
+    if hasattr(context, 'flatten'):
+        context = context.flatten()
+    
+    if not is_concurrent_rendering_enabled() or len(areas) < 2:
+        return [render_widget_area_content(area, dict(context), request) for area in areas]
+    
+    executor = get_render_executor()
+    futures = {}
+    results = [None] * len(areas)
+    
+    for index, area in enumerate(areas):
+        if is_area_parallel_safe(area):
+            # Preserva as variáveis de contexto (ex.: amostras do perfilamento) na thread
+            thread_context = contextvars.copy_context()
+            futures[index] = executor.submit(
+                thread_context.run, _render_widget_area_in_thread, area, dict(context), request
+            )
+    
+    for index, area in enumerate(areas):
+        if index not in futures:
+            results[index] = render_widget_area_content(area, dict(context), request)
+    
+    for index, future in futures.items():
+        results[index] = future.result()
+    
+    return results
+
+
+def prefetch_widget_areas(area_slugs, template_slug, context=None, request=None):
+    """
+    Renderiza antecipadamente as áreas informadas e retorna um dicionário
+    {slug_da_area: html}. Áreas diferidas ficam de fora, pois são carregadas
+    pelo endpoint próprio.
+    """
+    areas = {
+        area.slug: area
+        for area in WidgetArea.objects.select_related('template').filter(
+            slug__in=area_slugs,
+            template__slug=template_slug,
+            template__is_active=True
+        )
+    }
+    areas = [
+        areas[slug] for slug in area_slugs
+        if slug in areas and not areas[slug].is_deferred
+    ]
+    
+    rendered = render_widget_areas(areas, context, request)
+    return {area.slug: content for area, content in zip(areas, rendered)}
+
+
+def render_deferred_widget_area(area, render_context=None):
+    """
+    Renderiza o placeholder de uma área diferida. O conteúdo é carregado depois
+    pelo script deferred_areas.js, a partir do endpoint próprio da área.
+    O script é incluído apenas uma vez por renderização de template.
+    """
+    placeholder = format_html(
+        '<div class="widget-area-deferred {}" data-widget-area-src="{}"></div>',
+        area.css_classes,
+        area.get_fragment_url()
+    )
+    
+    if render_context is not None:
+        if render_context.get('deferred_widget_areas_loader'):
+            return placeholder
+        render_context['deferred_widget_areas_loader'] = True
+    
+    loader_script = format_html(
+        '<script src="{}" defer></script>',
+        static('js/widgets/deferred_areas.js')
+    )
+    return placeholder + loader_script
+
+
+def _widget_area_fragment_version_key(area):
+    return f'widget_area_fragment_version_{area.template.slug}_{area.slug}'
+
+
+def get_widget_area_fragment_cache_key(area, request=None):
+    """
+    Chave de cache do fragmento de uma área diferida. Varia conforme o usuário e o
+    tipo de dispositivo, que são as entradas das regras de visibilidade que dependem
+    da requisição. O fragmento é renderizado com o request, então os templates podem
+    exibir dados do usuário: cada usuário autenticado tem a sua própria variação.
+    """
+    auth_state = 'anonymous'
+    device = 'desktop'
+    
+    if request is not None:
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            auth_state = f'user{user.pk}'
+        
+        user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
+        if any(token in user_agent for token in ['mobile', 'android', 'iphone']):
+            device = 'mobile'
+        elif any(token in user_agent for token in ['ipad', 'tablet']):
+            device = 'tablet'
+    
+    version = widgets_cache.get(_widget_area_fragment_version_key(area), 0)
+    return f'widget_area_fragment_{area.template.slug}_{area.slug}_v{version}_{auth_state}_{device}'
+
+
+def invalidate_widget_area_fragments(area):
+    """
+    Invalida todas as variações do fragmento de uma área diferida (inclusive as de
+    cada usuário), trocando a versão usada nas chaves.
+    """
+    widgets_cache.incr(_widget_area_fragment_version_key(area), timeout=None)
+
+
 def render_component(component_slug, context=None):
     """
     Renderiza um componente específico com o contexto fornecido.
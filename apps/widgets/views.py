@@ -1,7 +1,7 @@
 # your_cms_app/templates/views.py
 
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
 from django.views.generic import View, TemplateView, ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib import messages
@@ -11,6 +11,9 @@ from django.template.loader import render_to_string
 from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_protect
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from utils.cache import widgets_cache
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.core.exceptions import PermissionDenied
 from django.utils.decorators import method_decorator
 from django.db import transaction
@@ -33,10 +36,15 @@ from apps.widgets.utils import (
     get_component_instances_for_region, 
     get_widgets_for_area,
     scan_template_directory,
-    sync_templates_with_database
+    sync_templates_with_database,
+    render_widget_area_content,
+    get_widget_area_fragment_cache_key
 )
+from .bundles import BUNDLE_DIR, BUNDLE_FILENAME_RE, get_bundle_max_age
 
 import json
+import time
+from datetime import datetime
 
 
 class EditorMixin:
@@ -738,4 +746,72 @@ class LayoutPreviewView(DetailView):
         # Adiciona classes CSS do layout
         context['layout_css_classes'] = self.object.css_classes
         
-        return context
\ No newline at end of file
+        return context
+
+
+def component_bundle_file(request, filename):
+    """
+    Serve um arquivo do bundle de componentes com cabeçalhos de cache de longa duração.
+    O nome do arquivo contém o hash do conteúdo, então ele nunca muda depois de gerado.
+    """
+    # Apenas nomes gerados por _write_bundle_file (prefixo.hash.extensão): nada de "..", barras etc.
+    if not BUNDLE_FILENAME_RE.match(filename):
+        raise Http404(_('Bundle não encontrado'))
+
+    name = f'{BUNDLE_DIR}/{filename}'
+    if not staticfiles_storage.exists(name):
+        raise Http404(_('Bundle não encontrado'))
+
+    content_type = 'text/css' if filename.endswith('.css') else 'application/javascript'
+    response = FileResponse(staticfiles_storage.open(name), content_type=content_type)
+    patch_cache_control(response, public=True, max_age=get_bundle_max_age(), immutable=True)
+    return response
+
+
+def widget_area_fragment(request, template_slug, area_slug):
+    """
+    Retorna apenas o HTML de uma área de widgets diferida.
+    A página que contém a área continua cacheável para todos os visitantes;
+    a personalização fica restrita a este fragmento, com sua própria política de cache.
+    """
+    area = get_object_or_404(
+        WidgetArea.objects.select_related('template'),
+        slug=area_slug,
+        template__slug=template_slug,
+        template__is_active=True
+    )
+    
+    cache_key = get_widget_area_fragment_cache_key(area, request)
+    fragment = widgets_cache.get(cache_key) if area.cache_timeout else None
+    
+    if fragment is not None:
+        max_age = max(0, int(fragment['expires_at'] - time.time()))
+    else:
+        # As regras de data mudam de resultado no próximo início/fim: o cache não passa disso
+        timeout = area.cache_timeout
+        next_change = area.get_next_visibility_change()
+        if next_change is not None:
+            timeout = min(timeout, max(1, int((next_change - datetime.now()).total_seconds())))
+        
+        fragment = {
+            'content': render_widget_area_content(area, {'request': request}, request),
+            'dependencies': sorted(area.get_visibility_dependencies()),
+            'expires_at': time.time() + timeout,
+        }
+        if timeout:
+            widgets_cache.set(cache_key, fragment, timeout)
+        max_age = timeout
+    
+    response = HttpResponse(fragment['content'])
+    
+    if 'user_auth' in fragment['dependencies'] or request.user.is_authenticated:
+        # Conteúdo personalizado: só o navegador do próprio usuário pode guardar
+        patch_cache_control(response, private=True, max_age=max_age)
+        patch_vary_headers(response, ['Cookie'])
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    
+    if 'device' in fragment['dependencies']:
+        patch_vary_headers(response, ['User-Agent'])
+    
+    return response
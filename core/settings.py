@@ -109,6 +109,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'utils.middleware.ConfigCacheMiddleware', 
     'utils.middleware.RedirectMiddleware',
+    'apps.widgets.middleware.RenderProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -193,6 +194,11 @@ MEDIA_URL = '/media/'
 
 # Configurações de upload
 # FILE_UPLOAD_PERMISSIONS = 0o644
+# Mesmos handlers padrão do Django, calculando hash e tipo do arquivo durante o recebimento
+FILE_UPLOAD_HANDLERS = [
+    'utils.uploadhandlers.HashingMemoryFileUploadHandler',
+    'utils.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
 
 
 
@@ -309,6 +315,51 @@ CONFIG_SEO_FIELDS = True
 CONFIG_ENABLE_META_DESCRIPTION = True
 CONFIG_DEFAULT_META_DESCRIPTION = 'Service de peinture professionnel'
 
+# Configurações de Widgets e Componentes
+COMPONENT_BUNDLE_MAX_AGE = 60 * 60 * 24 * 365  # 1 ano: os bundles têm o hash do conteúdo no nome
+WIDGET_PROFILING_ENABLED = False  # Mede tempo, consultas SQL e tamanho de cada widget/componente renderizado
+WIDGET_PROFILING_SAMPLE_SIZE = 200  # Amostras mantidas por instância para os percentis
+WIDGET_CONCURRENT_RENDERING = False  # Renderiza em paralelo as áreas com widgets marcados como seguros
+WIDGET_RENDER_MAX_WORKERS = 4
+
+# Configurações de redirecionamentos
+REDIRECT_ACCESS_FLUSH_INTERVAL = 60  # Segundos entre as gravações em lote de access_count/last_accessed
+
+# Cliente HTTP das integrações externas (utils.http)
+HTTP_CLIENT_TIMEOUT = (3.05, 10)  # (conexão, leitura) em segundos
+HTTP_CLIENT_RETRIES = 2  # Novas tentativas em erros de rede e respostas 429/502/503/504 (POST: rede e 429)
+HTTP_CLIENT_BACKOFF = 0.5  # Base da espera exponencial com jitter (segundos)
+HTTP_CLIENT_MAX_RETRY_AFTER = 30  # Espera máxima pedida por Retry-After (segundos)
+HTTP_CLIENT_POOL_MAXSIZE = 20  # Conexões keep-alive mantidas por host
+HTTP_CIRCUIT_BREAKER_THRESHOLD = 5  # Falhas seguidas que abrem o circuito de um host
+HTTP_CIRCUIT_BREAKER_RESET = 30  # Segundos até uma nova tentativa com o circuito aberto
+
+# Configurações do CDN (S3)
+CDN_S3_ENDPOINT_URL = None  # Serviço compatível com S3 (MinIO, moto server…); None usa a AWS
+CDN_S3_MAX_POOL_CONNECTIONS = 50  # Conexões mantidas por cliente boto3 compartilhado
+CDN_S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024  # Acima deste tamanho o upload é feito em partes
+CDN_S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+CDN_S3_MAX_CONCURRENCY = 4  # Partes enviadas em paralelo (memória ≈ chunksize × concorrência)
+CDN_SIGNED_URL_EXPIRY = 3600  # Validade das URLs assinadas (segundos)
+CDN_SIGNED_URL_MARGIN = 300  # As URLs em cache são renovadas este tempo antes de expirar
+CDN_INVALIDATION_ASYNC = True  # Envia as invalidações pela tarefa Celery flush_invalidations
+CDN_INVALIDATION_WINDOW = 2  # Segundos de espera para agrupar os caminhos de várias chamadas
+CDN_INVALIDATION_FOLD_THRESHOLD = 20  # Arquivos de um mesmo diretório trocados por "diretório/*"
+CDN_INVALIDATION_MAX_RETRIES = 3
+CDN_INVALIDATION_RETRY_DELAY = 1  # Segundos antes da primeira nova tentativa (dobra a cada falha)
+CDN_INVALIDATION_STALE = 600  # Envios interrompidos há mais tempo que isso são retomados
+# Réplica assíncrona (apps.cdn.storage.ReplicatedStorage)
+CDN_REPLICATION_PROVIDER = None  # ID ou nome do provedor; None usa o primeiro provedor ativo
+CDN_REPLICATION_ASYNC = True  # Replica por uma tarefa Celery; False replica ao final da transação
+CDN_REPLICATION_MAX_ATTEMPTS = 5
+CDN_REPLICATION_RETRY_DELAY = 30  # Segundos antes da segunda tentativa (dobra a cada falha)
+CDN_REPLICATION_STALE = 600  # Réplicas "em replicação" há mais tempo que isso são retomadas
+
+# Configurações de importação/exportação
+IMPORTEXPORT_CHUNK_SIZE = 200  # Páginas lidas do banco por vez durante a exportação
+IMPORTEXPORT_READ_WORKERS = 4  # Threads que leem os arquivos de mídia da exportação ZIP
+IMPORTEXPORT_PREFETCH_MAX_SIZE = 4 * 1024 * 1024  # Arquivos maiores são copiados em blocos, sem leitura antecipada
+
 # Configurações MPTT
 MPTT_ADMIN_LEVEL_INDENT = 20
 
@@ -0,0 +1,38 @@
+// static/js/widgets/deferred_areas.js
+
+/**
+ * Carregamento de áreas de widgets diferidas
+ *
+ * Áreas com o modo "diferido" são renderizadas como um placeholder com o
+ * atributo data-widget-area-src. Este script busca o conteúdo de cada área
+ * no endpoint próprio e substitui o placeholder pelo HTML retornado.
+ */
+
+(function() {
+    'use strict';
+
+    function loadDeferredAreas() {
+        const placeholders = document.querySelectorAll('[data-widget-area-src]');
+
+        placeholders.forEach(function(placeholder) {
+            const url = placeholder.getAttribute('data-widget-area-src');
+
+            fetch(url, { credentials: 'same-origin' })
+                .then(function(response) {
+                    return response.ok ? response.text() : '';
+                })
+                .then(function(html) {
+                    placeholder.outerHTML = html;
+                })
+                .catch(function() {
+                    placeholder.remove();
+                });
+        });
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', loadDeferredAreas);
+    } else {
+        loadDeferredAreas();
+    }
+})();
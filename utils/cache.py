@@ -0,0 +1,135 @@
+# utils/cache.py
+import time
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+GENERATION_KEY = 'ns:{name}:generation'
+
+
+class CacheNamespace:
+    """
+    Namespace de cache com contador de geração.
+
+    Todas as chaves do namespace incluem a geração atual. Invalidar o namespace
+    apenas incrementa esse contador (O(1)): as chaves antigas deixam de ser
+    lidas e expiram sozinhas, sem afetar os demais namespaces.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.generation_key = GENERATION_KEY.format(name=name)
+
+    def __repr__(self):
+        return f'<CacheNamespace: {self.name}>'
+
+    def _initial_generation(self):
+        # Baseada no relógio para que, se o contador for descartado pelo servidor
+        # de cache, uma geração antiga nunca volte a ser usada
+        return int(time.time() * 1000)
+
+    def get_generation(self):
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            # add() não sobrescreve a geração criada por outro processo
+            initial = self._initial_generation()
+            cache.add(self.generation_key, initial, None)
+            generation = cache.get(self.generation_key, initial)
+        return generation
+
+    def make_key(self, key, generation=None):
+        if generation is None:
+            generation = self.get_generation()
+        return f'ns:{self.name}:{generation}:{key}'
+
+    def invalidate(self):
+        """
+        Invalida todas as chaves do namespace.
+        """
+        try:
+            return cache.incr(self.generation_key)
+        except ValueError:
+            # Contador ausente (descartado ou nunca criado): qualquer geração nova serve
+            generation = self._initial_generation()
+            cache.set(self.generation_key, generation, None)
+            return generation
+
+    def get(self, key, default=None):
+        return cache.get(self.make_key(key), default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        cache.set(self.make_key(key), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        return cache.add(self.make_key(key), value, timeout)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT):
+        return cache.get_or_set(self.make_key(key), default, timeout)
+
+    def delete(self, key):
+        cache.delete(self.make_key(key))
+
+    def get_many(self, keys):
+        generation = self.get_generation()
+        prefixed = {self.make_key(key, generation): key for key in keys}
+        return {
+            prefixed[cache_key]: value
+            for cache_key, value in cache.get_many(list(prefixed)).items()
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT):
+        generation = self.get_generation()
+        cache.set_many({
+            self.make_key(key, generation): value for key, value in data.items()
+        }, timeout)
+
+    def delete_many(self, keys):
+        generation = self.get_generation()
+        cache.delete_many([self.make_key(key, generation) for key in keys])
+
+    def incr(self, key, delta=1, timeout=DEFAULT_TIMEOUT):
+        """
+        Incrementa um contador do namespace, criando-o se necessário.
+        """
+        cache_key = self.make_key(key)
+        if cache.add(cache_key, delta, timeout):
+            return delta
+        try:
+            return cache.incr(cache_key, delta)
+        except ValueError:
+            cache.set(cache_key, delta, timeout)
+            return delta
+
+
+# Namespaces de conteúdo: podem ser invalidados pela equipe (?clear_cache)
+config_cache = CacheNamespace('config')
+menus_cache = CacheNamespace('menus')
+pages_cache = CacheNamespace('pages')
+widgets_cache = CacheNamespace('widgets')
+api_cache = CacheNamespace('api')
+redirects_cache = CacheNamespace('redirects')
+
+# Namespaces internos: nunca são limpos junto com o conteúdo
+throttle_cache = CacheNamespace('throttle')
+profiling_cache = CacheNamespace('profiling')
+cdn_cache = CacheNamespace('cdn')  # URLs assinadas: valem até expirar, independentemente do conteúdo
+
+CONTENT_NAMESPACES = {
+    namespace.name: namespace
+    for namespace in (config_cache, menus_cache, pages_cache, widgets_cache, api_cache, redirects_cache)
+}
+
+
+def invalidate_namespaces(*names):
+    """
+    Invalida os namespaces de conteúdo informados (todos, se nenhum for informado).
+    Retorna os nomes invalidados.
+    """
+    names = names or tuple(CONTENT_NAMESPACES)
+    invalidated = []
+    for name in names:
+        namespace = CONTENT_NAMESPACES.get(name)
+        if namespace is not None:
+            namespace.invalidate()
+            invalidated.append(name)
+    return invalidated
@@ -1,8 +1,11 @@
 # apps/config/context_processors.py
-from apps.config.models import SiteStyle, Menu
+from django.utils.functional import SimpleLazyObject
+from utils.site_chrome import get_site_chrome
 
 def config_context(request):
+    # Avaliação preguiçosa: templates que não usam o estilo nem o menu não acessam o cache
+    chrome = SimpleLazyObject(get_site_chrome)
     return {
-        'site_style': SiteStyle.objects.first(),
-        'main_menu': Menu.objects.filter(parent=None, active=True),
-    }
\ No newline at end of file
+        'site_style': SimpleLazyObject(lambda: chrome.site_style),
+        'main_menu': SimpleLazyObject(lambda: chrome.main_menu),
+    }
@@ -0,0 +1,238 @@
+# utils/http.py
+import bisect
+import contextlib
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# Métodos que podem ser repetidos sem risco de efeito duplicado no servidor
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'})
+
+# Limites dos intervalos do histograma de latência (ms); o último intervalo é aberto
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Levantada sem acessar a rede quando o circuito do host está aberto.
+    Herda de RequestException: os tratamentos existentes continuam valendo.
+    """
+
+
+class CircuitBreaker:
+    """
+    Disjuntor por host: após `threshold` falhas seguidas, as requisições são
+    recusadas durante `reset_timeout` segundos. Depois disso uma única requisição
+    de teste é liberada; se ela funcionar, o circuito fecha novamente.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def before_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                raise CircuitOpenError('Circuito aberto: muitas falhas recentes neste host')
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """
+    Histograma de latência (ms) com intervalos fixos.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def record(self, duration, error=False):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.total += duration
+        self.count += 1
+        self.errors += int(error)
+
+    def snapshot(self):
+        labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS] + [f'>{LATENCY_BUCKETS[-1]}ms']
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean': self.total / self.count if self.count else 0,
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class HttpClient:
+    """
+    Cliente HTTP compartilhado para as integrações externas (CDN, Google…).
+
+    - Uma sessão com pool de conexões keep-alive por host;
+    - Timeout explícito em todas as requisições;
+    - Novas tentativas com espera exponencial e jitter em erros de conexão,
+      timeouts e respostas 429/502/503/504 (respeitando Retry-After, limitado a
+      HTTP_CLIENT_MAX_RETRY_AFTER). Requisições não idempotentes (POST…), que o
+      servidor pode já ter processado, só são repetidas em falhas de conexão e 429,
+      a menos que a chamada informe idempotent=True;
+    - Disjuntor por host e histograma de latência por endpoint (host + caminho).
+    """
+
+    def __init__(self, timeout=None, retries=None, backoff=None, pool_maxsize=None,
+                 breaker_threshold=None, breaker_reset_timeout=None):
+        self.timeout = timeout or getattr(settings, 'HTTP_CLIENT_TIMEOUT', (3.05, 10))
+        self.retries = retries if retries is not None else getattr(settings, 'HTTP_CLIENT_RETRIES', 2)
+        self.backoff = backoff if backoff is not None else getattr(settings, 'HTTP_CLIENT_BACKOFF', 0.5)
+        self.max_retry_after = getattr(settings, 'HTTP_CLIENT_MAX_RETRY_AFTER', 30)
+        self.breaker_threshold = breaker_threshold or getattr(settings, 'HTTP_CIRCUIT_BREAKER_THRESHOLD', 5)
+        self.breaker_reset_timeout = breaker_reset_timeout or getattr(settings, 'HTTP_CIRCUIT_BREAKER_RESET', 30)
+
+        pool_maxsize = pool_maxsize or getattr(settings, 'HTTP_CLIENT_POOL_MAXSIZE', 20)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._histograms = {}
+
+    def get_breaker(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset_timeout)
+            return breaker
+
+    def record_latency(self, endpoint, duration, error=False):
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram()
+            histogram.record(duration, error)
+
+    def get_latency_stats(self):
+        """
+        Retorna {endpoint: {count, errors, mean, buckets}}.
+        """
+        with self._lock:
+            return {endpoint: histogram.snapshot() for endpoint, histogram in self._histograms.items()}
+
+    def get_backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            # Um Retry-After longo prenderia a requisição (e o worker) por muito tempo
+            return min(float(retry_after), self.max_retry_after)
+        # Full jitter: espera aleatória entre 0 e o limite exponencial
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def is_retryable(self, idempotent, response=None, error=None):
+        if error is not None:
+            # Após um timeout de leitura a requisição pode já ter sido processada
+            return idempotent or not isinstance(error, requests.exceptions.ReadTimeout)
+        if idempotent:
+            return response.status_code in RETRY_STATUS_CODES
+        return response.status_code == 429
+
+    def request(self, method, url, timeout=None, retries=None, idempotent=None, **kwargs):
+        parts = urlsplit(url)
+        endpoint = f'{parts.netloc}{parts.path}'
+        breaker = self.get_breaker(parts.netloc)
+        retries = self.retries if retries is None else retries
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(retries + 1):
+            breaker.before_request()
+
+            response = error = None
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            except BaseException:
+                # Qualquer outro erro também encerra a requisição de teste do circuito
+                breaker.record_failure()
+                raise
+            duration = (time.perf_counter() - start) * 1000
+
+            failed = error is not None or response.status_code in RETRY_STATUS_CODES or response.status_code >= 500
+            self.record_latency(endpoint, duration, failed)
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if attempt == retries or not self.is_retryable(idempotent, response, error):
+                if error is not None:
+                    raise error
+                return response
+
+            time.sleep(self.get_backoff(attempt, response))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Retorna o cliente HTTP compartilhado pelo processo.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient()
+    return _http_client
+
+
+@contextlib.contextmanager
+def override_http_client(client):
+    """
+    Substitui o cliente compartilhado (por exemplo, por um stub nos testes).
+    Qualquer objeto com os métodos request/get/post serve.
+    """
+    global _http_client
+    previous, _http_client = _http_client, client
+    try:
+        yield client
+    finally:
+        _http_client = previous
@@ -0,0 +1,66 @@
+# utils/menus.py
+from django.template.loader import render_to_string
+from django.utils import translation
+from utils.cache import menus_cache, pages_cache
+from utils.site_chrome import get_site_chrome
+
+
+MENU_TEMPLATE = 'components/menu.html'
+
+
+def find_active_item(chrome, path):
+    """
+    Retorna o id do item de menu correspondente ao caminho: a URL exata ou,
+    na falta dela, o prefixo mais longo (/blog/artigo/ ativa o item /blog/).
+    Retorna None se a página não pertence a nenhum menu.
+    """
+    if not path:
+        return None
+
+    item_id = chrome.menu_urls.get(path)
+    while item_id is None and path.rstrip('/'):
+        path = path.rstrip('/').rsplit('/', 1)[0] + '/'
+        if path == '/':
+            break
+        item_id = chrome.menu_urls.get(path)
+    return item_id
+
+
+def render_menu(path=None, root=None, template_name=MENU_TEMPLATE):
+    """
+    Retorna o HTML do menu (todas as raízes ou apenas a árvore de `root`) com o
+    item do caminho atual marcado como ativo.
+
+    A árvore vem do SiteChrome (uma consulta, compartilhada pelo cache) e o HTML
+    fica em cache por menu, idioma e item ativo. Alterar menus ou páginas muda a
+    geração dos namespaces e descarta o HTML antigo.
+    """
+    chrome = get_site_chrome()
+    root_id = getattr(root, 'pk', root)
+
+    if root_id is None:
+        items = chrome.main_menu
+    else:
+        items = tuple(item for item in chrome.main_menu if item.pk == root_id)
+        if not items:
+            return ''
+
+    active_id = find_active_item(chrome, path)
+    active_trail = chrome.menu_trails.get(active_id, ())
+    if root_id is not None and active_trail[:1] != (root_id,):
+        # O item ativo pertence a outro menu: este é renderizado sem item ativo
+        active_id, active_trail = None, ()
+
+    cache_key = '_'.join(str(part) for part in (
+        'menu_html', template_name, root_id or 'main', translation.get_language(),
+        active_id, pages_cache.get_generation(),
+    ))
+
+    def render():
+        return render_to_string(template_name, {
+            'items': items,
+            'active_id': active_id,
+            'active_trail': active_trail,
+        })
+
+    return menus_cache.get_or_set(cache_key, render, None)
@@ -1,13 +1,15 @@
 # apps/config/middleware.py
-from django.core.cache import cache
+from utils.cache import invalidate_namespaces
 from django.utils.deprecation import MiddlewareMixin
-from django.shortcuts import redirect
-from apps.config.models import Redirect
+from utils.redirects import resolve_redirect
 
 class ConfigCacheMiddleware(MiddlewareMixin):
     def process_request(self, request):
+        # ?clear_cache invalida todo o conteúdo; ?clear_cache=menus,pages apenas os namespaces indicados.
+        # Contadores internos (tentativas de login, perfilamento) nunca são afetados.
         if request.user.is_staff and 'clear_cache' in request.GET:
-            cache.clear()
+            names = [name.strip() for name in request.GET.get('clear_cache').split(',') if name.strip()]
+            invalidate_namespaces(*names)
             
 
 class RedirectMiddleware:
@@ -15,9 +17,8 @@ class RedirectMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        path = request.path_info
-        try:
-            redirect_obj = Redirect.objects.get(old_path=path)
-            return redirect(redirect_obj.new_path, permanent=True)
-        except Redirect.DoesNotExist:
-            return self.get_response(request)
\ No newline at end of file
+        # Consulta a tabela em memória (config.Redirect + pages.PageRedirect), sem acesso ao banco
+        response = resolve_redirect(request.path_info)
+        if response is not None:
+            return response
+        return self.get_response(request)
\ No newline at end of file
@@ -0,0 +1,168 @@
+# utils/minify.py
+import hashlib
+import re
+
+
+_CSS_WHITESPACE_RE = re.compile(r'\s+')
+
+# Pontuação sem espaços significativos ao redor (fora de strings)
+_CSS_PUNCTUATION = '{};,>'
+
+# At-rules cujo bloco contém regras (seletores), e não declarações
+_CSS_RULE_BLOCKS = ('@media', '@supports', '@layer', '@container', '@document', '@keyframes',
+                    '@-webkit-keyframes', '@-moz-keyframes')
+
+
+def _css_tokens(css):
+    """
+    Divide o CSS em (tipo, texto), com tipo 'string', 'comment' ou 'code',
+    para que strings e comentários não sejam alterados pela minificação.
+    """
+    position = start = 0
+    length = len(css)
+    while position < length:
+        char = css[position]
+        if char in '"\'':
+            end = position + 1
+            while end < length and css[end] != char and css[end] != '\n':
+                end += 2 if css[end] == '\\' else 1
+            end = min(end + 1, length)
+            kind = 'string'
+        elif css.startswith('/*', position):
+            end = css.find('*/', position + 2)
+            end = length if end < 0 else end + 2
+            kind = 'comment'
+        else:
+            position += 1
+            continue
+
+        if start < position:
+            yield 'code', css[start:position]
+        yield kind, css[position:end]
+        position = start = end
+
+    if start < length:
+        yield 'code', css[start:]
+
+
+def minify_css(css):
+    """
+    Minifica um trecho de CSS removendo comentários e espaços desnecessários.
+    Strings são mantidas como estão, e os espaços ao redor de ":" só são removidos
+    dentro de blocos de declarações (em seletores, ".a :hover" não é ".a:hover").
+    """
+    if not css:
+        return ''
+
+    output = []
+    blocks = []  # 'rules' ou 'declarations', do bloco mais externo ao atual
+    prelude_start = 0  # Início, em output, do trecho desde o último {, } ou ;
+    pending_space = False
+
+    def is_punctuation(char):
+        return char in _CSS_PUNCTUATION or (char == ':' and blocks and blocks[-1] == 'declarations')
+
+    for kind, text in _css_tokens(css):
+        if kind == 'comment':
+            continue
+        if kind == 'string':
+            if pending_space and output and not is_punctuation(output[-1][-1]):
+                output.append(' ')
+            output.append(text)
+            pending_space = False
+            continue
+
+        for char in _CSS_WHITESPACE_RE.sub(' ', text):
+            if char == ' ':
+                pending_space = True
+                continue
+
+            if is_punctuation(char):
+                if char == '{':
+                    prelude = ''.join(output[prelude_start:]).strip().lower()
+                    blocks.append('rules' if prelude.startswith(_CSS_RULE_BLOCKS) else 'declarations')
+                elif char == '}':
+                    if output and output[-1] == ';':
+                        output.pop()
+                    if blocks:
+                        blocks.pop()
+                output.append(char)
+                if char in '{};':
+                    prelude_start = len(output)
+            else:
+                if pending_space and output and not is_punctuation(output[-1][-1]):
+                    output.append(' ')
+                output.append(char)
+            pending_space = False
+
+    return ''.join(output).strip()
+
+
+def _scan_js_line(line, state):
+    """
+    Percorre uma linha de JavaScript e retorna o estado no final dela: None, '`'
+    (template literal aberto), '*' (comentário de bloco aberto) ou a aspa de uma
+    string continuada com barra invertida.
+    """
+    position = 0
+    length = len(line)
+    while position < length:
+        char = line[position]
+        if state == '*':
+            end = line.find('*/', position)
+            if end < 0:
+                return state
+            state, position = None, end + 2
+            continue
+        if state is not None:
+            if char == '\\':
+                position += 2
+                continue
+            if char == state:
+                state = None
+            position += 1
+            continue
+
+        if line.startswith('//', position):
+            return None
+        if line.startswith('/*', position):
+            state, position = '*', position + 2
+            continue
+        if char in '"\'`':
+            state = char
+        position += 1
+
+    if state in ('"', "'") and not line.endswith('\\'):
+        return None
+    return state
+
+
+def minify_js(js):
+    """
+    Minificação conservadora de JavaScript: remove linhas vazias, indentação
+    e comentários de linha inteira. Linhas dentro de template literals e strings
+    continuadas são mantidas exatamente como estão.
+    """
+    if not js:
+        return ''
+
+    lines = []
+    state = None
+    for raw_line in js.splitlines():
+        if state in ('`', '"', "'"):
+            lines.append(raw_line)
+        else:
+            line = raw_line.strip()
+            if line and not (state is None and line.startswith('//')):
+                lines.append(line)
+        state = _scan_js_line(raw_line, state)
+    return '\n'.join(lines)
+
+
+def content_hash(content, length=12):
+    """
+    Retorna um hash curto (SHA-256) do conteúdo, usado em nomes de arquivos imutáveis.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()[:length]
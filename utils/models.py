@@ -0,0 +1,132 @@
+# utils/models.py
+import json
+from django.db import models
+from django.db.models.fields.files import FieldFile
+
+
+class DirtyFieldsMixin(models.Model):
+    """
+    Guarda os valores dos campos no momento em que o objeto é lido do banco.
+
+    - `changed_fields` retorna os campos alterados desde a leitura (ou o último save);
+    - save() sem update_fields grava apenas os campos alterados (e os auto_now);
+    - save(skip_if_unchanged=True) não acessa o banco quando nada mudou (nem envia
+      os signals de gravação).
+
+    Para forçar a gravação completa, use save(force_update=True) ou informe update_fields.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _get_tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(value, FieldFile):
+            return value.name
+        if isinstance(field, models.JSONField):
+            # Guarda o valor serializado: alterações no próprio objeto também são detectadas
+            return json.dumps(value, cls=field.encoder, sort_keys=True)
+        return value
+
+    def _take_snapshot(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: self._get_tracked_value(field)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        # Os valores recarregados passam a ser os originais
+        loaded_values = getattr(self, '_loaded_values', None)
+        if fields is None or loaded_values is None:
+            self._take_snapshot()
+            return
+        for name in fields:
+            field = self._meta.get_field(name)
+            if field.concrete:
+                loaded_values[field.attname] = self._get_tracked_value(field)
+
+    def _get_auto_now_fields(self):
+        return {
+            field.name for field in self._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        }
+
+    @property
+    def changed_fields(self):
+        """
+        Nomes dos campos alterados. Para objetos que não vieram do banco,
+        todos os campos são considerados alterados.
+        """
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None or self.pk is None:
+            return {field.name for field in self._meta.concrete_fields}
+
+        deferred = self.get_deferred_fields()
+        changed = set()
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if field.attname not in loaded_values:
+                # Campo adiado carregado depois da leitura: sem valor original para comparar
+                changed.add(field.name)
+            elif self._get_tracked_value(field) != loaded_values[field.attname]:
+                changed.add(field.name)
+        return changed
+
+    def has_changed(self, field_name):
+        return field_name in self.changed_fields
+
+    def get_original_value(self, field_name):
+        """
+        Valor do campo no banco antes das alterações. Usa o valor guardado na
+        leitura e só consulta o banco quando ele não está disponível.
+        """
+        field = self._meta.get_field(field_name)
+        loaded_values = getattr(self, '_loaded_values', None) or {}
+        if field.attname in loaded_values:
+            if isinstance(field, models.JSONField):
+                return json.loads(loaded_values[field.attname], cls=field.decoder)
+            return loaded_values[field.attname]
+        if self.pk is None:
+            return None
+        return type(self)._base_manager.filter(pk=self.pk).values_list(field.attname, flat=True).first()
+
+    def save(self, *args, skip_if_unchanged=False, **kwargs):
+        tracked = (
+            not args
+            and self.pk is not None
+            and getattr(self, '_loaded_values', None) is not None
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not kwargs.get('force_update')
+        )
+
+        if tracked:
+            changed = self.changed_fields
+            if not changed and skip_if_unchanged:
+                return
+
+            update_fields = changed | self._get_auto_now_fields()
+            mptt_meta = getattr(self, '_mptt_meta', None)
+            if mptt_meta is not None:
+                # Uma alteração de pai ou de ordem pode mover o nó na árvore
+                update_fields |= {
+                    mptt_meta.left_attr, mptt_meta.right_attr,
+                    mptt_meta.tree_id_attr, mptt_meta.level_attr,
+                }
+            if update_fields:
+                # Sem alterações nem campos auto_now, o save é completo: update_fields
+                # vazio faria o Django ignorar a gravação e os signals
+                kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+        self._take_snapshot()
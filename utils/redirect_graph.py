@@ -0,0 +1,350 @@
+# utils/redirect_graph.py
+from typing import NamedTuple
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils.translation import gettext_lazy as _
+from utils.cache import redirects_cache
+from utils.redirects import WILDCARD
+
+
+BATCH_SIZE = 500
+
+
+class RedirectCycleError(ValidationError):
+    """
+    Erro levantado quando um redirecionamento criaria um ciclo (A → B → … → A).
+    """
+
+
+class _RedirectRow(NamedTuple):
+    model: type
+    pk: int
+    new_path: str
+    is_active: bool
+
+
+class ImportResult(NamedTuple):
+    created: int
+    updated: int
+    errors: dict  # {índice da regra: ValidationError}
+
+
+def _redirect_models():
+    from apps.config.models import Redirect
+
+    models = [Redirect]
+    if apps.is_installed('apps.pages'):
+        from apps.pages.models import PageRedirect
+        models.append(PageRedirect)
+    return models
+
+
+def _load_rows(lookup, paths):
+    """
+    Carrega das duas tabelas os redirecionamentos cujo `lookup` ('old_path' ou
+    'new_path') está em `paths`, indexados pelo caminho antigo.
+    """
+    rows = {}
+    paths = list(paths)
+    for model in _redirect_models():
+        has_active = any(field.name == 'is_active' for field in model._meta.fields)
+        fields = ['pk', 'old_path', 'new_path'] + (['is_active'] if has_active else [])
+        for start in range(0, len(paths), BATCH_SIZE):
+            queryset = model.objects.filter(**{f'{lookup}__in': paths[start:start + BATCH_SIZE]})
+            for values in queryset.values_list(*fields):
+                pk, old_path, new_path = values[:3]
+                is_active = values[3] if has_active else True
+                rows[old_path] = _RedirectRow(model, pk, new_path, is_active)
+    return rows
+
+
+def _load_affected_rows(old_paths, new_paths):
+    """
+    Carrega apenas os redirecionamentos afetados por uma importação:
+    - os das regras importadas (old_paths);
+    - as cadeias a partir dos destinos importados (para achatar e detectar ciclos);
+    - os que levam aos caminhos importados (cujo destino final pode mudar).
+    """
+    rows = _load_rows('old_path', old_paths)
+
+    # Seguindo os destinos: todo ciclo que passa por uma regra importada está aqui
+    frontier = set(new_paths) | {row.new_path for row in rows.values()}
+    while frontier:
+        loaded = _load_rows('old_path', frontier - set(rows))
+        rows.update(loaded)
+        frontier = {row.new_path for row in loaded.values()} - set(rows)
+
+    # No sentido contrário: regras que apontam (direta ou indiretamente) para os caminhos importados
+    frontier = set(old_paths)
+    while frontier:
+        loaded = {
+            old_path: row for old_path, row in _load_rows('new_path', frontier).items()
+            if old_path not in rows
+        }
+        rows.update(loaded)
+        frontier = set(loaded)
+
+    return rows
+
+
+def _is_wildcard(path):
+    return path.endswith(WILDCARD)
+
+
+def find_cycles(graph):
+    """
+    Retorna os ciclos do grafo (listas de caminhos, na ordem da cadeia). Cada caminho
+    tem no máximo um destino, então basta seguir a cadeia a partir de cada nó não visitado.
+    """
+    state = {}  # 1 = na cadeia atual, 2 = concluído
+    cycles = []
+
+    for start in graph:
+        if start in state:
+            continue
+
+        chain = []
+        node = start
+        while node in graph and node not in state:
+            state[node] = 1
+            chain.append(node)
+            node = graph[node]
+
+        if state.get(node) == 1:
+            # O nó atual já está na cadeia: tudo a partir dele forma o ciclo
+            cycles.append(chain[chain.index(node):])
+
+        for visited in chain:
+            state[visited] = 2
+
+    return cycles
+
+
+def resolve_targets(graph):
+    """
+    Retorna o destino final de cada caminho, seguindo as cadeias até o fim.
+    """
+    resolved = {}
+
+    for start in graph:
+        chain = []
+        node = start
+        seen = set()
+        while node in graph and node not in resolved and node not in seen:
+            seen.add(node)
+            chain.append(node)
+            node = graph[node]
+
+        final = resolved.get(node, node)
+        for visited in chain:
+            resolved[visited] = final
+
+    return resolved
+
+
+def _plan_redirects(model, rules, exclude_pk=None):
+    """
+    Valida as regras contra os redirecionamentos existentes e calcula os destinos finais.
+    `exclude_pk` é o registro de `model` sendo editado: a versão gravada dele é ignorada.
+    Retorna (rows, incoming, errors, targets).
+    """
+    rows = _load_affected_rows(
+        [rule['old_path'] for rule in rules if rule.get('old_path')],
+        [rule['new_path'] for rule in rules if rule.get('new_path')],
+    )
+    if exclude_pk is not None:
+        rows = {
+            old_path: row for old_path, row in rows.items()
+            if not (row.model is model and row.pk == exclude_pk)
+        }
+    errors = {}
+    incoming = {}
+
+    for index, rule in enumerate(rules):
+        old_path = rule.get('old_path')
+        new_path = rule.get('new_path')
+
+        if not old_path or not new_path:
+            errors[index] = ValidationError(_('Os caminhos antigo e novo são obrigatórios.'), code='required')
+        elif old_path == new_path:
+            errors[index] = RedirectCycleError(_('O caminho antigo e o novo são iguais.'), code='cycle')
+        elif old_path in incoming:
+            errors[index] = ValidationError(_('Caminho antigo repetido na importação.'), code='duplicate')
+        elif old_path in rows and rows[old_path].model is not model:
+            errors[index] = ValidationError(
+                _('Já existe um redirecionamento para este caminho em outra tabela.'), code='duplicate'
+            )
+        else:
+            incoming[old_path] = (index, rule)
+
+    # Grafo de caminhos exatos ativos; as regras importadas substituem as existentes
+    graph = {
+        old_path: row.new_path for old_path, row in rows.items()
+        if row.is_active and not _is_wildcard(old_path)
+    }
+    for old_path, (index, rule) in incoming.items():
+        graph.pop(old_path, None)
+        if rule.get('is_active', True) and not _is_wildcard(old_path):
+            graph[old_path] = rule['new_path']
+
+    # As regras existentes não têm ciclos, então todo ciclo passa por uma regra importada.
+    # De cada ciclo é recusada apenas a regra que o fecha; sem ela, a antiga volta a valer
+    cycles = find_cycles(graph)
+    while cycles:
+        for cycle in cycles:
+            old_path = max(
+                (old_path for old_path in cycle if old_path in incoming),
+                key=lambda old_path: incoming[old_path][0]
+            )
+            index, rule = incoming.pop(old_path)
+            errors[index] = RedirectCycleError(_('Este redirecionamento criaria um ciclo.'), code='cycle')
+            graph.pop(old_path, None)
+            if old_path in rows and rows[old_path].is_active and not _is_wildcard(old_path):
+                graph[old_path] = rows[old_path].new_path
+        cycles = find_cycles(graph)
+
+    return rows, incoming, errors, resolve_targets(graph)
+
+
+def _existing_updates(rows, incoming, targets):
+    """
+    Alterações nos redirecionamentos existentes cujo destino final mudou:
+    {model: {pk: {campo: valor}}}.
+    """
+    to_update = {}
+    for old_path, row in rows.items():
+        if old_path in incoming or old_path not in targets:
+            continue
+        if targets[old_path] != row.new_path:
+            to_update.setdefault(row.model, {})[row.pk] = {'new_path': targets[old_path]}
+    return to_update
+
+
+def _write_updates(to_update):
+    updated = 0
+    for update_model, changes in to_update.items():
+        instances = update_model.objects.in_bulk(list(changes))
+        fields = set()
+        for pk, values in changes.items():
+            for field, value in values.items():
+                setattr(instances[pk], field, value)
+            fields.update(values)
+        update_model.objects.bulk_update(instances.values(), sorted(fields), batch_size=BATCH_SIZE)
+        updated += len(instances)
+
+    # bulk_create/bulk_update não disparam sinais: a tabela em memória é invalidada aqui
+    transaction.on_commit(redirects_cache.invalidate)
+    return updated
+
+
+def import_redirects(model, rules):
+    """
+    Valida e grava um conjunto de redirecionamentos de uma só vez.
+
+    `rules` é uma lista de dicionários com os campos do modelo (old_path, new_path, …).
+    As cadeias são achatadas considerando as duas tabelas: todo redirecionamento
+    passa a apontar diretamente para o destino final, inclusive os já existentes.
+    Regras que conflitam com outra regra são recusadas, e de cada ciclo é recusada
+    apenas a regra que o fecha (a última da importação); os erros são informados em
+    ImportResult.errors e as demais regras são gravadas em lote.
+    Apenas os redirecionamentos ligados às regras importadas são lidos do banco.
+    """
+    rows, incoming, errors, targets = _plan_redirects(model, rules)
+
+    to_create = {}
+    to_update = _existing_updates(rows, incoming, targets)
+
+    for old_path, (index, rule) in incoming.items():
+        values = dict(rule)
+        values['new_path'] = targets.get(old_path, rule['new_path'])
+        if old_path in rows:
+            to_update.setdefault(model, {})[rows[old_path].pk] = values
+        else:
+            to_create[old_path] = values
+
+    with transaction.atomic():
+        if to_create:
+            model.objects.bulk_create(
+                [model(**values) for values in to_create.values()],
+                batch_size=BATCH_SIZE
+            )
+        updated = _write_updates(to_update)
+
+    return ImportResult(len(to_create), updated, errors)
+
+
+def _instance_rule(instance):
+    return {
+        'old_path': instance.old_path,
+        'new_path': instance.new_path,
+        'is_active': getattr(instance, 'is_active', True),
+    }
+
+
+def check_redirect(instance):
+    """
+    Levanta ValidationError se gravar o redirecionamento criaria um ciclo ou
+    conflitaria com outra regra. Não altera a instância nem o banco.
+    """
+    _rows, _incoming, errors, _targets = _plan_redirects(type(instance), [_instance_rule(instance)], instance.pk)
+    if errors:
+        raise errors[0]
+
+
+class RedirectGraphMixin(models.Model):
+    """
+    Mantém o grafo de redirecionamentos em toda gravação pelo ORM (admin, API, código):
+    clean() recusa ciclos e conflitos com uma mensagem no campo new_path, e save()
+    aponta a regra e as que levavam a ela diretamente para o destino final.
+    Gravações em lote usam import_redirects().
+    """
+
+    GRAPH_FIELDS = frozenset({'old_path', 'new_path', 'is_active'})
+
+    class Meta:
+        abstract = True
+
+    def clean(self):
+        super().clean()
+        if not self.old_path or not self.new_path:
+            return
+        try:
+            check_redirect(self)
+        except ValidationError as error:
+            raise ValidationError({'new_path': error.messages}, code=error.code)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not self.GRAPH_FIELDS & set(update_fields):
+            # Contadores de acesso e afins: o grafo não muda
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            rows, incoming, errors, targets = _plan_redirects(type(self), [_instance_rule(self)], self.pk)
+            if errors:
+                raise errors[0]
+            self.new_path = targets.get(self.old_path, self.new_path)
+            super().save(*args, **kwargs)
+            _write_updates(_existing_updates(rows, incoming, targets))
+
+
+def add_redirect(model, **fields):
+    """
+    Cria (ou atualiza) um único redirecionamento, achatando as cadeias existentes.
+    Levanta RedirectCycleError se a regra criaria um ciclo (ou ValidationError
+    se conflitar com outra regra).
+    """
+    result = import_redirects(model, [fields])
+    if result.errors:
+        raise result.errors[0]
+    return result
+
+
+def release_path(path):
+    """
+    Remove os redirecionamentos cujo caminho antigo voltou a ser servido por uma página.
+    """
+    for model in _redirect_models():
+        model.objects.filter(old_path=path).delete()
@@ -0,0 +1,235 @@
+# utils/redirects.py
+import atexit
+import logging
+import threading
+import time
+from typing import NamedTuple, Optional
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.http import HttpResponseRedirect, HttpResponsePermanentRedirect
+from django.utils import timezone
+from utils.cache import redirects_cache
+
+
+logger = logging.getLogger('redirects')
+
+WILDCARD = '*'
+
+
+class RedirectRule(NamedTuple):
+    """
+    Regra de redirecionamento carregada em memória.
+    Regras de prefixo terminam com '*' no caminho antigo; se o novo caminho também
+    terminar com '*', o restante da URL é acrescentado a ele.
+    """
+    old_path: str
+    new_path: str
+    status: int
+    page_redirect_id: Optional[int] = None
+
+    @property
+    def is_prefix(self):
+        return self.old_path.endswith(WILDCARD)
+
+    def build_target(self, path):
+        if self.is_prefix and self.new_path.endswith(WILDCARD):
+            return self.new_path[:-1] + path[len(self.old_path) - 1:]
+        return self.new_path.rstrip(WILDCARD) if self.is_prefix else self.new_path
+
+    def response(self, path):
+        response_class = HttpResponsePermanentRedirect if self.status == 301 else HttpResponseRedirect
+        return response_class(self.build_target(path))
+
+
+class _PrefixTrie:
+    """
+    Árvore de prefixos (por caractere) para as regras com '*'.
+    A busca devolve a regra com o prefixo mais longo que casa com o caminho.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, prefix, rule):
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[None] = rule
+
+    def longest_match(self, path):
+        node = self.root
+        match = node.get(None)
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(None, match)
+        return match
+
+
+def load_redirect_rules():
+    """
+    Carrega as regras das duas tabelas de redirecionamento: config.Redirect
+    (sempre permanentes) e pages.PageRedirect (apenas as ativas, com o tipo definido).
+    Em caso de caminho repetido, a regra de pages.PageRedirect prevalece.
+
+    Um erro de banco em uma das tabelas (migração pendente, por exemplo) é
+    registrado e a tabela é ignorada: um problema nos redirecionamentos não
+    pode derrubar todas as requisições.
+    """
+    from apps.config.models import Redirect
+
+    rules = []
+    try:
+        rules.extend(
+            RedirectRule(old_path, new_path, 301)
+            for old_path, new_path in Redirect.objects.values_list('old_path', 'new_path')
+        )
+    except DatabaseError:
+        logger.exception('Erro ao carregar os redirecionamentos de config.Redirect')
+
+    if apps.is_installed('apps.pages'):
+        try:
+            rules.extend(_load_page_redirect_rules())
+        except DatabaseError:
+            logger.exception('Erro ao carregar os redirecionamentos de pages.PageRedirect')
+
+    return rules
+
+
+def _load_page_redirect_rules():
+    from apps.pages.models import Page, PageRedirect
+
+    rows = list(PageRedirect.objects.filter(is_active=True).values_list(
+        'pk', 'old_path', 'new_path', 'redirect_type', 'page_id'
+    ))
+
+    # Registros anteriores ao campo new_path (vazio) levam à URL da própria página
+    page_ids = {page_id for _pk, _old_path, new_path, _redirect_type, page_id in rows if not new_path}
+    page_urls = {pk: page.get_absolute_url() for pk, page in Page.objects.in_bulk(page_ids).items()}
+
+    return [
+        RedirectRule(old_path, new_path or page_urls[page_id], redirect_type, pk)
+        for pk, old_path, new_path, redirect_type, page_id in rows
+        if new_path or page_id in page_urls
+    ]
+
+
+class RedirectTable:
+    """
+    Tabela de redirecionamentos em memória, compartilhada pelas threads do processo.
+    Os caminhos exatos ficam em um dicionário e as regras com '*' em uma árvore de
+    prefixos. A tabela é recarregada somente quando a geração do namespace de cache
+    'redirects' muda, ou seja, quando algum redirecionamento é alterado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._exact = {}
+        self._prefixes = _PrefixTrie()
+
+    def _build(self, rules):
+        exact = {}
+        prefixes = _PrefixTrie()
+        for rule in rules:
+            if rule.is_prefix:
+                prefixes.insert(rule.old_path[:-1], rule)
+            else:
+                exact[rule.old_path] = rule
+        return exact, prefixes
+
+    def ensure_loaded(self):
+        generation = redirects_cache.get_generation()
+        if generation == self._generation:
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                self._exact, self._prefixes = self._build(load_redirect_rules())
+                self._generation = generation
+
+    def match(self, path):
+        """
+        Retorna a regra aplicável ao caminho (exata antes de prefixo) ou None.
+        """
+        self.ensure_loaded()
+        rule = self._exact.get(path)
+        if rule is None:
+            rule = self._prefixes.longest_match(path)
+        return rule
+
+
+class AccessCounter:
+    """
+    Acumula os acessos aos redirecionamentos em memória e os grava em lote,
+    no máximo uma vez a cada REDIRECT_ACCESS_FLUSH_INTERVAL segundos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._last_accessed = {}
+        self._last_flush = time.monotonic()
+
+    def get_flush_interval(self):
+        return getattr(settings, 'REDIRECT_ACCESS_FLUSH_INTERVAL', 60)
+
+    def record(self, page_redirect_id):
+        with self._lock:
+            self._counts[page_redirect_id] = self._counts.get(page_redirect_id, 0) + 1
+            self._last_accessed[page_redirect_id] = timezone.now()
+            due = time.monotonic() - self._last_flush >= self.get_flush_interval()
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            last_accessed, self._last_accessed = self._last_accessed, {}
+            self._last_flush = time.monotonic()
+
+        if not counts or not apps.is_installed('apps.pages'):
+            return
+
+        from apps.pages.models import PageRedirect
+
+        # update() não dispara sinais, então a tabela em memória não é invalidada
+        for pk, count in counts.items():
+            PageRedirect.objects.filter(pk=pk).update(
+                access_count=F('access_count') + count,
+                last_accessed=last_accessed[pk]
+            )
+
+
+redirect_table = RedirectTable()
+access_counter = AccessCounter()
+
+
+def _flush_at_exit():
+    try:
+        access_counter.flush()
+    except Exception:
+        # O banco pode já estar indisponível no encerramento do processo
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+def resolve_redirect(path):
+    """
+    Retorna a resposta de redirecionamento para o caminho, ou None.
+    Registra o acesso para as regras de pages.PageRedirect.
+    """
+    rule = redirect_table.match(path)
+    if rule is None:
+        return None
+
+    if rule.page_redirect_id is not None:
+        access_counter.record(rule.page_redirect_id)
+
+    return rule.response(path)
@@ -4,6 +4,7 @@ from datetime import datetime
 from django.conf import settings
 from django.utils import timezone
 from apps.home.models import Testimonial, GoogleReviewsSettings
+from utils.http import get_http_client
 import logging
 
 # Configurar o logger
@@ -33,7 +34,7 @@ class GoogleReviewsService:
                 'key': self.settings.api_key
             }
 
-            response = requests.get(url, params=params)
+            response = get_http_client().get(url, params=params)
             response.raise_for_status()
             data = response.json()
 
@@ -1,11 +1,23 @@
 # apps/config/signals.py
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
-from apps.config.models import Page, SiteStyle, Menu
+from apps.config.models import Page, SiteStyle, Menu, Redirect
+from utils.cache import config_cache, menus_cache, pages_cache, redirects_cache
 
 @receiver([post_save, post_delete], sender=Page)
+def clear_pages_cache(sender, **kwargs):
+    pages_cache.invalidate()
+
 @receiver([post_save, post_delete], sender=SiteStyle)
+def clear_config_cache(sender, **kwargs):
+    config_cache.invalidate()
+
 @receiver([post_save, post_delete], sender=Menu)
-def clear_cache(sender, **kwargs):
-    cache.clear()
\ No newline at end of file
+def clear_menus_cache(sender, **kwargs):
+    menus_cache.invalidate()
+
+@receiver([post_save, post_delete], sender=Redirect)
+@receiver([post_save, post_delete], sender='pages.PageRedirect')
+def clear_redirects_cache(sender, **kwargs):
+    # Os processos recarregam a tabela de redirecionamentos na próxima requisição
+    redirects_cache.invalidate()
@@ -0,0 +1,70 @@
+# utils/site_chrome.py
+from typing import Dict, NamedTuple, Optional, Tuple
+from apps.config.models import SiteStyle, Menu
+from utils.cache import config_cache, menus_cache, pages_cache
+
+
+class SiteChrome(NamedTuple):
+    """
+    Elementos comuns a todas as páginas (estilo e menu principal), montados
+    uma única vez e compartilhados pelo cache. Imutável: não deve ser alterado
+    pelos templates.
+    """
+    site_style: Optional[SiteStyle]
+    main_menu: Tuple[Menu, ...]
+    # {url do item: id do item} e {id do item: ids dos ancestrais, da raiz até o item}
+    menu_urls: Dict[str, int] = {}
+    menu_trails: Dict[int, Tuple[int, ...]] = {}
+
+
+def _index_menu(items, trail=(), menu_urls=None, menu_trails=None):
+    """
+    Percorre a árvore já montada e indexa as URLs e os caminhos até a raiz.
+    Em URLs repetidas prevalece o item mais profundo.
+    """
+    menu_urls = {} if menu_urls is None else menu_urls
+    menu_trails = {} if menu_trails is None else menu_trails
+    for item in items:
+        item_trail = trail + (item.pk,)
+        menu_trails[item.pk] = item_trail
+        _index_menu(item.get_children(), item_trail, menu_urls, menu_trails)
+        url = item.get_url()
+        if url and url not in menu_urls:
+            menu_urls[url] = item.pk
+    return menu_urls, menu_trails
+
+
+def build_site_chrome():
+    """
+    Monta o estilo do site e a árvore completa do menu ativo. Só faz leituras: folhas
+    de estilos ausentes são geradas pelo comando build_site_stylesheets.
+    A árvore é montada com get_cached_trees: nos templates, item.get_children
+    percorre os filhos sem novas consultas.
+    """
+    menu_items = Menu.objects.filter(active=True).select_related('page').order_by('level', 'tree_id', 'lft')
+
+    # Itens cujo pai está inativo também aparecem como raiz em get_cached_trees: são descartados
+    main_menu = tuple(
+        item for item in menu_items.get_cached_trees()
+        if item.parent_id is None
+    )
+
+    menu_urls, menu_trails = _index_menu(main_menu)
+
+    return SiteChrome(
+        site_style=SiteStyle.objects.first(),
+        main_menu=main_menu,
+        menu_urls=menu_urls,
+        menu_trails=menu_trails,
+    )
+
+
+def get_site_chrome():
+    """
+    Retorna o SiteChrome do cache, reconstruindo-o apenas quando o estilo,
+    os menus ou as páginas ligadas aos menus são alterados.
+    """
+    # A chave inclui as gerações dos namespaces de menus e páginas, e o valor fica
+    # no namespace de configuração: alterar qualquer um dos três gera um novo SiteChrome
+    cache_key = f'site_chrome_{menus_cache.get_generation()}_{pages_cache.get_generation()}'
+    return config_cache.get_or_set(cache_key, build_site_chrome, None)
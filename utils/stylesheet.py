@@ -0,0 +1,139 @@
+# utils/stylesheet.py
+import re
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from utils.minify import minify_css, content_hash
+
+
+STYLESHEET_DIR = 'site_style'
+STYLESHEET_FILENAME_RE = re.compile(r'^site\.\w+\.css$')
+# Versões anteriores mantidas para páginas ainda em cache que as referenciam
+STYLESHEET_KEEP_PREVIOUS = 1
+
+# Qualquer tag ou comentário HTML (<style>, </style><script>, <!-- -->…)
+_TAG_RE = re.compile(r'<!--.*?-->|<[!/?]?[a-zA-Z][^>]*>', re.DOTALL)
+_UNSAFE_VALUE_RE = re.compile(r'[;{}<>]')
+
+
+def _css_value(value):
+    """
+    Remove caracteres que permitiriam sair da declaração CSS.
+    """
+    return _UNSAFE_VALUE_RE.sub('', str(value or '')).strip()
+
+
+def strip_tags(css):
+    """
+    Remove as tags HTML do CSS personalizado. Repete até não sobrar nenhuma,
+    para que tags aninhadas (<scr<b>ipt>) não se recomponham.
+    """
+    while True:
+        stripped = _TAG_RE.sub('', css)
+        if stripped == css:
+            return css
+        css = stripped
+
+
+def build_site_css(style):
+    """
+    Compila o SiteStyle em uma folha de estilos minificada: variáveis CSS,
+    regras de tipografia e layout, pontos de ruptura e o CSS personalizado.
+    """
+    values = {
+        field: _css_value(getattr(style, field))
+        for field in (
+            'primary_color', 'secondary_color', 'accent_color', 'text_color', 'link_color',
+            'heading_color', 'font_family', 'heading_font', 'base_font_size', 'body_line_height',
+            'heading_line_height', 'container_width', 'grid_gutter', 'mobile_breakpoint',
+            'tablet_breakpoint',
+        )
+    }
+
+    css = """
+    :root {{
+        --primary-color: {primary_color};
+        --secondary-color: {secondary_color};
+        --accent-color: {accent_color};
+        --text-color: {text_color};
+        --link-color: {link_color};
+        --heading-color: {heading_color};
+        --font-family: {font_family};
+        --heading-font: {heading_font};
+        --base-font-size: {base_font_size};
+        --body-line-height: {body_line_height};
+        --heading-line-height: {heading_line_height};
+        --container-width: {container_width};
+        --grid-gutter: {grid_gutter};
+    }}
+    body {{
+        font-family: var(--font-family);
+        font-size: var(--base-font-size);
+        line-height: var(--body-line-height);
+        color: var(--text-color);
+    }}
+    h1, h2, h3, h4, h5, h6 {{
+        font-family: var(--heading-font);
+        line-height: var(--heading-line-height);
+        color: var(--heading-color);
+    }}
+    a {{
+        color: var(--link-color);
+    }}
+    .container {{
+        max-width: var(--container-width);
+        padding-left: calc(var(--grid-gutter) / 2);
+        padding-right: calc(var(--grid-gutter) / 2);
+    }}
+    @media (max-width: {tablet_breakpoint}) {{
+        :root {{
+            --grid-gutter: calc({grid_gutter} * 0.75);
+        }}
+    }}
+    @media (max-width: {mobile_breakpoint}) {{
+        :root {{
+            --grid-gutter: calc({grid_gutter} / 2);
+        }}
+    }}
+    """.format(**values)
+
+    # O CSS personalizado era inserido diretamente no <head>, às vezes com a tag <style>;
+    # nenhuma tag é válida em uma folha de estilos
+    custom_css = strip_tags(style.custom_css or '')
+    return minify_css(css + custom_css)
+
+
+def write_site_stylesheet(style):
+    """
+    Grava a folha de estilos compilada no storage de mídia, com o hash do conteúdo
+    no nome, e retorna o nome do arquivo. Como o nome muda junto com o conteúdo,
+    o arquivo pode ser cacheado indefinidamente por navegadores e CDNs.
+    """
+    css = build_site_css(style)
+    name = f'{STYLESHEET_DIR}/site.{content_hash(css)}.css'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(css.encode('utf-8')))
+    return name
+
+
+def prune_site_stylesheets(keep=(), keep_previous=STYLESHEET_KEEP_PREVIOUS):
+    """
+    Remove as folhas de estilos compiladas que não estão em `keep`, exceto as
+    `keep_previous` mais recentes. Retorna os nomes removidos.
+    """
+    try:
+        _, filenames = default_storage.listdir(STYLESHEET_DIR)
+    except FileNotFoundError:
+        return []
+
+    previous = sorted(
+        (
+            f'{STYLESHEET_DIR}/{filename}' for filename in filenames
+            if STYLESHEET_FILENAME_RE.match(filename) and f'{STYLESHEET_DIR}/{filename}' not in keep
+        ),
+        key=default_storage.get_modified_time,
+        reverse=True,
+    )
+    removed = previous[keep_previous:]
+    for name in removed:
+        default_storage.delete(name)
+    return removed
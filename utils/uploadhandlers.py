@@ -0,0 +1,106 @@
+# utils/uploadhandlers.py
+import hashlib
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+SNIFF_SIZE = 512
+
+# Assinaturas (magic bytes) dos formatos aceitos nos uploads: (deslocamento, bytes, tipo)
+MAGIC_SIGNATURES = (
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'\x00\x00\x01\x00', 'image/x-icon'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+    (0, b'wOFF', 'font/woff'),
+    (0, b'wOF2', 'font/woff2'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'fLaC', 'audio/flac'),
+    (0, b'\x1a\x45\xdf\xa3', 'video/webm'),
+)
+
+# Formatos ISO-BMFF ("ftyp" no deslocamento 4): o tipo depende da marca principal (bytes 8 a 12)
+FTYP_BRANDS = {
+    b'isom': 'video/mp4', b'iso2': 'video/mp4', b'iso4': 'video/mp4', b'iso5': 'video/mp4',
+    b'iso6': 'video/mp4', b'mp41': 'video/mp4', b'mp42': 'video/mp4', b'avc1': 'video/mp4',
+    b'dash': 'video/mp4', b'M4V ': 'video/x-m4v', b'qt  ': 'video/quicktime',
+    b'M4A ': 'audio/mp4', b'M4B ': 'audio/mp4',
+    b'3gp4': 'video/3gpp', b'3gp5': 'video/3gpp', b'3gp6': 'video/3gpp', b'3g2a': 'video/3gpp2',
+    b'heic': 'image/heic', b'heix': 'image/heic', b'heim': 'image/heic', b'heis': 'image/heic',
+    b'mif1': 'image/heif', b'msf1': 'image/heif-sequence',
+    b'avif': 'image/avif', b'avis': 'image/avif-sequence',
+}
+
+
+def sniff_content_type(header):
+    """
+    Identifica o tipo do arquivo pelos primeiros bytes. Retorna None se o
+    formato não for reconhecido.
+    """
+    if header[:4] == b'RIFF' and len(header) >= 12:
+        return {b'WEBP': 'image/webp', b'WAVE': 'audio/wav', b'AVI ': 'video/x-msvideo'}.get(header[8:12])
+    if header[4:8] == b'ftyp' and len(header) >= 12:
+        # Marcas desconhecidas não são adivinhadas: o tipo vem da extensão
+        return FTYP_BRANDS.get(header[8:12])
+
+    for offset, signature, content_type in MAGIC_SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            return content_type
+
+    text = header.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith(b'<svg') or (text.startswith(b'<?xml') and b'<svg' in text):
+        return 'image/svg+xml'
+    return None
+
+
+class StreamingDigestMixin:
+    """
+    Calcula o SHA-256, o tamanho e o tipo (pelos magic bytes) enquanto o upload
+    é recebido, sem reler o arquivo depois. Os valores ficam no arquivo enviado:
+    uploaded_file.sha256, uploaded_file.sniffed_content_type.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Antes do super(): MemoryFileUploadHandler.new_file levanta StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        self.header = b''
+        super().new_file(*args, **kwargs)
+
+    def stores_data(self):
+        # Este handler guarda o arquivo (e não apenas repassa os dados ao próximo)?
+        return True
+
+    def receive_data_chunk(self, raw_data, start):
+        result = super().receive_data_chunk(raw_data, start)
+        if self.stores_data():
+            self.hasher.update(raw_data)
+            if len(self.header) < SNIFF_SIZE:
+                self.header += raw_data[:SNIFF_SIZE - len(self.header)]
+        return result
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.sha256 = self.hasher.hexdigest()
+            uploaded_file.sniffed_content_type = sniff_content_type(self.header)
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(StreamingDigestMixin, MemoryFileUploadHandler):
+    """
+    Arquivos pequenos: mantidos em memória, como no MemoryFileUploadHandler.
+    """
+
+    def stores_data(self):
+        return self.activated
+
+
+class HashingTemporaryFileUploadHandler(StreamingDigestMixin, TemporaryFileUploadHandler):
+    """
+    Arquivos grandes: gravados em disco, como no TemporaryFileUploadHandler.
+    """